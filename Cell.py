@@ -1,44 +1,143 @@
 import pygame
-import random
+import numpy as np
 from config import *
+import patterns
+import renderer
+import engines
+from rules import LIFE
+from simulation import Simulation
 
 
-class Cell:
+class CellEngine:
     """
-    A Cell class. A cell is a single square on the board.
+    A Cell Engine class. The classic board, stepped one cell at a time.
+    It has the same methods as the engines in engines.py, so a Simulation
+    can use it as the 'classic' engine.
+
+    The board is kept in flat bytearrays, one byte per cell, row after row:
+    cell (row, col) is at index row * self.width + col. The colors are the
+    game's, held once by the CellGrid that draws the board.
 
     Important attributes:
     --------------------
 
-    self.surface:
-        The pygame.Surface the cell is attached to.
+    self.cells:
+        The liveliness (0/1) of every cell of the (num_of_rows + 2) x (num_of_cols + 2)
+        board, indexed by padded (row, col) coordinates. The padding ring is never stepped.
+
+    self.next_cells:
+        Every round effects the liveliness of every cell, this is the
+        liveliness of every cell in the next round, same layout as self.cells.
+
+    self.bounds:
+        The (top, left, bottom, right) box, inclusive, that holds every living
+        cell, None if there are none. Only the box plus one cell of margin
+        is stepped.
 
-    self.alive_next_round:
-        Every round effects the liveliness of every cell, this is
-        a boolean value of that liveliness (dead/alive).
+    self.last_changes:
+        The (born, died) cells of the last step, see step_changes().
 
     """
-    def __init__(self, surface, init_live_color=WHITE, init_dead_color=PINK):
-        """ Initialize the Cell object """
-        self.alive = False
-        self.alive_color = init_live_color
-        self.dead_color = init_dead_color
-        self.color = self.dead_color
-        self.surface = surface
-        self.alive_next_round = False
+    def __init__(self, num_of_rows, num_of_cols):
+        """ Initialize the CellEngine object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.width = num_of_cols + 2
+        self.cells = bytearray((num_of_rows + 2) * self.width)
+        self.next_cells = bytearray(len(self.cells))
+        self.bounds = None
+        self.last_changes = engines.NO_CHANGES
+
+    def clear(self):
+        """ Kill every cell on the board, in bulk """
+        self.cells[:] = bytes(len(self.cells))
+        self.bounds = None
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        self.bounds, coordinate_arr = engines.extend_bounds(self.bounds, coordinate_arr)
+        cells, width = self.cells, self.width
+        for coordinate in coordinate_arr:
+            cells[coordinate[0] * width + coordinate[1]] = 1
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates """
+        cells, width = self.cells, self.width
+        for coordinate in coordinate_arr:
+            cells[coordinate[0] * width + coordinate[1]] = 0
 
-    def live(self):
-        self.alive = True
-        self.color = self.alive_color
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells, found inside self.bounds """
+        if self.bounds is None:
+            return []
+        top, left, bottom, right = self.bounds
+        rows, cols = np.nonzero(self.board()[top:bottom + 1, left:right + 1])
+        return list(zip((rows + top).tolist(), (cols + left).tolist()))
 
-    def die(self):
-        self.alive = False
-        self.color = self.dead_color
+    def is_alive(self, row, col):
+        return bool(self.cells[row * self.width + col])
+
+    def population(self):
+        """ Number of living cells """
+        return self.cells.count(1)
+
+    def board(self):
+        """ self.cells as a (num_of_rows + 2) x (num_of_cols + 2) array, sharing its memory """
+        return np.frombuffer(self.cells, dtype=np.uint8).reshape(self.num_of_rows + 2, self.width)
+
+    def get_array(self):
+        """ Return the board interior as a num_of_rows x num_of_cols uint8 array """
+        return self.board()[1:-1, 1:-1].copy()
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none """
+        return self.bounds
+
+    def step_changes(self):
+        """ The (born, died) cells of the last step, (n, 2) arrays of padded (row, col) """
+        return self.last_changes
+
+    def step(self, rule=LIFE):
+        """
+        Apply the rule (a rules.Rule, Conway's game of life by default) to the grid.
+        The next round of every cell is computed first,
+        then it becomes the cell's liveliness.
+
+        important variables:
+        - table: the rule's table, table[9 * liveliness + adj_live_count] is the next round.
+        - i: the index of the current cell, i - width is the cell above it.
+
+        Only the cells around self.bounds are visited, the rest stay dead.
+        """
+        if self.bounds is None:
+            self.last_changes = engines.NO_CHANGES
+            return
+        table = rule.table_bytes
+        cells, next_cells, width = self.cells, self.next_cells, self.width
+        first_row, first_col, last_row, last_col = engines.step_window(self.bounds, self.num_of_rows, self.num_of_cols)
+        for row in range(first_row, last_row + 1):
+            first = row * width + first_col
+            for i in range(first, row * width + last_col + 1):
+                adj_live_count = (cells[i - width - 1] + cells[i - width] + cells[i - width + 1] +
+                                  cells[i - 1] + cells[i + 1] +
+                                  cells[i + width - 1] + cells[i + width] + cells[i + width + 1])
+                # born, survived, or died of loneliness or overpopulation, as the rule says
+                next_cells[i] = table[9 * cells[i] + adj_live_count]
+
+        window = (slice(first_row, last_row + 1), slice(first_col, last_col + 1))
+        following = np.frombuffer(next_cells, dtype=np.uint8).reshape(self.num_of_rows + 2, width)
+        self.last_changes = engines.window_changes(self.board()[window], following[window], first_row, first_col)
+        for row in range(first_row, last_row + 1):
+            first, last = row * width + first_col, row * width + last_col + 1
+            cells[first:last] = next_cells[first:last]
+        self.bounds = engines.array_bounds(self.board()[first_row - 1:last_row + 2, first_col - 1:last_col + 2],
+                                   first_row - 1, first_col - 1)
 
 
 class CellGrid:
     """
-    A Cell Grid class. This is the actual board of the game.
+    A Cell Grid class. This is the actual board of the game, as shown on
+    the screen. The board itself is held and stepped by a Simulation.
 
     Important attributes:
     --------------------
@@ -46,6 +145,30 @@ class CellGrid:
     self.game:
         The game the cell grid is attached to.
 
+    self.simulation:
+        The Simulation holding the board and its engine (see simulation.py).
+        With the 'classic' engine the board is a CellEngine.
+
+    self.dirty_rects:
+        The screen areas changed by the last draw_grid, for pygame.display.update.
+        With game.dirty_rendering on, only the cells that flipped are redrawn.
+
+    self.full_redraw:
+        Set when the screen no longer shows the board (new board, popup, menu),
+        the next draw_grid then redraws every cell.
+
+    self.framebuffer:
+        The renderer.FramebufferRenderer used when game.renderer_name is 'framebuffer'.
+
+    self.drawn_region:
+        The active region of the board (see Simulation.active_region) at the last
+        draw. Only cells inside it or the current one can have changed since.
+
+    self.view_top, self.view_left, self.view_cell_size:
+        The viewport: the board cell shown in the top left corner of the screen,
+        and the size the cells are drawn in, None for the game's cell size.
+        Moved with pan() and zoom(), needed to follow an unbounded board.
+
 
     Important methods:
     --------------------
@@ -55,114 +178,235 @@ class CellGrid:
         needs to be built.
 
     draw_grid(self, ...):
-        Draw cells according to their next round liveliness.
+        Draw cells according to their liveliness.
 
     update_grid(self):
         Apply the rules of Conway's game of life to the grid.
 
+    pan(self, ...), zoom(self, ...):
+        Move the viewport over the board.
+
     """
     def __init__(self, game):
         self.game = game
-        # create a matrix of new Cell objects
-        self.grid = [[Cell(self.game.screen, game.alive_cell_color, game.dead_cell_color)
-                      for _ in range(game.num_of_cols + 2)]
-                     for __ in range(game.num_of_rows + 2)]
+        self.drawn_engine = None
+        self.dirty_rects = []
+        self.full_redraw = True
+        self.framebuffer = None
+        self.drawn_region = None
+        self.view_top, self.view_left, self.view_cell_size = 1, 1, None
+        self.simulation = Simulation(game.num_of_rows, game.num_of_cols, game.engine_name, self.current_rule(),
+                                     game.auto_sparse, keep_history=HISTORY)
+
+    def build_board(self):
+        """ Build an empty board for the current size, with the game's engine """
+        self.simulation.engine_name = self.game.engine_name
+        self.simulation.build_board()
 
     def new_grid(self, new_cell_size):
         """ Build a new cell grid """
         self.game.cell_size = new_cell_size
         self.game.num_of_cols = self.game.screen_w // self.game.cell_size
         self.game.num_of_rows = self.game.screen_h // self.game.cell_size
-        new_grid = [[Cell(self.game.screen, self.game.alive_cell_color, self.game.dead_cell_color)
-                     for _ in range(self.game.num_of_cols + 2)]
-                    for __ in range(self.game.num_of_rows + 2)]
-        self.grid = new_grid
+        self.simulation.engine_name = self.game.engine_name
+        self.simulation.resize(self.game.num_of_rows, self.game.num_of_cols)
+
+    def get_live_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        return self.simulation.get_cells()
+
+    def population(self):
+        """ Number of living cells """
+        return self.simulation.population()
+
+    # ---- viewport ----
+
+    def view_moved(self):
+        return (self.view_top, self.view_left, self.view_cell_size) != (1, 1, None)
+
+    def view_size(self, cell_edge_size=None):
+        """ The (cell size, rows, cols) of the viewport """
+        cell_edge_size = self.view_cell_size or cell_edge_size or self.game.cell_size
+        return cell_edge_size, self.game.screen_h // cell_edge_size, self.game.screen_w // cell_edge_size
+
+    def pan(self, d_rows, d_cols):
+        """ Move the viewport by the given number of cells """
+        self.view_top += d_rows
+        self.view_left += d_cols
+        self.full_redraw = True
+
+    def zoom(self, factor):
+        """ Scale the cell size by factor, between MIN_VIEW_CELL_SIZE and MAX_VIEW_CELL_SIZE, around the screen center """
+        cell_edge_size, view_rows, view_cols = self.view_size()
+        new_size = int(round(cell_edge_size * factor))
+        if new_size == cell_edge_size:
+            new_size += 1 if factor > 1 else -1
+        new_size = max(MIN_VIEW_CELL_SIZE, min(MAX_VIEW_CELL_SIZE, new_size))
+        center_row, center_col = self.view_top + view_rows // 2, self.view_left + view_cols // 2
+        self.view_cell_size = new_size
+        _, view_rows, view_cols = self.view_size()
+        self.view_top, self.view_left = center_row - view_rows // 2, center_col - view_cols // 2
+        self.full_redraw = True
+
+    def reset_view(self):
+        """ Show the board from (1, 1) in the game's cell size """
+        if self.view_moved():
+            self.view_top, self.view_left, self.view_cell_size = 1, 1, None
+            self.full_redraw = True
+
+    def screen_to_cell(self, x, y):
+        """ The board (row, col) of the cell drawn at screen pixel (x, y) """
+        cell_edge_size = self.view_size()[0]
+        return self.view_top + y // cell_edge_size, self.view_left + x // cell_edge_size
+
+    # ---- drawing ----
 
     def draw_grid(self, cell_edge_size):
         """
-        Draw the cells of the grid to their surface (the screen).
-        The cell is drawn according to it's next round liveliness.
+        Draw the cells of the grid to the screen, in the game's colors.
+        Sets self.dirty_rects to the areas that were drawn.
         """
-        left = 0
-        top = 0
-        for row in range(1, self.game.num_of_rows + 1):
-            for col in range(1, self.game.num_of_cols + 1):
-                cell = self.grid[row][col]
-                if cell.alive_next_round:
-                    cell.color = cell.alive_color
-                    cell.alive = True
-                    cell.alive_next_round = False
-                else:
-                    cell.color = cell.dead_color
-                    cell.alive = False
-
-                square = pygame.Rect(left, top, cell_edge_size, cell_edge_size)
-                pygame.draw.rect(cell.surface, cell.color, square)
-                left += cell_edge_size
-
-            left = 0
-            top += cell_edge_size
+        engine = self.simulation.engine
+        full_redraw = self.full_redraw or not self.game.dirty_rendering or engine is not self.drawn_engine
+        self.full_redraw = False
+        self.drawn_engine = engine
+        if self.game.renderer_name == 'framebuffer' and not self.view_moved() and not self.simulation.is_unbounded():
+            # the framebuffer finds the changed cells itself
+            self.simulation.take_changes(keep_tracking=False)
+            self.draw_framebuffer(cell_edge_size, full_redraw)
+        else:
+            changes = self.simulation.take_changes()
+            self.draw_engine(cell_edge_size, full_redraw or changes is None, changes)
 
-    def update_grid(self):
+    def draw_engine(self, cell_edge_size, full_redraw=True, changes=None):
         """
-        Apply the rules of Conway's game of life to the grid.
-        This updates the alive_next_round attribute of the cells.
-
-        important variables:
-        - over_population_limit: on/off bacteria mode.
-        - adj_list: for the current cell, a list of it's adjacent cells.
+        Draw the engine's board.
+        Full redraw: dead background first, then the living cells.
+        Otherwise: only the cells born or died in changes, the (born, died) of every
+        generation stepped since the last draw (see Simulation.take_changes).
+        """
+        cell_edge_size, view_rows, view_cols = self.view_size(cell_edge_size)
+        engine = self.simulation.engine
+        top, left = self.view_top, self.view_left
+        if full_redraw:
+            if hasattr(engine, 'get_cells_in'):
+                cells = engine.get_cells_in(top, left, top + view_rows - 1, left + view_cols - 1)
+            else:
+                cells = engine.get_cells()
+            area = pygame.Rect(0, 0, view_cols * cell_edge_size, view_rows * cell_edge_size)
+            self.game.screen.fill(self.game.dead_cell_color, area)
+            in_board = self.draw_cells(cells, self.game.alive_cell_color, cell_edge_size)
+        else:
+            born, died = engines.merge_changes(changes)
+            in_board = self.draw_cells(born.tolist(), self.game.alive_cell_color, cell_edge_size) + \
+                self.draw_cells(died.tolist(), self.game.dead_cell_color, cell_edge_size)
+        self.set_dirty_rects(in_board, cell_edge_size, full_redraw)
 
+    def draw_cells(self, cells, color, cell_edge_size):
+        """
+        Draw the board cells inside the viewport in the given color.
+        Returns them in screen grid coordinates, (1, 1) is the viewport's top left cell.
         """
-        if self.game.bacteria_mode:
-            over_population_limit = 4
+        cell_edge_size, view_rows, view_cols = self.view_size(cell_edge_size)
+        top, left = self.view_top, self.view_left
+        screen = self.game.screen
+        in_board = []
+        for row, col in cells:
+            row, col = row - top + 1, col - left + 1
+            if 1 <= row <= view_rows and 1 <= col <= view_cols:
+                square = pygame.Rect((col - 1) * cell_edge_size, (row - 1) * cell_edge_size,
+                                     cell_edge_size, cell_edge_size)
+                pygame.draw.rect(screen, color, square)
+                in_board.append((row, col))
+        return in_board
+
+    def draw_framebuffer(self, cell_edge_size, full_redraw=True):
+        """ Draw the board with the framebuffer renderer, a single blit """
+        num_of_rows, num_of_cols = self.game.num_of_rows, self.game.num_of_cols
+        if self.framebuffer is None or not self.framebuffer.fits(num_of_rows, num_of_cols, cell_edge_size):
+            self.framebuffer = renderer.FramebufferRenderer(num_of_rows, num_of_cols, cell_edge_size,
+                                                            self.game.alive_cell_color, self.game.dead_cell_color)
+        region = self.simulation.active_region()
+        draw_region = engines.union_bounds(region, self.drawn_region)
+        self.drawn_region = region
+        if full_redraw:
+            changed = self.framebuffer.draw(self.simulation.engine.get_array(), self.game.screen)
+        elif draw_region is None and self.framebuffer.prev_board is not None:
+            # the board was and is empty
+            changed = []
         else:
-            over_population_limit = 3
-        for row in range(1, self.game.num_of_rows + 1):
-            for col in range(1, self.game.num_of_cols + 1):
-                curr_cell = self.grid[row][col]
-                adj_list = [self.grid[row-1][col-1], self.grid[row-1][col], self.grid[row-1][col+1],
-                            self.grid[row][col-1], self.grid[row][col+1], self.grid[row+1][col-1],
-                            self.grid[row+1][col], self.grid[row+1][col+1]]
-
-                # act upon adj_list
-                adj_live_count = 0
-                for cell in adj_list:
-                    if cell.alive:
-                        adj_live_count += 1
-
-                if curr_cell.alive:
-                    if adj_live_count < 2:
-                        curr_cell.alive_next_round = False  # loneliness
-                    elif adj_live_count > over_population_limit:
-                        curr_cell.alive_next_round = False  # overpopulation
-                    else:
-                        curr_cell.alive_next_round = True  # same same
-                else:
-                    if adj_live_count == 3:
-                        curr_cell.alive_next_round = True  # A cell is born
-                    else:
-                        curr_cell.alive_next_round = False  # same same
+            changed = self.framebuffer.draw(self.simulation.engine.get_array(), self.game.screen, draw_region)
+        self.set_dirty_rects(changed, cell_edge_size, full_redraw or changed is None)
+
+    def set_palette(self, alive_color, dead_color):
+        """ Change the colors of the board, constant time. The next draw_grid redraws every cell """
+        if self.framebuffer is not None:
+            self.framebuffer.set_palette(alive_color, dead_color)
+        self.full_redraw = True
+
+    def set_dirty_rects(self, changed, cell_edge_size, full_redraw):
+        """
+        Merge the changed cells into screen rectangles:
+        runs of neighbouring cells in a row, then equal runs in following rows.
+        """
+        if full_redraw:
+            _, view_rows, view_cols = self.view_size(cell_edge_size)
+            self.dirty_rects = [pygame.Rect(0, 0, view_cols * cell_edge_size, view_rows * cell_edge_size)]
+            return
+        runs = []
+        for row, col in sorted(changed):
+            if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+                runs[-1][2] = col
+            else:
+                runs.append([row, col, col])
+        open_rects = {}  # (first col, last col) -> [rect, last row]
+        rects = []
+        for row, first_col, last_col in runs:
+            open_rect = open_rects.get((first_col, last_col))
+            if open_rect is not None and open_rect[1] == row - 1:
+                open_rect[0].height += cell_edge_size
+                open_rect[1] = row
+            else:
+                rect = pygame.Rect((first_col - 1) * cell_edge_size, (row - 1) * cell_edge_size,
+                                   (last_col - first_col + 1) * cell_edge_size, cell_edge_size)
+                open_rects[(first_col, last_col)] = [rect, row]
+                rects.append(rect)
+        self.dirty_rects = rects
+
+    def current_rule(self):
+        """ The B/S name of the rule the game is played with, bacteria mode overrides the game's rule """
+        return BACTERIA_RULE if self.game.bacteria_mode else self.game.rule
+
+    def update_grid(self):
+        """ Apply the game's rule to the grid, one generation """
+        self.simulation.set_rule(self.current_rule())
+        self.simulation.auto_sparse = self.game.auto_sparse
+        self.simulation.step()
 
     def random_middle_start(self):
         """ Choose cells randomly inside a square in the middle of the board.
             Resurrect them.
         """
-        start_area_left = (self.game.num_of_cols // 2) - (self.game.start_area_edge // 2)
-        start_area_top = (self.game.num_of_rows // 2) - (self.game.start_area_edge // 2)
-        curr_run = []
-        right_bound = start_area_left + self.game.start_area_edge
-        down_bound = start_area_top + self.game.start_area_edge
-        for col in range(start_area_left, right_bound):
-            for row in range(start_area_top, down_bound):
-                if random.random() < self.game.life_chance_for_random_start:
-                    curr_run.append((row, col))
-        self.set_start_cells(curr_run)
-        return curr_run
+        return self.simulation.random_middle_start(self.game.start_area_edge, self.game.life_chance_for_random_start)
 
     def set_start_cells(self, coordinate_arr):
         """Resurrect cells in given coordinates """
-        for coordinate in coordinate_arr:
-            self.grid[coordinate[0]][coordinate[1]].live()
-
-
-
+        self.simulation.set_cells(coordinate_arr)
+
+    def load_run(self, coordinate_arr):
+        """ Load the start cells of a run, straight into the sparse engine if they are few """
+        self.simulation.engine_name = self.game.engine_name
+        self.simulation.load_run(coordinate_arr)
+
+    def load_pattern(self, path):
+        """ Load a .rle or .cells pattern file, on a grid of the pattern's cell size """
+        with patterns.PatternFile(path) as pattern:
+            cell_size = pattern.cell_size
+        if cell_size and cell_size != self.game.cell_size:
+            self.new_grid(cell_size)
+        self.simulation.engine_name = self.game.engine_name
+        return self.simulation.load_pattern(path, fit_cell_size=False)
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.simulation.clear()
@@ -1,16 +1,26 @@
 
-""" The main script of the game """
+""" The main script of the game
 
+python "The Game Of Life.py" --startup-report prints how long the startup took, see startup.py
+"""
+
+# first, its import starts the startup clock
+import startup
+import multiprocessing
 import game
+startup.mark('imports')
 
 
-game = game.Game()
-game.running = True
-while game.running:
-    res = game.curr_menu.display_menu()
-    if res == -1:
-        game.quit()
-        break
-    elif game.playing:
-        game.game_loop()
-        game.reset_game()
+if __name__ == '__main__':
+    # worker processes of the tiled engine and the recorder import this script, they must not start a game
+    multiprocessing.freeze_support()
+    game = game.Game()
+    game.running = True
+    while game.running:
+        res = game.curr_menu.display_menu()
+        if res == -1:
+            game.quit()
+            break
+        elif game.playing:
+            game.game_loop()
+            game.reset_game()
@@ -0,0 +1,175 @@
+""" Search random seeds for long lived runs, on all cores
+
+Every seed is a random middle start, as in a Random Run of the game, with
+the given area edge, spawn chance and rule. The seeds are
+simulated without a display in a process pool and ranked, the best ones
+are written to the run library.
+
+The seeds are drawn from a recorded RNG seed, so a search can be repeated.
+A single seed is reproduced with run_headless.py:
+    python run_headless.py --random-seed SEED --area-edge EDGE --chance CHANCE
+
+Examples:
+    python batch_search.py --seeds 5000 --rank-by lifespan --top 10
+    python batch_search.py --seeds 2000 --bacteria --rank-by peak_population --rng-seed 42 --no-save
+    python batch_search.py --seeds 2000 --rule B36/S23
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+from config import *
+import engines
+import log_cool_runs as lcr
+import rules
+from simulation import Simulation
+
+METRICS = ('lifespan', 'peak_population', 'final_population')
+
+
+def make_seeds(rng_seed, num_of_seeds):
+    """ The seeds of a search, drawn from rng_seed """
+    rng = random.Random(rng_seed)
+    return [rng.getrandbits(32) for _ in range(num_of_seeds)]
+
+
+def start_run(seed, params):
+    """ The Simulation of a seed and its start cells (curr_run) """
+    simulation = Simulation.for_cell_size(params['cell_size'], engine_name=params['engine'],
+                                          rule=params['rule'], cycle_action='stop')
+    curr_run = simulation.random_middle_start(params['start_area_edge'], params['life_chance'], random.Random(seed))
+    return simulation, curr_run
+
+
+def simulate_seed(seed, params):
+    """
+    Run a seed until its board repeats itself (a cycle, or dying out) or for params['generations'].
+    The lifespan is the first generation of the cycle, or params['generations'] if there is none.
+    """
+    simulation, curr_run = start_run(seed, params)
+    peak_population = simulation.population()
+    for _ in range(params['generations']):
+        simulation.step()
+        peak_population = max(peak_population, simulation.population())
+        if simulation.ended:
+            break
+    cycle = simulation.cycle_info()
+    return {
+        'seed': seed,
+        'lifespan': cycle['start'] if cycle else simulation.generation,
+        'period': cycle['period'] if cycle else None,
+        'peak_population': peak_population,
+        'final_population': simulation.population(),
+        'start_population': len(curr_run),
+    }
+
+
+def simulate_chunk(seeds, params):
+    """ Simulate a chunk of seeds in a worker, only the results are sent back """
+    return [simulate_seed(seed, params) for seed in seeds]
+
+
+def search(seeds, params, workers=None, chunk_size=None):
+    """ Simulate every seed across a pool of workers, the results are in seed order """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # a few chunks per worker keeps them all busy to the end
+        chunk_size = max(1, math.ceil(len(seeds) / (workers * 4)))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    if workers == 1:
+        return [result for chunk in chunks for result in simulate_chunk(chunk, params)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for chunk_results in pool.map(simulate_chunk, chunks, [params] * len(chunks))
+                for result in chunk_results]
+
+
+def rank(results, metric, top):
+    """ The top results by metric, ties go to the earlier seed """
+    return sorted(results, key=lambda result: -result[metric])[:top]
+
+
+def save_runs(ranked, params):
+    """ Write the ranked seeds to the run library, returns the names given """
+    runs = []
+    for result in ranked:
+        name = 'seed {}'.format(result['seed'])
+        if lcr.check_name_exists(name):
+            continue
+        _, curr_run = start_run(result['seed'], params)
+        runs.append((curr_run, name, params['cell_size'], params['rule']))
+    if runs:
+        lcr.log_runs(runs)
+    return [name for _, name, _, _ in runs]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search random seeds for long lived runs.")
+    parser.add_argument('--seeds', type=int, default=1000, help="number of seeds to simulate")
+    parser.add_argument('--rng-seed', type=int, help="seed the seeds are drawn from, random if not given")
+    parser.add_argument('--generations', type=int, default=2000, help="longest run simulated per seed")
+    parser.add_argument('--area-edge', type=int, default=START_AREA_EDGE, help="random start square edge")
+    parser.add_argument('--chance', type=float, default=CHANCE, help="random start spawn chance")
+    parser.add_argument('--rule', default=RULE, help="Life-like rule in B/S notation, for example B36/S23")
+    parser.add_argument('--bacteria', action='store_true', help="bacteria mode, the rule " + BACTERIA_RULE)
+    parser.add_argument('--cell-size', type=int, default=CELL_EDGE_SIZE, help="board size as in the game")
+    parser.add_argument('--engine', choices=engines.ENGINE_NAMES, default='numpy', help="stepping engine")
+    parser.add_argument('--rank-by', choices=METRICS, default='lifespan')
+    parser.add_argument('--top', type=int, default=10, help="number of runs written to the run library")
+    parser.add_argument('--workers', type=int, help="worker processes, all cores if not given")
+    parser.add_argument('--chunk-size', type=int, help="seeds sent to a worker at a time")
+    parser.add_argument('--no-save', action='store_true', help="do not write to the run library")
+    parser.add_argument('--output', help="write every result to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        rule = rules.get_rule(BACTERIA_RULE if args.bacteria else args.rule)
+    except ValueError as e:
+        print(e)
+        return 2
+    rng_seed = args.rng_seed if args.rng_seed is not None else random.SystemRandom().getrandbits(32)
+    params = {
+        'cell_size': args.cell_size,
+        'start_area_edge': args.area_edge,
+        'life_chance': args.chance,
+        'rule': rule.name,
+        'generations': args.generations,
+        'engine': args.engine,
+    }
+    seeds = make_seeds(rng_seed, args.seeds)
+    print("rng seed {}, {} seeds, rule {}".format(rng_seed, len(seeds), rule.name))
+
+    start = time.perf_counter()
+    results = search(seeds, params, args.workers, args.chunk_size)
+    seconds = time.perf_counter() - start
+    print("{:.1f} s, {:.1f} seeds/sec".format(seconds, len(seeds) / seconds if seconds else float('inf')))
+
+    ranked = rank(results, args.rank_by, args.top)
+    print("{:>12} {:>9} {:>7} {:>6} {:>6}".format('seed', 'lifespan', 'period', 'peak', 'final'))
+    for result in ranked:
+        print("{:>12} {:>9} {:>7} {:>6} {:>6}".format(result['seed'], result['lifespan'], result['period'] or '-',
+                                                     result['peak_population'], result['final_population']))
+    status = 0
+    if not args.no_save:
+        try:
+            names = save_runs(ranked, params)
+            print("{} runs written to the run library".format(len(names)))
+        except OSError as e:
+            print("runs not written to the run library: {}".format(e))
+            status = 1
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rng_seed': rng_seed, 'params': params, 'seconds': seconds, 'results': results}, f, indent=1)
+        print("results written to {}".format(args.output))
+    return status
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,292 @@
+""" Benchmark suite for stepping, rendering, run library I/O and startup
+
+Every case is run the same way each time, results are written as JSON
+so runs can be compared over time. Every engine in engines.ENGINE_NAMES
+is benchmarked on the same cases.
+
+Examples:
+    python benchmark.py --output before.json
+    python benchmark.py --quick --groups step draw --output after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import numpy as np
+import openpyxl
+import pygame
+from config import *
+import Cell
+import engines
+import log_cool_runs as lcr
+from simulation import Simulation
+
+CELL_SIZES = (10, 20, 30)
+DENSITIES = (0.02, 0.1, 0.35)
+AREA_EDGES = (20, 35, 60)
+LIBRARY_SIZES = (10, 100, 1000)
+RUN_LENGTH = 100  # cells per run in generated run libraries
+
+
+class BenchGame:
+    """ The attributes of Game that CellGrid needs, drawing to an offscreen surface """
+    def __init__(self, cell_size, engine_name, renderer_name='rects', dirty_rendering=False):
+        self.screen_w, self.screen_h = SCREEN_W, SCREEN_H
+        self.screen = pygame.Surface((SCREEN_W, SCREEN_H))
+        self.cell_size = cell_size
+        self.num_of_cols, self.num_of_rows = SCREEN_W // cell_size, SCREEN_H // cell_size
+        self.alive_cell_color, self.dead_cell_color = YELLOW, DARKER_PURPLE
+        self.bacteria_mode = False
+        self.rule = RULE
+        self.engine_name = engine_name
+        self.auto_sparse = False
+        self.dirty_rendering = dirty_rendering
+        self.renderer_name = renderer_name
+
+
+def random_cells(num_of_rows, num_of_cols, density, seed=0):
+    """ A reproducible random fill of the board interior """
+    rng = random.Random(seed)
+    return [(row, col) for row in range(1, num_of_rows + 1) for col in range(1, num_of_cols + 1)
+            if rng.random() < density]
+
+
+def measure(func, repeat, setup=None):
+    """ Time func repeat times, setup (untimed) before each. Returns the list of seconds """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def result(group, case, params, times, per=1, unit='call'):
+    """ A JSON result entry, times are seconds per unit """
+    times = [t / per for t in times]
+    return {'group': group, 'case': case, 'params': params, 'unit': unit,
+            'min': min(times), 'median': statistics.median(times), 'seconds': times}
+
+
+# ---- benchmark groups ----
+
+def bench_step(args):
+    """ Simulation.step for every engine, without cycle detection or history so only the engine step is timed """
+    results = []
+    for engine_name in args.engines:
+        for cell_size in CELL_SIZES:
+            for density in DENSITIES:
+                for rule in (RULE, BACTERIA_RULE):
+                    simulation = Simulation.for_cell_size(cell_size, engine_name=engine_name, rule=rule,
+                                                          auto_sparse=False, cycle_action=None, keep_history=False)
+                    cells = random_cells(simulation.num_of_rows, simulation.num_of_cols, density)
+
+                    def setup():
+                        simulation.clear()
+                        simulation.set_cells(cells)
+
+                    times = measure(lambda: simulation.step(args.generations), args.repeat, setup)
+                    case = 'step/{}/{}x{}/d{}{}'.format(engine_name, simulation.num_of_rows, simulation.num_of_cols,
+                                                       density, '/bacteria' if rule == BACTERIA_RULE else '')
+                    params = {'engine': engine_name, 'cell_size': cell_size, 'density': density,
+                              'rule': rule}
+                    results.append(result('step', case, params, times, args.generations, 'generation'))
+                    print_result(results[-1])
+    return results
+
+
+def bench_draw(args):
+    """ CellGrid.draw_grid into an offscreen surface, for every renderer and engine """
+    results = []
+    for renderer_name, dirty_rendering in (('rects', False), ('rects', True), ('framebuffer', True)):
+        for engine_name in args.engines:
+            for cell_size in CELL_SIZES:
+                density = 0.1
+                game = BenchGame(cell_size, engine_name, renderer_name, dirty_rendering)
+                cell_grid = Cell.CellGrid(game)
+                cell_grid.set_start_cells(random_cells(game.num_of_rows, game.num_of_cols, density))
+                cell_grid.draw_grid(cell_size)
+                # each draw shows one new generation
+                times = measure(lambda: cell_grid.draw_grid(cell_size), args.repeat * 3, cell_grid.update_grid)
+                case = 'draw/{}{}/{}/{}x{}'.format(renderer_name, '-dirty' if dirty_rendering else '', engine_name,
+                                                   game.num_of_rows, game.num_of_cols)
+                params = {'renderer': renderer_name, 'dirty_rendering': dirty_rendering, 'engine': engine_name,
+                          'cell_size': cell_size, 'density': density}
+                results.append(result('draw', case, params, times, unit='frame'))
+                print_result(results[-1])
+    return results
+
+
+def bench_random_start(args):
+    """ Simulation.random_middle_start, the work behind CellGrid.random_middle_start """
+    results = []
+    for area_edge in AREA_EDGES:
+        simulation = Simulation.for_cell_size(CELL_EDGE_SIZE, engine_name='numpy', auto_sparse=False)
+        random.seed(0)
+        times = measure(lambda: simulation.random_middle_start(area_edge, CHANCE), args.repeat * 10, simulation.clear)
+        params = {'area_edge': area_edge, 'chance': CHANCE}
+        results.append(result('random_start', 'random_start/edge{}'.format(area_edge), params, times))
+        print_result(results[-1])
+    return results
+
+
+def make_library(file, num_of_runs, seed=0):
+    """ Write a run library of num_of_runs runs in the log_run format """
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = 'Sheet1'
+    ws.append(['seed name', 'cell size', 'cell list'])
+    for i in range(num_of_runs):
+        cells = ['{},{}'.format(rng.randrange(1, 109), rng.randrange(1, 193)) for _ in range(RUN_LENGTH)]
+        ws.append(['run {}'.format(i), CELL_EDGE_SIZE] + cells + [-1])
+    wb.save(file)
+
+
+def bench_library(args):
+    """ The log_cool_runs functions on run libraries of different sizes, for both backends """
+    results = []
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for num_of_runs in args.library_sizes:
+            xlsx_file = os.path.join(tmp_dir, 'runs_{}.xlsx'.format(num_of_runs))
+            make_library(xlsx_file, num_of_runs)
+            sqlite_file = os.path.join(tmp_dir, 'runs_{}.db'.format(num_of_runs))
+            lcr.SqliteRunLibrary(sqlite_file, migrate_from=xlsx_file).close()
+            for backend, file in (('xlsx', xlsx_file), ('sqlite', sqlite_file)):
+                last_name = 'run {}'.format(num_of_runs - 1)
+                new_run = random_cells(108, 192, 0.005)
+                repeat = max(1, args.repeat if num_of_runs < 1000 else args.repeat // 2)
+                cases = (
+                    ('get_run_arr_by_name', lambda: lcr.get_run_arr_by_name(last_name, file=file)),
+                    ('check_name_exists', lambda: lcr.check_name_exists('no such run', file=file)),
+                    ('get_name_by_index', lambda: lcr.get_name_by_index(num_of_runs + 1, file=file)),
+                    ('log_run', lambda: lcr.log_run(new_run, 'new run', CELL_EDGE_SIZE, file=file)),
+                    ('log_runs_10', lambda: lcr.log_runs([(new_run, 'new run', CELL_EDGE_SIZE, RULE)] * 10, file=file)),
+                )
+                for func_name, func in cases:
+                    # the first call opens the library and loads it, the timed ones find it cached
+                    func()
+                    times = measure(func, repeat)
+                    params = {'function': func_name, 'library_size': num_of_runs, 'backend': backend}
+                    case = 'library/{}/{}/{}'.format(backend, func_name, num_of_runs)
+                    results.append(result('library', case, params, times))
+                    print_result(results[-1])
+            lcr.get_library(sqlite_file).close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+# the game up to its first frame, in a fresh interpreter so nothing is imported yet
+STARTUP_SCRIPT = """
+import json
+import startup
+import game
+startup.mark('imports')
+g = game.Game()
+g.curr_menu.blit_screen()
+print(json.dumps(startup.timings()))
+"""
+
+
+def bench_startup(args):
+    """ Time to the first frame of the game, by startup step, and of the whole process """
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    steps, process_times = {}, []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], env=env, capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        process_times.append(time.perf_counter() - start)
+        for step, ms in json.loads(output.splitlines()[-1]).items():
+            steps.setdefault(step, []).append(ms / 1000)
+    results = []
+    for step, times in list(steps.items()) + [('process', process_times)]:
+        results.append(result('startup', 'startup/{}'.format(step), {'step': step}, times))
+        print_result(results[-1])
+    return results
+
+
+GROUPS = {
+    'step': bench_step,
+    'draw': bench_draw,
+    'random_start': bench_random_start,
+    'library': bench_library,
+    'startup': bench_startup,
+}
+
+
+# ---- reporting ----
+
+def print_result(entry):
+    print("{:<55} {:>12.3f} ms/{}".format(entry['case'], entry['median'] * 1000, entry['unit']))
+
+
+def compare(results, old_file):
+    """ Print the speedup of every case found in an older results file """
+    with open(old_file) as f:
+        old = {entry['case']: entry for entry in json.load(f)['results']}
+    print("\nCompared with {}:".format(old_file))
+    for entry in results:
+        if entry['case'] in old:
+            speedup = old[entry['case']]['median'] / entry['median'] if entry['median'] else float('inf')
+            print("{:<55} {:>8.2f}x".format(entry['case'], speedup))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark stepping, rendering, run library I/O and startup.")
+    parser.add_argument('--groups', nargs='+', choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument('--engines', nargs='+', choices=engines.ENGINE_NAMES, default=engines.ENGINE_NAMES)
+    parser.add_argument('--output', default='bench_results.json', help="JSON results file")
+    parser.add_argument('--compare', help="an older JSON results file to compare with")
+    parser.add_argument('--quick', action='store_true', help="fewer repeats and a smaller run library")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.repeat = 2 if args.quick else 5
+    args.generations = 5 if args.quick else 20
+    args.library_sizes = LIBRARY_SIZES[:2] if args.quick else LIBRARY_SIZES
+    pygame.init()
+
+    results = []
+    for group in args.groups:
+        print("---- {} ----".format(group))
+        results += GROUPS[group](args)
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'openpyxl': openpyxl.__version__,
+            'quick': args.quick,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print("\nResults written to {}".format(args.output))
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
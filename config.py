@@ -22,7 +22,15 @@ MUSTARD = (204, 204, 0)
 TEXTCOLOR = (255, 255, 255)
 
 # display
+SCREEN_W = 1920
+SCREEN_H = 1080
 DEFAULT_FONT = 'assets/Classic Robot Bold.otf'
+ICON_IMAGE = 'assets/virus_red.png'
+BACTERIA_IMAGE = 'assets/virus_red.png'  # the main menu's bacteria mode switch
+REVERSE_IMAGE = 'assets/reverse.png'
+MENU_IMAGE_SIZE = 50
+FONT_CACHE_SIZE = 16
+TEXT_CACHE_SIZE = 256
 
 # game
 CELL_EDGE_SIZE = 10
@@ -31,7 +39,44 @@ DEFAULT_CURSOR_X_OFFSET = -80
 SPEED_INDEX = 3
 CHANCE = 0.9
 ROUND_TIME = 0.05
-LOOP = False
+FRAME_TIME = 1 / 60
+MAX_GENERATIONS_PER_FRAME = 8
+ENGINE = 'classic'  # 'classic' or a name from engines.ENGINES
+RULE = 'B3/S23'  # Life-like rule in B/S notation, see rules.py
+BACTERIA_RULE = 'B3/S234'  # the rule of bacteria mode
+RULES = ['B3/S23', 'B36/S23', 'B3/S234', 'B3678/S34678', 'B368/S245', 'B3/S12345', 'B2/S', 'B1357/S1357']  # setup menu
+AUTO_SPARSE = True  # switch to the sparse engine on low density boards
+SPARSE_DENSITY = 0.02
+DIRTY_RENDERING = True  # redraw only the cells that changed
+RENDERER = 'rects'  # 'rects' or 'framebuffer'
+TILED_WORKERS = None  # worker processes of the tiled engine, None for one per core
+MIN_VIEW_CELL_SIZE = 1  # zoom limits of the viewport
+MAX_VIEW_CELL_SIZE = 80
+VIEW_ZOOM_FACTOR = 1.25
+CHUNK_SIZE = 64  # cells per side of a chunk of the unbounded engine
+HASHLIFE_MAX_NODES = 1000000  # node table + result cache entries, roughly 250 bytes each
+CYCLE_ACTION = 'replay'  # on a repeated board: 'replay', 'stop', 'report' or None to not look for cycles
+CYCLE_TABLE_SIZE = 4096  # generations remembered by hash
+CYCLE_REPLAY_PERIOD = 64  # longest cycle kept for replay
+HISTORY = True  # keep a rewind history of the game, see history.py
+HISTORY_KEYFRAME_INTERVAL = 32  # generations between full boards, the most replayed on a rewind
+HISTORY_MAX_BYTES = 64 * 1024 * 1024  # the oldest generations are evicted past this
+HISTORY_SCRUB_STEP = 10  # generations moved by [ and ] while paused
+RECORD_FORMAT = 'gif'  # recordings of the game, 'gif' or 'png' for a directory of frames
+RECORD_DIR = 'recordings'
+RECORD_SCALE = 2  # pixels per cell edge in a recording
+RECORD_QUEUE_SIZE = 64  # frames waiting for the writer, the game drops frames past this
+PROFILE = False  # show the profiling HUD from the start, F3 toggles it
+PROFILE_WINDOW = 240  # frames the frame time percentiles are taken over
+PROFILE_HUD_INTERVAL = 0.5  # seconds between updates of the HUD
+PROFILE_TRACE_EVENTS = 200000  # trace events kept, the oldest are dropped past this
+TRACE_DIR = 'traces'  # F4 starts a trace, F4 again writes it here
+RUN_LIBRARY_BACKEND = 'xlsx'  # 'xlsx' or 'sqlite', the sqlite library is migrated from the xlsx once
+RUN_LIBRARY_BATCH_SIZE = 1  # runs written per sqlite transaction, outside of batch()
+RUN_SAVE_RETRIES = 3  # tries of a run save that fails to write, the file may be open in another program
+RUN_SAVE_RETRY_DELAY = 1.0  # seconds between the tries
+SAVE_MESSAGE_TIME = 3  # seconds the result of a save is shown for
+STARTUP_REPORT = False  # print the startup timing once the first frame is shown, see startup.py
 DEBUG = False
 
 
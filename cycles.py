@@ -0,0 +1,124 @@
+""" Cycle and still life detection for a stepped board """
+
+from collections import deque
+import numpy as np
+from config import CYCLE_TABLE_SIZE, CYCLE_REPLAY_PERIOD
+import engines
+
+# random 64 bit key of every cell, one table per board shape
+_zobrist_keys = {}
+
+
+def zobrist_keys(shape):
+    """ The (fixed seed) random uint64 key of every cell of a board interior of the given shape """
+    keys = _zobrist_keys.get(shape)
+    if keys is None:
+        rng = np.random.default_rng(0)
+        keys = _zobrist_keys[shape] = rng.integers(0, 1 << 64, size=shape[0] * shape[1], dtype=np.uint64)
+    return keys
+
+
+class CycleDetector:
+    """
+    A Cycle Detector class. Hashes every board state it is given and
+    reports when a state repeats: a still life has period 1, a blinker 2.
+
+    The hash of a board is the XOR of the keys of its living cells (Zobrist
+    hashing), so it is updated with the keys of the cells that changed
+    since the previous generation only, as the engine reports them
+    (see step_changes in engines.py). The board itself is never scanned.
+
+    Important attributes:
+    --------------------
+
+    self.seen:
+        hash -> generation, for the last self.table_size generations.
+
+    self.changes:
+        The (born, died) cells of each of the last self.replay_period generations,
+        (n, 2) arrays of padded (row, col).
+
+    self.cycle_start, self.period, self.detected_at:
+        The first generation of the cycle, its length in generations and the
+        generation it was found on. None until a state repeats.
+
+    self.replay:
+        The (born, died) cell lists of every generation of the cycle, in
+        padded (row, col) coordinates. Empty if the period is longer than
+        self.replay_period.
+
+    """
+    def __init__(self, table_size=CYCLE_TABLE_SIZE, replay_period=CYCLE_REPLAY_PERIOD):
+        """ Initialize the CycleDetector object """
+        self.table_size = table_size
+        self.replay_period = replay_period
+        self.reset()
+
+    def reset(self):
+        """ Forget every state, for a new or edited board """
+        self.hash = None
+        self.keys = None
+        self.num_of_cols = None
+        self.seen = {}
+        self.order = deque()
+        self.changes = deque(maxlen=self.replay_period)
+        self.cycle_start, self.period, self.detected_at = None, None, None
+        self.replay = []
+
+    def cell_keys(self, cells):
+        """ The XOR of the keys of an (n, 2) array of padded (row, col) cells """
+        return np.bitwise_xor.reduce(self.keys[(cells[:, 0] - 1) * self.num_of_cols + cells[:, 1] - 1])
+
+    def start(self, cells, shape, generation):
+        """
+        Hash the living (row, col) cells of a board interior of the given (num_of_rows, num_of_cols) shape,
+        the first state of the board. Returns True when it repeats an earlier state, like update.
+        """
+        if self.period is not None:
+            return False
+        self.keys = zobrist_keys(shape)
+        self.num_of_cols = shape[1]
+        cells = engines.cells_array(cells)
+        # cells left in the padding ring are never stepped, they are not part of the state
+        interior = ((cells[:, 0] >= 1) & (cells[:, 0] <= shape[0]) &
+                    (cells[:, 1] >= 1) & (cells[:, 1] <= shape[1]))
+        self.hash = self.cell_keys(cells[interior])
+        self.changes.clear()
+        return self.check(generation)
+
+    def update(self, born, died, generation):
+        """
+        Hash the given generation from the cells born and died in the step to it.
+        Returns True when it repeats an earlier state, the cycle attributes are set then.
+        """
+        if self.period is not None:
+            return False
+        self.hash ^= self.cell_keys(born) ^ self.cell_keys(died)
+        self.changes.append((born, died))
+        return self.check(generation)
+
+    def check(self, generation):
+        """ Look the current hash up, remember it for the given generation if it is new """
+        start = self.seen.get(self.hash)
+        if start is not None:
+            self.cycle_start, self.period, self.detected_at = start, generation - start, generation
+            if self.period <= len(self.changes):
+                self.replay = [(list(map(tuple, born.tolist())), list(map(tuple, died.tolist())))
+                               for born, died in list(self.changes)[-self.period:]]
+            return True
+        self.seen[self.hash] = generation
+        self.order.append(self.hash)
+        if len(self.order) > self.table_size:
+            del self.seen[self.order.popleft()]
+        return False
+
+    def replay_changes(self, generation):
+        """ The (born, died) cells that lead to the given generation, past self.detected_at """
+        return self.replay[(generation - self.detected_at - 1) % self.period]
+
+    def info(self):
+        """ The cycle as a dict, None if no state repeated yet """
+        if self.period is None:
+            return None
+        return {'start': self.cycle_start, 'period': self.period, 'detected_at': self.detected_at,
+                'cached': bool(self.replay)}
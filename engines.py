@@ -0,0 +1,682 @@
+""" Alternative stepping engines for the cell grid """
+
+import itertools
+import numpy as np
+from config import CHUNK_SIZE
+from rules import LIFE
+
+# number of set bits in every byte value
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+NO_CELLS = np.zeros((0, 2), dtype=np.int64)
+NO_CHANGES = (NO_CELLS, NO_CELLS)
+
+
+def array_bounds(board, top=0, left=0):
+    """
+    The (top, left, bottom, right) of the nonzero cells of a 2-D array, inclusive,
+    with (top, left) the coordinates of board[0, 0]. None if there are none.
+    """
+    rows = np.flatnonzero(board.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(board.any(axis=0))
+    return top + int(rows[0]), left + int(cols[0]), top + int(rows[-1]), left + int(cols[-1])
+
+
+def extend_bounds(bounds, coordinate_arr):
+    """ bounds grown to take in every (row, col) of coordinate_arr, returns (bounds, list of the coordinates) """
+    coordinate_arr = list(coordinate_arr)
+    if not coordinate_arr:
+        return bounds, coordinate_arr
+    rows = [coordinate[0] for coordinate in coordinate_arr]
+    cols = [coordinate[1] for coordinate in coordinate_arr]
+    top, left, bottom, right = min(rows), min(cols), max(rows), max(cols)
+    if bounds is not None:
+        top, left = min(top, bounds[0]), min(left, bounds[1])
+        bottom, right = max(bottom, bounds[2]), max(right, bounds[3])
+    return (top, left, bottom, right), coordinate_arr
+
+
+def union_bounds(bounds, other):
+    """ The box that holds both (top, left, bottom, right) boxes, either may be None """
+    if bounds is None:
+        return other
+    if other is None:
+        return bounds
+    return (min(bounds[0], other[0]), min(bounds[1], other[1]),
+            max(bounds[2], other[2]), max(bounds[3], other[3]))
+
+
+def cells_array(coordinate_arr):
+    """ (row, col) pairs as an (n, 2) int64 array """
+    if isinstance(coordinate_arr, np.ndarray):
+        return coordinate_arr
+    return np.array(coordinate_arr, dtype=np.int64).reshape(-1, 2)
+
+
+def window_changes(old, new, top=0, left=0):
+    """
+    The (born, died) cells between two equally shaped windows of a board, each an
+    (n, 2) array of (row, col), with (top, left) the coordinates of window[0, 0].
+    """
+    rows, cols = np.divmod(np.flatnonzero(old != new), old.shape[1])
+    if not len(rows):
+        return NO_CHANGES
+    born = new[rows, cols] != 0
+    cells = np.stack((rows + top, cols + left), axis=1)
+    return cells[born], cells[~born]
+
+
+def merge_changes(changes):
+    """
+    The net (born, died) cells of a run of generations, from the (born, died) of each one
+    in order. The last generation that changed a cell decides, a cell born and died
+    again is in died.
+    """
+    if len(changes) == 1:
+        born, died = changes[0]
+        return cells_array(born), cells_array(died)
+    arrays = [cells_array(cells) for born_died in changes for cells in born_died]
+    cells = np.concatenate(arrays) if arrays else NO_CELLS
+    if not len(cells):
+        return NO_CHANGES
+    alive = np.concatenate([np.full(len(array), i % 2 == 0) for i, array in enumerate(arrays)])
+    # the first of a cell in reverse order is its last change
+    _, last = np.unique(cells[::-1], axis=0, return_index=True)
+    last = len(cells) - 1 - last
+    cells, alive = cells[last], alive[last]
+    return cells[alive], cells[~alive]
+
+
+def step_window(bounds, num_of_rows, num_of_cols):
+    """
+    The (first row, first col, last row, last col) of the interior cells that can
+    change in a generation: the bounds of the living cells plus one cell of margin.
+    """
+    top, left, bottom, right = bounds
+    return max(1, top - 1), max(1, left - 1), min(num_of_rows, bottom + 1), min(num_of_cols, right + 1)
+
+
+class NumpyEngine:
+    """
+    A NumPy engine class. Keeps the board as a 2-D uint8 array and
+    computes a whole generation with array-wide neighbour sums.
+
+    Important attributes:
+    --------------------
+
+    self.board:
+        A (num_of_rows + 2) x (num_of_cols + 2) array of 0/1 values.
+        Like the classic board (Cell.CellEngine) it is indexed by (row, col) and has a padding
+        ring that is never stepped.
+
+    self.bounds:
+        The (top, left, bottom, right) box, inclusive, that holds every living
+        cell, None if there are none. Exact after a step, cells killed by
+        kill_cells may leave it larger. Only the box plus one cell of margin
+        is stepped.
+
+    self.last_changes:
+        The (born, died) cells of the last step, see step_changes().
+
+    """
+    def __init__(self, num_of_rows, num_of_cols):
+        """ Initialize the NumpyEngine object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.board = np.zeros((num_of_rows + 2, num_of_cols + 2), dtype=np.uint8)
+        self.bounds = None
+        self.last_changes = NO_CHANGES
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.board.fill(0)
+        self.bounds = None
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        self.bounds, coordinate_arr = extend_bounds(self.bounds, coordinate_arr)
+        for coordinate in coordinate_arr:
+            self.board[coordinate[0], coordinate[1]] = 1
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates """
+        for coordinate in coordinate_arr:
+            self.board[coordinate[0], coordinate[1]] = 0
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells, found inside self.bounds """
+        if self.bounds is None:
+            return []
+        top, left, bottom, right = self.bounds
+        rows, cols = np.nonzero(self.board[top:bottom + 1, left:right + 1])
+        return list(zip((rows + top).tolist(), (cols + left).tolist()))
+
+    def is_alive(self, row, col):
+        return bool(self.board[row, col])
+
+    def population(self):
+        """ Number of living cells """
+        if self.bounds is None:
+            return 0
+        top, left, bottom, right = self.bounds
+        return int(np.count_nonzero(self.board[top:bottom + 1, left:right + 1]))
+
+    def get_array(self):
+        """ Return the board interior as a num_of_rows x num_of_cols uint8 array """
+        return self.board[1:-1, 1:-1]
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none """
+        return self.bounds
+
+    def step_changes(self):
+        """ The (born, died) cells of the last step, (n, 2) arrays of padded (row, col) """
+        return self.last_changes
+
+    def step(self, rule=LIFE):
+        """
+        Apply the rule (a rules.Rule) to the board interior, with a lookup in its table.
+        Same rules as CellGrid.update_grid, the padding ring is left untouched.
+        Only the cells around self.bounds are stepped, the rest stay dead.
+        """
+        if self.bounds is None:
+            self.last_changes = NO_CHANGES
+            return
+        first_row, first_col, last_row, last_col = step_window(self.bounds, self.num_of_rows, self.num_of_cols)
+        b = self.board[first_row - 1:last_row + 2, first_col - 1:last_col + 2]
+        adj_live_count = (b[:-2, :-2] + b[:-2, 1:-1] + b[:-2, 2:] +
+                          b[1:-1, :-2] + b[1:-1, 2:] +
+                          b[2:, :-2] + b[2:, 1:-1] + b[2:, 2:])
+        following = rule.apply(b[1:-1, 1:-1], adj_live_count)
+        self.last_changes = window_changes(b[1:-1, 1:-1], following, first_row, first_col)
+        b[1:-1, 1:-1] = following
+        # every living cell is inside the window and its margin
+        self.bounds = array_bounds(b, first_row - 1, first_col - 1)
+
+
+class BitboardEngine:
+    """
+    A bitboard engine class. Packs 64 cells per uint64 word in each row,
+    bit j of word w holds column 64 * w + j.
+    A generation is computed with bitwise adder logic over shifted rows,
+    so a cell costs one bit of memory.
+
+    Important attributes:
+    --------------------
+
+    self.board:
+        A (num_of_rows + 2) x self.num_of_words array of uint64 words.
+        Indexed by the same padded (row, col) coordinates as Cell.CellEngine.
+
+    self.interior_mask:
+        Per word, the bits of columns 1 to num_of_cols. Only those are stepped,
+        the padding columns keep their value.
+
+    self.row_bounds:
+        The (top, bottom) rows, inclusive, that hold every living cell, None if
+        there are none. Only those rows plus one of margin are stepped.
+
+    self.last_changes:
+        The (born, died) cells of the last step, see step_changes().
+
+    """
+    def __init__(self, num_of_rows, num_of_cols):
+        """ Initialize the BitboardEngine object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.num_of_words = (num_of_cols + 2 + 63) // 64
+        self.board = np.zeros((num_of_rows + 2, self.num_of_words), dtype='<u8')
+        interior = np.zeros(self.num_of_words * 64, dtype=np.uint8)
+        interior[1:num_of_cols + 1] = 1
+        self.interior_mask = np.packbits(interior, bitorder='little').view('<u8')
+        self.row_bounds = None
+        self.last_changes = NO_CHANGES
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.board.fill(0)
+        self.row_bounds = None
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates, in bulk. Any iterable of (row, col) pairs, streamed """
+        coords = np.fromiter(itertools.chain.from_iterable(coordinate_arr), dtype=np.int64).reshape(-1, 2)
+        if not len(coords):
+            return
+        rows, cols = coords[:, 0], coords[:, 1]
+        bits = np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64))
+        np.bitwise_or.at(self.board, (rows, cols >> 6), bits)
+        top, bottom = int(rows.min()), int(rows.max())
+        if self.row_bounds is not None:
+            top, bottom = min(top, self.row_bounds[0]), max(bottom, self.row_bounds[1])
+        self.row_bounds = (top, bottom)
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates, in bulk """
+        coords = np.fromiter(itertools.chain.from_iterable(coordinate_arr), dtype=np.int64).reshape(-1, 2)
+        rows, cols = coords[:, 0], coords[:, 1]
+        bits = np.left_shift(np.uint64(1), (cols & 63).astype(np.uint64))
+        np.bitwise_and.at(self.board, (rows, cols >> 6), ~bits)
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells, in bulk """
+        bits = np.unpackbits(self.board.view(np.uint8), axis=1, bitorder='little')
+        rows, cols = np.nonzero(bits)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def is_alive(self, row, col):
+        return bool((int(self.board[row, col >> 6]) >> (col & 63)) & 1)
+
+    def population(self):
+        """ Number of living cells """
+        return int(_BYTE_POPCOUNT[self.board.view(np.uint8)].sum(dtype=np.int64))
+
+    def get_array(self):
+        """ Return the board interior as a num_of_rows x num_of_cols uint8 array """
+        bits = np.unpackbits(self.board[1:-1].view(np.uint8), axis=1, bitorder='little')
+        return bits[:, 1:self.num_of_cols + 1]
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none """
+        if self.row_bounds is None:
+            return None
+        top, bottom = self.row_bounds
+        words = np.bitwise_or.reduce(self.board[top:bottom + 1], axis=0)
+        cols = np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder='little'))
+        if not len(cols):
+            return None
+        return top, int(cols[0]), bottom, int(cols[-1])
+
+    def step_changes(self):
+        """ The (born, died) cells of the last step, (n, 2) arrays of padded (row, col) """
+        return self.last_changes
+
+    @staticmethod
+    def _word_changes(old, new, top):
+        """ The (born, died) cells between two blocks of rows of words, row 0 of them is board row top """
+        rows, words = np.nonzero(old != new)
+        if not len(rows):
+            return NO_CHANGES
+        # only the words that changed are unpacked, 64 bits each
+        new_words = new[rows, words]
+        bits = np.unpackbits((old[rows, words] ^ new_words).view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+        word_index, bit = np.nonzero(bits)
+        born = ((new_words[word_index] >> bit.astype(np.uint64)) & np.uint64(1)) != 0
+        cells = np.stack((rows[word_index] + top, words[word_index] * 64 + bit), axis=1)
+        return cells[born], cells[~born]
+
+    @staticmethod
+    def _west(rows):
+        """ For every column, the bit of the column to its left """
+        shifted = rows << np.uint64(1)
+        shifted[:, 1:] |= rows[:, :-1] >> np.uint64(63)
+        return shifted
+
+    @staticmethod
+    def _east(rows):
+        """ For every column, the bit of the column to its right """
+        shifted = rows >> np.uint64(1)
+        shifted[:, :-1] |= rows[:, 1:] << np.uint64(63)
+        return shifted
+
+    @staticmethod
+    def _full_add(a, b, c):
+        """ Add three bit planes, returns the (sum, carry) bit planes """
+        a_xor_b = a ^ b
+        return a_xor_b ^ c, (a & b) | (c & a_xor_b)
+
+    @staticmethod
+    def _count_is(count, planes):
+        """ The bits whose 4 bit counter, planes = (count_1, count_2, count_4, count_8), equals count """
+        result = None
+        for bit, plane in enumerate(planes):
+            term = plane if count >> bit & 1 else ~plane
+            result = term if result is None else result & term
+        return result
+
+    def step(self, rule=LIFE):
+        """
+        Apply the rule (a rules.Rule) to the board interior.
+        Same rules as CellGrid.update_grid, the padding ring is left untouched.
+
+        The 8 neighbour planes are summed into a 4 bit counter
+        (count_1, count_2, count_4, count_8) with full adders, then every
+        neighbour count of rule.count_terms sets its cells.
+        Only the rows around self.row_bounds are stepped.
+        """
+        if self.row_bounds is None:
+            self.last_changes = NO_CHANGES
+            return
+        first_row = max(1, self.row_bounds[0] - 1)
+        last_row = min(self.num_of_rows, self.row_bounds[1] + 1)
+        b = self.board[first_row - 1:last_row + 2]
+        up, mid, down = b[:-2], b[1:-1], b[2:]
+        west, east = self._west(b), self._east(b)
+        up_sum, up_carry = self._full_add(west[:-2], up, east[:-2])
+        mid_sum, mid_carry = west[1:-1] ^ east[1:-1], west[1:-1] & east[1:-1]
+        down_sum, down_carry = self._full_add(west[2:], down, east[2:])
+
+        count_1, ones_carry = self._full_add(up_sum, mid_sum, down_sum)
+        twos_sum, twos_carry = self._full_add(up_carry, mid_carry, down_carry)
+        count_2 = twos_sum ^ ones_carry
+        fours_carry = twos_sum & ones_carry
+        count_4 = twos_carry ^ fours_carry
+        count_8 = twos_carry & fours_carry
+
+        planes = (count_1, count_2, count_4, count_8)
+        next_mid = np.zeros_like(mid)
+        for count, born, survives in rule.count_terms:
+            term = self._count_is(count, planes)
+            if not survives:
+                term &= ~mid
+            elif not born:
+                term &= mid
+            next_mid |= term
+        mask = self.interior_mask
+        next_mid = (next_mid & mask) | (mid & ~mask)
+        self.last_changes = self._word_changes(mid, next_mid, first_row)
+        b[1:-1] = next_mid
+        rows = np.flatnonzero(b.any(axis=1))
+        self.row_bounds = (first_row - 1 + int(rows[0]), first_row - 1 + int(rows[-1])) if len(rows) else None
+
+
+class SparseEngine:
+    """
+    A sparse engine class. Stores only the living cells and the neighbour
+    count of every cell next to one, so a generation costs time proportional
+    to the living population and not to the board area.
+
+    Important attributes:
+    --------------------
+
+    self.live:
+        A set of the (row, col) coordinates of the living cells.
+
+    self.neighbour_counts:
+        A dict of (row, col) -> number of living neighbours, for every cell
+        with at least one. Kept up to date on every birth and death.
+
+    self.last_changes:
+        The (born, died) cells of the last step, see step_changes().
+
+    """
+    OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+    def __init__(self, num_of_rows, num_of_cols):
+        """ Initialize the SparseEngine object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.live = set()
+        self.neighbour_counts = {}
+        self.last_changes = NO_CHANGES
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.live.clear()
+        self.neighbour_counts.clear()
+
+    def _add_neighbours(self, row, col, delta):
+        counts = self.neighbour_counts
+        for d_row, d_col in self.OFFSETS:
+            neighbour = (row + d_row, col + d_col)
+            count = counts.get(neighbour, 0) + delta
+            if count:
+                counts[neighbour] = count
+            else:
+                del counts[neighbour]
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        for row, col in coordinate_arr:
+            if (row, col) not in self.live:
+                self.live.add((row, col))
+                self._add_neighbours(row, col, 1)
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates """
+        for row, col in coordinate_arr:
+            if (row, col) in self.live:
+                self.live.remove((row, col))
+                self._add_neighbours(row, col, -1)
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        return list(self.live)
+
+    def is_alive(self, row, col):
+        return (row, col) in self.live
+
+    def population(self):
+        """ Number of living cells """
+        return len(self.live)
+
+    def get_array(self):
+        """ Return the board interior as a num_of_rows x num_of_cols uint8 array """
+        board = np.zeros((self.num_of_rows + 2, self.num_of_cols + 2), dtype=np.uint8)
+        if self.live:
+            rows, cols = np.array(list(self.live)).T
+            board[rows, cols] = 1
+        return board[1:-1, 1:-1]
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none """
+        if not self.live:
+            return None
+        rows = [row for row, _ in self.live]
+        cols = [col for _, col in self.live]
+        return min(rows), min(cols), max(rows), max(cols)
+
+    def step_changes(self):
+        """ The (born, died) cells of the last step, (n, 2) arrays of padded (row, col) """
+        return self.last_changes
+
+    def step(self, rule=LIFE):
+        """
+        Apply the rule (a rules.Rule) to the board interior, with lookups in its table.
+        Same rules as CellGrid.update_grid, the padding ring is left untouched.
+        Only cells that are alive or have a living neighbour are visited.
+        """
+        table = rule.table_bytes
+        live, counts = self.live, self.neighbour_counts
+        num_of_rows, num_of_cols = self.num_of_rows, self.num_of_cols
+        born = [cell for cell, count in counts.items()
+                if table[count] and cell not in live
+                and 1 <= cell[0] <= num_of_rows and 1 <= cell[1] <= num_of_cols]
+        died = [cell for cell in live
+                if not table[9 + counts.get(cell, 0)]
+                and 1 <= cell[0] <= num_of_rows and 1 <= cell[1] <= num_of_cols]
+        for row, col in died:
+            live.remove((row, col))
+            self._add_neighbours(row, col, -1)
+        for row, col in born:
+            live.add((row, col))
+            self._add_neighbours(row, col, 1)
+        self.last_changes = (cells_array(born), cells_array(died)) if born or died else NO_CHANGES
+
+
+class ChunkEngine:
+    """
+    A Chunk Engine class. An unbounded board: the living cells are kept in
+    square chunks of chunk_size x chunk_size cells, in a dict by chunk
+    coordinates. A chunk is created when a cell in it comes to life and
+    freed when it empties, so memory and step time follow the populated
+    chunks wherever they are. Coordinates can be any integers, negative or
+    very large, and there is no padding ring: nothing dies at an edge.
+
+    num_of_rows and num_of_cols are the board shown when the game starts,
+    random starts are placed in its middle.
+
+    Important attributes:
+    --------------------
+
+    self.chunks:
+        (chunk row, chunk col) -> chunk_size x chunk_size uint8 array of 0/1.
+        Cell (row, col) is chunks[row // chunk_size, col // chunk_size][row % chunk_size, col % chunk_size].
+
+    self.last_changes:
+        The (born, died) cells of the last step, see step_changes().
+
+    """
+    # (rows of the neighbour chunk, rows of the padded chunk) for a neighbour above, level with and below
+    _HALO = ((slice(-1, None), slice(0, 1)), (slice(None), slice(1, -1)), (slice(0, 1), slice(-1, None)))
+
+    def __init__(self, num_of_rows, num_of_cols, chunk_size=CHUNK_SIZE):
+        """ Initialize the ChunkEngine object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.chunk_size = chunk_size
+        self.chunks = {}
+        self.last_changes = NO_CHANGES
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.chunks.clear()
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        size = self.chunk_size
+        for row, col in coordinate_arr:
+            key = (row // size, col // size)
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                chunk = self.chunks[key] = np.zeros((size, size), dtype=np.uint8)
+            chunk[row % size, col % size] = 1
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates, chunks left empty are freed """
+        size = self.chunk_size
+        touched = set()
+        for row, col in coordinate_arr:
+            key = (row // size, col // size)
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                chunk[row % size, col % size] = 0
+                touched.add(key)
+        for key in touched:
+            if not self.chunks[key].any():
+                del self.chunks[key]
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        cells = []
+        size = self.chunk_size
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            rows, cols = np.nonzero(chunk)
+            cells.extend(zip((rows + chunk_row * size).tolist(), (cols + chunk_col * size).tolist()))
+        return cells
+
+    def get_cells_in(self, top, left, bottom, right):
+        """ The living cells inside the (top, left, bottom, right) box, inclusive, looking only at the chunks it covers """
+        cells = []
+        size = self.chunk_size
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            if not (top // size <= chunk_row <= bottom // size and left // size <= chunk_col <= right // size):
+                continue
+            rows, cols = np.nonzero(chunk)
+            rows, cols = rows + chunk_row * size, cols + chunk_col * size
+            inside = (rows >= top) & (rows <= bottom) & (cols >= left) & (cols <= right)
+            cells.extend(zip(rows[inside].tolist(), cols[inside].tolist()))
+        return cells
+
+    def is_alive(self, row, col):
+        size = self.chunk_size
+        chunk = self.chunks.get((row // size, col // size))
+        return chunk is not None and bool(chunk[row % size, col % size])
+
+    def population(self):
+        """ Number of living cells """
+        return sum(int(np.count_nonzero(chunk)) for chunk in self.chunks.values())
+
+    def get_array(self):
+        """ Return the starting board, rows 1 to num_of_rows and cols 1 to num_of_cols, as a uint8 array """
+        board = np.zeros((self.num_of_rows, self.num_of_cols), dtype=np.uint8)
+        cells = self.get_cells_in(1, 1, self.num_of_rows, self.num_of_cols)
+        if cells:
+            rows, cols = np.array(cells).T
+            board[rows - 1, cols - 1] = 1
+        return board
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none """
+        bounds = None
+        size = self.chunk_size
+        for (chunk_row, chunk_col), chunk in self.chunks.items():
+            bounds = union_bounds(bounds, array_bounds(chunk, chunk_row * size, chunk_col * size))
+        return bounds
+
+    def step_changes(self):
+        """ The (born, died) cells of the last step, (n, 2) arrays of (row, col) """
+        return self.last_changes
+
+    def padded_chunk(self, key):
+        """ The chunk at key with a ring of the neighbouring chunks' border cells, (chunk_size + 2) squared """
+        size = self.chunk_size
+        padded = np.zeros((size + 2, size + 2), dtype=np.uint8)
+        chunk_row, chunk_col = key
+        for d_row, (src_rows, dst_rows) in zip((-1, 0, 1), self._HALO):
+            for d_col, (src_cols, dst_cols) in zip((-1, 0, 1), self._HALO):
+                neighbour = self.chunks.get((chunk_row + d_row, chunk_col + d_col))
+                if neighbour is not None:
+                    padded[dst_rows, dst_cols] = neighbour[src_rows, src_cols]
+        return padded
+
+    def step(self, rule=LIFE):
+        """
+        Apply the rule (a rules.Rule) to every populated chunk,
+        and to the empty chunks next to one that have living cells on their border.
+        Same rules as CellGrid.update_grid.
+        """
+        candidates = set(self.chunks)
+        for chunk_row, chunk_col in self.chunks:
+            for d_row, d_col in SparseEngine.OFFSETS:
+                candidates.add((chunk_row + d_row, chunk_col + d_col))
+        next_chunks = {}
+        born, died = [], []
+        size = self.chunk_size
+        for key in candidates:
+            b = self.padded_chunk(key)
+            if key not in self.chunks and not b.any():
+                continue
+            adj_live_count = (b[:-2, :-2] + b[:-2, 1:-1] + b[:-2, 2:] +
+                              b[1:-1, :-2] + b[1:-1, 2:] +
+                              b[2:, :-2] + b[2:, 1:-1] + b[2:, 2:])
+            chunk = rule.apply(b[1:-1, 1:-1], adj_live_count)
+            if chunk.any():
+                next_chunks[key] = chunk
+            chunk_born, chunk_died = window_changes(b[1:-1, 1:-1], chunk, key[0] * size, key[1] * size)
+            if len(chunk_born):
+                born.append(chunk_born)
+            if len(chunk_died):
+                died.append(chunk_died)
+        self.chunks = next_chunks
+        self.last_changes = (np.concatenate(born) if born else NO_CELLS, np.concatenate(died) if died else NO_CELLS)
+
+
+ENGINES = {
+    'numpy': NumpyEngine,
+    'bitboard': BitboardEngine,
+    'sparse': SparseEngine,
+    'unbounded': ChunkEngine,
+}
+
+# engines without a board edge, cells are never clipped to num_of_rows x num_of_cols
+UNBOUNDED_ENGINES = {'unbounded'}
+
+
+ENGINE_NAMES = ['classic'] + list(ENGINES) + ['tiled']
+
+
+def make_engine(name, num_of_rows, num_of_cols):
+    """
+    Build the engine called name for the given board size.
+    'classic' is the original cell by cell board, Cell.CellEngine.
+    'tiled' steps the board in worker processes, tiled.TiledEngine.
+    """
+    if name == 'classic':
+        from Cell import CellEngine
+        return CellEngine(num_of_rows, num_of_cols)
+    if name == 'tiled':
+        from tiled import TiledEngine
+        return TiledEngine(num_of_rows, num_of_cols)
+    return ENGINES[name](num_of_rows, num_of_cols)
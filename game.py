@@ -1,10 +1,55 @@
+import os
 import pygame
 import time
-from threading import Timer
 from config import *
 import menus
 import Cell
 import log_cool_runs as lcr
+import recorder
+import startup
+from image_cache import ImageCache
+from profiler import Profiler
+from scheduler import FrameScheduler
+from text_cache import TextCache
+
+# posted by the run saver thread when a save is done, its result is event.result
+SAVE_DONE_EVENT = pygame.event.custom_type()
+
+
+class TextInput:
+    """
+    A Text Input class. The text typed in an input box, key press by key press,
+    so the box can be drawn by a loop that keeps doing other things.
+    Features:
+        - backspace to delete
+        - enter to submit
+        - escape to cancel
+        - tab to get name from cool_runs resource
+    """
+    def __init__(self):
+        """ Initialize the TextInput object, empty """
+        self.text = ''
+        self.tab_index = 2
+
+    def handle_key(self, event):
+        """ Apply a KEYDOWN event to the text. Returns 'submit' on enter, 'cancel' on escape, None otherwise """
+        if event.key == pygame.K_RETURN:
+            return 'submit'
+        elif event.key == pygame.K_ESCAPE:
+            return 'cancel'
+        elif event.key == pygame.K_BACKSPACE:
+            self.text = self.text[:-1]
+        elif event.key == pygame.K_TAB:
+            name = lcr.get_name_by_index(self.tab_index)
+            if name is None:
+                self.tab_index = 2
+                self.text = ''
+            else:
+                self.text = name
+                self.tab_index += 1
+        else:
+            self.text += event.unicode
+        return None
 
 
 class Game:
@@ -31,9 +76,59 @@ class Game:
     self.*_menu
         A *Menu object.
 
+    self.text_cache:
+        The TextCache of fonts and rendered text used by draw_text.
+
+    self.image_cache:
+        The ImageCache of the game's images, each loaded and scaled once.
+
     self.curr_run:
         A record of the starting coordinates of the current run.
 
+    self.simulation:
+        The headless Simulation the game runs on, owned by self.cell_grid.
+
+    self.rule, self.bacteria_mode:
+        The B/S name of the rule the game is played with (see rules.py), chosen
+        in the setup menu or loaded with a run. Bacteria mode plays BACTERIA_RULE instead.
+
+    self.engine_name:
+        The stepping engine of the cell grid, a name from engines.ENGINE_NAMES.
+
+    self.auto_sparse:
+        Let the cell grid switch to the sparse engine while the board is nearly empty.
+
+    self.dirty_rendering:
+        Redraw and update on screen only the cells that changed in a generation.
+
+    self.renderer_name:
+        'rects' to draw a rectangle per cell, 'framebuffer' to draw the board
+        with one palette surface blit (see renderer.py).
+
+    self.show_cycle:
+        Show the cycle indicator once the board repeats itself.
+
+    self.recorder, self.last_recording:
+        The recorder.Recorder of the run while it is recorded, None otherwise,
+        and the report of the last recording, shown until the game loop ends.
+
+    self.profiler, self.show_profile:
+        The Profiler timing the phases of the game loop and of the menus, and
+        whether its HUD is shown. It only times while the HUD is shown or a
+        trace is taken, F3 and F4.
+
+    self.run_saver, self.save_message:
+        The log_cool_runs.RunSaver runs are saved with in the background, and the
+        (text, time.perf_counter() it is shown until) of the last save's result.
+
+    self.save_prompt, self.save_window:
+        The TextInput of the save popup while it is open over the game, None
+        otherwise, and the popup drawn without the name.
+
+    self.indicator_rects:
+        The areas of the indicators drawn over the board in the last frame, see
+        draw_indicators, None for the ones that were not shown.
+
 
     Important methods:
     ------------------
@@ -44,7 +139,10 @@ class Game:
         Draw text on the given surface.
 
     input_box(self, ...):
-        Creates a box for text input.
+        Creates a box for text input, waits for the text.
+
+    open_save_prompt(self):
+        Show the save popup, the game keeps running under it.
 
     game_loop(self):
         Runs the the game of life.
@@ -52,16 +150,36 @@ class Game:
     reset_grid(self):
         Resets all cells to their dead state.
 
+    set_engine(self, ...):
+        Switch the cell grid to another stepping engine.
+
+    set_rule(self, ...):
+        Play with another rule.
+
+    start_recording(self), stop_recording(self):
+        Record the view of the board to RECORD_DIR, every generation a frame.
+
+    handle_profile_key(self, key):
+        Show / hide the profiling HUD (F3), start / write a trace (F4).
+
     """
     def __init__(self):
         """ Initialize the game object"""
         pygame.init()
-        self.screen = pygame.display.set_mode(flags=pygame.FULLSCREEN | pygame.SCALED, size=(1920, 1080))
-        self.top_view = pygame.display.set_mode(flags=pygame.FULLSCREEN | pygame.SCALED, size=(1920, 1080))
-        self.screen_w, self.screen_h = pygame.display.get_surface().get_size()
+        startup.mark('pygame init')
+        # the menus are drawn straight to the display, self.top_view is the same surface
+        self.screen = pygame.display.set_mode(flags=pygame.FULLSCREEN | pygame.SCALED, size=(SCREEN_W, SCREEN_H))
+        self.top_view = self.screen
+        startup.mark('display')
+        self.screen_w, self.screen_h = self.screen.get_size()
         self.num_of_cols = self.screen_w // CELL_EDGE_SIZE
         self.num_of_rows = self.screen_h // CELL_EDGE_SIZE
         self.default_font = DEFAULT_FONT
+        self.text_cache = TextCache()
+        self.image_cache = ImageCache()
+        self.image_cache.preload([(ICON_IMAGE, None), (BACTERIA_IMAGE, (MENU_IMAGE_SIZE, MENU_IMAGE_SIZE)),
+                                  (REVERSE_IMAGE, (MENU_IMAGE_SIZE, MENU_IMAGE_SIZE))])
+        startup.mark('images')
         # setup params
         self.text_color = WHITE
         self.selected_text_color = BLUE
@@ -71,13 +189,28 @@ class Game:
         self.cell_size = CELL_EDGE_SIZE
         self.run_mode = 'Select'
         self.bacteria_mode = False
+        self.rule = RULE
+        self.engine_name = ENGINE
+        self.auto_sparse = AUTO_SPARSE
+        self.dirty_rendering = DIRTY_RENDERING
+        self.renderer_name = RENDERER
+        self.show_cycle = True
+        self.recorder = None
+        self.last_recording = None
+        self.profiler = Profiler()
+        self.show_profile = PROFILE
+        self.profiler.enable(PROFILE)
+        self.profile_lines = []
+        self.trace_status = None
+        self.run_saver = lcr.RunSaver(notify=self.post_save_result)
+        self.save_message = None
+        self.save_prompt, self.save_window = None, None
+        self.indicator_rects = []
         self.UP_KEY, self.DOWN_KEY, self.ENTER_KEY, self.ESCAPE_KEY, self.LEFT_KEY, self.RIGHT_KEY = \
             False, False, False, False, False, False
         self.running, self.playing = False, False
         pygame.display.set_caption("The Game Of Life")
-        icon = pygame.image.load('assets/virus_red.png')
-        pygame.display.set_icon(icon)
-        self.loop = LOOP
+        pygame.display.set_icon(self.image_cache.get(ICON_IMAGE))
         self.screen.fill((44, 200, 88))  # ---- should never be seen ----
         self.alive_cell_color = YELLOW
         self.dead_cell_color = DARKER_PURPLE
@@ -88,19 +221,27 @@ class Game:
         self.quit_menu = menus.QuitMenu(self)
         self.curr_menu = self.main_menu
         self.curr_run = []
+        startup.mark('menus')
         self.cell_grid = Cell.CellGrid(self)
+        self.simulation = self.cell_grid.simulation
+        startup.mark('board')
         self.loaded = False
 
     def check_events(self):
         """ Record key presses and return mouse position if clicked """
         mouse_pos = None
-        for event in pygame.event.get():
+        with self.profiler.phase('events', type(self.curr_menu).__name__):
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running, self.playing = False, False
                 self.curr_menu.run_display = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
+            elif event.type == SAVE_DONE_EVENT:
+                self.show_save_result(event.result)
             if event.type == pygame.KEYDOWN:
+                self.handle_profile_key(event.key)
                 if event.key == pygame.K_SPACE or event.key == pygame.K_RETURN:
                     self.ENTER_KEY = True
                 if event.key == pygame.K_ESCAPE:
@@ -117,8 +258,7 @@ class Game:
 
     def draw_text(self, text, size, x, y, color=WHITE, surface=None):
         """ Draw text on the given surface, Default is top_view """
-        font = pygame.font.Font(self.default_font, size)
-        text_surface = font.render(text, True, color)
+        text_surface = self.text_cache.render(text, self.default_font, size, color)
         text_rect = text_surface.get_rect()
         text_rect.center = (x, y)
         if surface is not None:
@@ -131,50 +271,36 @@ class Game:
             False, False, False, False, False, False
 
     def input_box(self, width, height, surface, text_size=22, x_offset=100, y_offset=62, text_center_x=93, text_center_y=19):
-        """ Creates a box for text input
-        Features:
-            - backspace to delete
-            - enter to submit
-            - tab to get name from cool_runs resource
-            - displays in real time
+        """ Creates a box for text input and waits for it, see TextInput
+        Returns the text on enter, None on escape. Displays in real time
         """
-        text = ''
-        tab_index = 2
+        text_input = TextInput()
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        return text
-                    elif event.key == pygame.K_ESCAPE:
+                    action = text_input.handle_key(event)
+                    if action == 'submit':
+                        return text_input.text
+                    elif action == 'cancel':
                         return None
-                    elif event.key == pygame.K_BACKSPACE and len(text) > 0:
-                        text = text[:-1]
-                    elif event.key == pygame.K_TAB:
-                        name = lcr.get_name_by_index(tab_index)
-                        if name is None:
-                            tab_index = 2
-                            text = ''
-                        else:
-                            text = name
-                            tab_index += 1
-                    else:
-                        text += event.unicode
             surface.fill(self.curr_menu.background)
-            self.draw_text(text, text_size, text_center_x, text_center_y, WHITE, surface)
+            self.draw_text(text_input.text, text_size, text_center_x, text_center_y, WHITE, surface)
             self.top_view.blit(surface, ((self.screen_w - width) // 2 + x_offset, (self.screen_h - height) // 2 + y_offset))
             pygame.display.update()
 
-    def allow_another_loop(self):
-        """ Restricts time between cycles to obtain constant speed """
-        self.loop = True
-
     def game_loop(self):
         """ Runs the the game of life
         While playing:
-            - press p to pause
-            - press s for popup save window
+            - press p to pause, then , and . to step back and forward, [ and ] to scrub
+            - press s for popup save window, the run goes on while the name is typed
+            - press c to show / hide the cycle indicator
+            - press r to start / stop recording the view to RECORD_DIR
+            - press F3 to show / hide the profiling HUD, F4 to start / write a trace
+            - arrow keys to pan, + / - or the mouse wheel to zoom, 0 to reset the view
             - press escape to exit game
         """
+        self.cell_grid.full_redraw = True
+        self.cell_grid.reset_view()
         if not self.loaded:
             if self.run_mode == 'Select':
                 self.cell_grid.draw_grid(self.cell_size)
@@ -183,30 +309,237 @@ class Game:
             else:
                 self.curr_run = self.cell_grid.random_middle_start()
 
-        # main loop
+        # main loop, a generation every self.round_time, frames as the display allows
+        scheduler = FrameScheduler(self.round_time)
+        self.last_recording = None
         running = True
+        profiler = self.profiler
         while running:
-            timer = Timer(self.round_time, self.allow_another_loop)
-            timer.start()
-            self.cell_grid.update_grid()
-            self.cell_grid.draw_grid(self.cell_size)
+            for _ in range(scheduler.due_generations()):
+                with profiler.phase('update_grid', 'game_loop'):
+                    self.cell_grid.update_grid()
+                if self.recorder is not None:
+                    with profiler.phase('record', 'game_loop'):
+                        self.recorder.capture(self.simulation.engine, self.simulation.generation)
+            if scheduler.frame_due():
+                self.draw_frame()
+                scheduler.frame_drawn()
             # event loop
-            for event in pygame.event.get():
+            with profiler.phase('events', 'game_loop'):
+                events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == pygame.KEYDOWN and self.save_prompt is not None:
+                    # every key goes to the name while the save popup is open
+                    self.save_prompt_key(event)
+                    scheduler.request_frame()
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
                     elif event.key == pygame.K_p:
                         running = self.pause()
+                        scheduler.start()
                     elif event.key == pygame.K_s:
-                        self.save_window_popup()
+                        self.open_save_prompt()
+                        scheduler.request_frame()
+                    elif event.key == pygame.K_c:
+                        self.show_cycle = not self.show_cycle
+                        self.cell_grid.full_redraw = True
+                    elif event.key == pygame.K_r:
+                        if self.recorder is None:
+                            self.start_recording()
+                        else:
+                            self.stop_recording()
+                        self.cell_grid.full_redraw = True
+                    elif not self.handle_profile_key(event.key):
+                        self.move_view(event.key)
+                elif event.type == pygame.MOUSEWHEEL:
+                    self.cell_grid.zoom(VIEW_ZOOM_FACTOR if event.y > 0 else 1 / VIEW_ZOOM_FACTOR)
+                elif event.type == SAVE_DONE_EVENT:
+                    self.show_save_result(event.result)
+            with profiler.phase('wait', 'game_loop'):
+                scheduler.wait()
+        if self.recorder is not None:
+            self.stop_recording()
+        self.close_save_prompt()
 
-            # Busy-wait to account for self.round_time
-            while not self.loop:
-                pass
-            self.loop = False
-            pygame.display.update()
+    def draw_frame(self, paused=False):
+        """ Draw the board and its indicators, then update the display """
+        profiler = self.profiler
+        with profiler.phase('draw_grid', 'game_loop'):
+            self.cell_grid.draw_grid(self.cell_size)
+            indicator_rects = self.draw_indicators(paused)
+            if any(self.left_behind(last_rect, rect) for last_rect, rect in zip(self.indicator_rects, indicator_rects)):
+                # a smaller or hidden indicator leaves its last pixels over the board, the board is drawn again
+                self.cell_grid.full_redraw = True
+                self.cell_grid.draw_grid(self.cell_size)
+                indicator_rects = self.draw_indicators(paused)
+            self.indicator_rects = indicator_rects
+        with profiler.phase('display_update', 'game_loop'):
+            if self.dirty_rendering:
+                pygame.display.update(self.cell_grid.dirty_rects + [rect for rect in indicator_rects if rect])
+            else:
+                pygame.display.update()
+        if profiler.tracing:
+            profiler.counter('cells', self.simulation.population())
+        profiler.frame('game_loop')
+
+    def draw_indicators(self, paused=False):
+        """ Draw the indicators over the board, returns the areas drawn, None for the ones not shown """
+        return [self.draw_cycle_indicator(), self.draw_history_indicator() if paused else None,
+                self.draw_recording_indicator(), self.draw_profile_hud(), self.draw_save_message(),
+                self.draw_save_prompt()]
+
+    def left_behind(self, last_rect, rect):
+        """ True if an indicator drawn in last_rect in the last frame is not drawn over by rect now """
+        return last_rect is not None and (rect is None or not rect.contains(last_rect))
+
+    def move_view(self, key):
+        """ Pan or zoom the view of the board for a key press """
+        _, view_rows, view_cols = self.cell_grid.view_size()
+        rows_step, cols_step = max(1, view_rows // 10), max(1, view_cols // 10)
+        if key == pygame.K_UP:
+            self.cell_grid.pan(-rows_step, 0)
+        elif key == pygame.K_DOWN:
+            self.cell_grid.pan(rows_step, 0)
+        elif key == pygame.K_LEFT:
+            self.cell_grid.pan(0, -cols_step)
+        elif key == pygame.K_RIGHT:
+            self.cell_grid.pan(0, cols_step)
+        elif key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.cell_grid.zoom(VIEW_ZOOM_FACTOR)
+        elif key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.cell_grid.zoom(1 / VIEW_ZOOM_FACTOR)
+        elif key in (pygame.K_0, pygame.K_KP0, pygame.K_HOME):
+            self.cell_grid.reset_view()
+
+    def draw_cycle_indicator(self):
+        """ Draw the cycle of the board in the top left corner, returns the area drawn or None """
+        cycle = self.simulation.cycle_info()
+        if cycle is None or not self.show_cycle:
+            return None
+        if cycle['period'] == 1:
+            text = "still life since generation {}".format(cycle['start'])
+        else:
+            text = "period {} cycle since generation {}".format(cycle['period'], cycle['start'])
+        if self.simulation.ended:
+            text += ", stopped"
+        text_surface = self.text_cache.render(text, self.default_font, 20, self.text_color)
+        rect = text_surface.get_rect(topleft=(10, 10)).inflate(16, 8)
+        self.top_view.fill(BLACK, rect)
+        self.top_view.blit(text_surface, text_surface.get_rect(center=rect.center))
+        return rect
+
+    def draw_history_indicator(self):
+        """ Draw the generation shown and the generations that can be rewound to in the top right corner """
+        history = self.simulation.history
+        text = "generation {}".format(self.simulation.generation)
+        if history is not None and history.segments:
+            text += ", history {} - {}".format(history.oldest, history.newest)
+        text_surface = self.text_cache.render(text, self.default_font, 20, self.text_color)
+        rect = text_surface.get_rect(topright=(self.screen_w - 10, 10)).inflate(16, 8)
+        self.top_view.fill(BLACK, rect)
+        self.top_view.blit(text_surface, text_surface.get_rect(center=rect.center))
+        return rect
+
+    def draw_recording_indicator(self):
+        """ Draw the recording in progress, or the last one, in the bottom left corner, returns the area drawn or None """
+        if self.recorder is not None:
+            text = "recording {}, {} frames".format(self.recorder.path, self.recorder.num_of_frames)
+            if self.recorder.dropped:
+                text += ", {} dropped".format(self.recorder.dropped)
+        elif self.last_recording is not None:
+            if self.last_recording['error'] is not None:
+                text = "recording failed: {}".format(self.last_recording['error'])
+            else:
+                text = "recorded {}, {} frames".format(self.last_recording['path'], self.last_recording['frames'])
+        else:
+            return None
+        text_surface = self.text_cache.render(text, self.default_font, 20, self.text_color)
+        rect = text_surface.get_rect(bottomleft=(10, self.screen_h - 10)).inflate(16, 8)
+        self.top_view.fill(BLACK, rect)
+        self.top_view.blit(text_surface, text_surface.get_rect(center=rect.center))
+        return rect
+
+    def handle_profile_key(self, key):
+        """ Show / hide the profiling HUD on F3, start / write a trace on F4. True if the key was one of them """
+        if key == pygame.K_F3:
+            self.show_profile = not self.show_profile
+            self.profiler.enable(self.show_profile)
+            self.profile_lines = []
+        elif key == pygame.K_F4:
+            if not self.profiler.tracing:
+                self.profiler.start_trace()
+                self.trace_status = "trace: recording, F4 to write it"
+            else:
+                path = os.path.join(TRACE_DIR, time.strftime('trace_%Y%m%d_%H%M%S.json'))
+                try:
+                    num_of_events = self.profiler.stop_trace(path, keep_enabled=self.show_profile)
+                    self.trace_status = "trace: {} events written to {}".format(num_of_events, path)
+                except OSError as e:
+                    self.trace_status = "trace failed: {}".format(e)
+                log(self.trace_status)
+        else:
+            return False
+        self.cell_grid.full_redraw = True
+        return True
+
+    def draw_profile_hud(self):
+        """ Draw the profiling HUD under the top right corner, returns the area drawn or None """
+        if not self.show_profile:
+            return None
+        if self.profiler.summary_due() or not self.profile_lines:
+            self.profile_lines = self.profile_hud_lines(self.profiler.summary(self.simulation.generation))
+        # the numbers change every update, they are rendered without the text cache
+        font = self.text_cache.get_font(self.default_font, 18)
+        surfaces = [font.render(line, True, self.text_color) for line in self.profile_lines]
+        width = max(surface.get_width() for surface in surfaces)
+        line_height = font.get_linesize()
+        rect = pygame.Rect(0, 0, width + 16, line_height * len(surfaces) + 8)
+        rect.topright = (self.screen_w - 2, 50)
+        self.top_view.fill(BLACK, rect)
+        for i, surface in enumerate(surfaces):
+            self.top_view.blit(surface, (rect.left + 8, rect.top + 4 + i * line_height))
+        return rect
+
+    def profile_hud_lines(self, summary):
+        """ The lines of the profiling HUD for a Profiler.summary """
+        lines = ["{:.0f} frames/s".format(summary['frames_per_second'])]
+        if summary['generations_per_second'] is not None:
+            lines[0] += ", {:.1f} generations/s".format(summary['generations_per_second'])
+        if summary['frame_ms'] is not None:
+            lines.append("frame ms p50 {p50:.1f} p95 {p95:.1f} p99 {p99:.1f} max {max:.1f}".format(**summary['frame_ms']))
+        phases = sorted(summary['phases'].items(), key=lambda item: -item[1])
+        lines.extend("{:<15} {:7.2f} ms/frame".format(name, ms) for name, ms in phases)
+        memory = summary['memory']
+        lines.append("{} cells, {}".format(self.simulation.population(),
+                                            "{:.0f} MB".format(memory / 2 ** 20) if memory is not None else "memory unknown"))
+        if self.trace_status is not None:
+            lines.append(self.trace_status)
+        return lines
+
+    def start_recording(self):
+        """ Record the view of the board from now on, to a new file in RECORD_DIR, in the colors of the board """
+        path = os.path.join(RECORD_DIR, time.strftime('run_%Y%m%d_%H%M%S'))
+        if RECORD_FORMAT == 'gif':
+            path += '.gif'
+        _, view_rows, view_cols = self.cell_grid.view_size()
+        window = (self.cell_grid.view_top, self.cell_grid.view_left, view_rows, view_cols)
+        try:
+            # frames are dropped rather than hold up the game, if the writer falls behind
+            self.recorder = recorder.Recorder(path, window, (self.dead_cell_color, self.alive_cell_color),
+                                              self.round_time, block=False)
+        except OSError as e:
+            self.last_recording = {'error': str(e)}
+            return
+        self.recorder.capture(self.simulation.engine, self.simulation.generation)
+
+    def stop_recording(self):
+        """ Wait for the recording to be written """
+        self.last_recording = self.recorder.close()
+        self.recorder = None
+        log("recording: {}".format(self.last_recording))
 
     def click_mode(self):
         """ The click-and-live feature, supports dragging the mouse """
@@ -220,91 +553,166 @@ class Game:
                     elif event.type == pygame.MOUSEBUTTONUP:
                         mouse_down = False
                     x, y = pygame.mouse.get_pos()
-                    col = x // self.cell_size
-                    row = y // self.cell_size
-                    cell = self.cell_grid.grid[row][col]
-                    cell.live()
+                    row, col = self.cell_grid.screen_to_cell(x, y)
+                    self.cell_grid.set_start_cells([(row, col)])
                     self.curr_run.append((row, col))
-                    left = col * self.cell_size
-                    top = row * self.cell_size
+                    left = x // self.cell_size * self.cell_size
+                    top = y // self.cell_size * self.cell_size
                     square = pygame.Rect(left, top, self.cell_size, self.cell_size)
-                    pygame.draw.rect(cell.surface, cell.color, square)
+                    pygame.draw.rect(self.screen, self.alive_cell_color, square)
                     pygame.display.update()
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
                         done = True
 
-    @staticmethod
-    def pause():
-        pause = True
-        while pause:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    return False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
+    def pause(self):
+        """ Pause the game until p is pressed again, returns False to exit the game
+        While paused:
+            - , and . to go one generation back and forward, hold to scrub
+            - [ and ] to go HISTORY_SCRUB_STEP generations back and forward
+            - arrow keys, + / - and the mouse wheel move the view
+            - escape to exit game
+        Going back is bounded by the rewind history, going forward steps the board.
+        """
+        scrub_keys = {pygame.K_COMMA: -1, pygame.K_PERIOD: 1,
+                      pygame.K_LEFTBRACKET: -HISTORY_SCRUB_STEP, pygame.K_RIGHTBRACKET: HISTORY_SCRUB_STEP}
+        pygame.key.set_repeat(300, 30)
+        self.draw_frame(paused=True)
+        try:
+            while True:
+                # sleep until there is input
+                for event in [pygame.event.wait()] + pygame.event.get():
+                    if event.type == pygame.QUIT:
                         return False
-                    elif event.key == pygame.K_p:
-                        pause = False
-        return True
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            return False
+                        elif event.key == pygame.K_p:
+                            return True
+                        elif event.key in scrub_keys:
+                            self.simulation.seek(self.simulation.generation + scrub_keys[event.key])
+                        elif not self.handle_profile_key(event.key):
+                            self.move_view(event.key)
+                    elif event.type == pygame.MOUSEWHEEL:
+                        self.cell_grid.zoom(VIEW_ZOOM_FACTOR if event.y > 0 else 1 / VIEW_ZOOM_FACTOR)
+                    elif event.type == SAVE_DONE_EVENT:
+                        self.show_save_result(event.result)
+                self.draw_frame(paused=True)
+        finally:
+            pygame.key.set_repeat()
 
-    def save_window_popup(self):
-        """ Creates a popup save window """
+    def open_save_prompt(self):
+        """ Open the popup save window over the board, the name is typed while the game goes on """
         # windows setup
         (width, height) = (600, 400)
         save_window = pygame.Surface((width, height))
         save_window.fill(self.curr_menu.background)
-        input_window = pygame.Surface((300, 38))
-        # display
-        input_window.fill(self.curr_menu.background)
         self.draw_text("Save Run?", self.main_menu.default_text_size + 10, width // 2, height // 6, WHITE, save_window)
         self.draw_text("Title:", self.main_menu.default_text_size, width // 4 - 10, height // 3 + 15, WHITE, save_window)
         self.draw_text("ENTER  TO  SAVE", self.main_menu.default_text_size + 1, width // 2, height // 2 + 25, WHITE, save_window)
         self.draw_text("ESCAPE TO CANCEL", self.main_menu.default_text_size, width // 2, 3 * height // 4 + 10, WHITE, save_window)
-        self.top_view.blit(save_window, ((self.screen_w - width) // 2, (self.screen_h - height) // 2))
-        self.top_view.blit(input_window, ((self.screen_w - width) // 2 + 200, (self.screen_h - height) // 2 + 124))
-        pygame.display.update()
-        # interactive input box
-        name = self.input_box(width, height, input_window, self.main_menu.default_text_size, 200, 124, 150, 19)
-        self.handle_name_input(name, save_window, width, height)
-
-    def handle_name_input(self, name, save_window, width, height):
-        """ Save the name given if it is legitimate """
-        if not name or name is None:
+        self.save_window = save_window
+        self.save_prompt = TextInput()
+
+    def save_prompt_key(self, event):
+        """ Type a key into the save popup, the run is queued to be saved on enter """
+        action = self.save_prompt.handle_key(event)
+        if action == 'submit':
+            name = self.save_prompt.text
+            self.close_save_prompt()
+            self.handle_name_input(name)
+        elif action == 'cancel':
+            self.close_save_prompt()
+
+    def close_save_prompt(self):
+        if self.save_prompt is not None:
+            self.save_prompt, self.save_window = None, None
+            # the board under the popup is drawn again
+            self.cell_grid.full_redraw = True
+
+    def draw_save_prompt(self):
+        """ Draw the save popup and the name typed so far in the middle of the screen, returns the area drawn or None """
+        if self.save_prompt is None:
+            return None
+        (width, height) = self.save_window.get_size()
+        rect = self.top_view.blit(self.save_window, ((self.screen_w - width) // 2, (self.screen_h - height) // 2))
+        input_window = pygame.Surface((300, 38))
+        input_window.fill(self.curr_menu.background)
+        self.draw_text(self.save_prompt.text, self.main_menu.default_text_size, 150, 19, WHITE, input_window)
+        self.top_view.blit(input_window, (rect.left + 200, rect.top + 124))
+        return rect
+
+    def handle_name_input(self, name):
+        """ Queue the run to be saved under the name given, if there is one. The result is shown once it is written """
+        if not name:
             return
-        save_window.fill(self.curr_menu.background)
-        if lcr.check_name_exists(name):
-            self.draw_text("Name already exists!", int(self.main_menu.default_text_size * 1.5), width // 2, height * (1 / 3), WHITE, save_window)
-            self.draw_text("Not saved!", int(self.main_menu.default_text_size * 1.5), width // 2, height * (2 / 3), WHITE, save_window)
-            self.top_view.blit(save_window, ((self.screen_w - width) // 2, (self.screen_h - height) // 2))
-            pygame.display.update()
-            time.sleep(1)
+        self.run_saver.save(self.curr_run, name, self.cell_size, self.cell_grid.current_rule())
+        self.set_save_message("Saving {}...".format(name))
+
+    def post_save_result(self, result):
+        """ Hand the result of a save from the run saver thread to the game loop """
+        try:
+            pygame.event.post(pygame.event.Event(SAVE_DONE_EVENT, result=result))
+        except pygame.error:
+            # the display is closed, the game is exiting
+            pass
+
+    def show_save_result(self, result):
+        """ Show the result of a save, see log_cool_runs.RunSaver """
+        if result['status'] == 'saved':
+            self.set_save_message("Saved {}!".format(result['name']))
+        elif result['status'] == 'exists':
+            self.set_save_message("Name {} already exists! Not saved!".format(result['name']))
+        elif result['attempts']:
+            self.set_save_message("{} not saved after {} tries: {}".format(result['name'], result['attempts'], result['error']))
         else:
-            self.draw_text("Saved!", self.main_menu.default_text_size * 2, width // 2, height // 2, WHITE, save_window)
-            self.top_view.blit(save_window, ((self.screen_w - width) // 2, (self.screen_h - height) // 2))
-            pygame.display.update()
-            time.sleep(0.4)
-            lcr.log_run(self.curr_run, name, self.cell_size)
+            self.set_save_message("{} not saved: {}".format(result['name'], result['error']))
+
+    def set_save_message(self, text):
+        self.save_message = (text, time.perf_counter() + SAVE_MESSAGE_TIME)
+        self.cell_grid.full_redraw = True
+
+    def draw_save_message(self):
+        """ Draw the result of the last save in the bottom right corner for SAVE_MESSAGE_TIME, returns the area drawn or None """
+        if self.save_message is None:
+            return None
+        text, until = self.save_message
+        if time.perf_counter() > until:
+            # the board under the message is drawn again
+            self.save_message = None
+            self.cell_grid.full_redraw = True
+            return None
+        text_surface = self.text_cache.render(text, self.default_font, 20, self.text_color)
+        rect = text_surface.get_rect(bottomright=(self.screen_w - 10, self.screen_h - 10)).inflate(16, 8)
+        self.top_view.fill(BLACK, rect)
+        self.top_view.blit(text_surface, text_surface.get_rect(center=rect.center))
+        return rect
 
     def update_grid_color(self):
         """ Update the color of dead and alive cells """
-        for row in range(self.num_of_rows + 1):
-            for col in range(self.num_of_cols + 1):
-                self.cell_grid.grid[row][col].alive_color = self.alive_cell_color
-                self.cell_grid.grid[row][col].dead_color = self.dead_cell_color
+        self.cell_grid.set_palette(self.alive_cell_color, self.dead_cell_color)
 
     def reset_grid(self):
         """ Resets all cells to their dead state """
         self.curr_run.clear()
-        for row in range(self.num_of_rows):
-            for col in range(self.num_of_cols):
-                self.cell_grid.grid[row][col].die()
+        self.cell_grid.clear()
+
+    def set_engine(self, engine_name):
+        """ Switch the cell grid to another stepping engine, the board is rebuilt empty """
+        self.engine_name = engine_name
+        self.cell_grid.build_board()
+
+    def set_rule(self, rule):
+        """ Play with the given rule, a B/S name, from the next generation on. Leaves bacteria mode """
+        self.rule = rule
+        self.bacteria_mode = False
 
     def reset_game(self):
         self.reset_grid()
         self.loaded = False
         self.playing = False
 
-    @staticmethod
-    def quit():
+    def quit(self):
+        """ Wait for the runs queued to be saved, then close the display """
+        self.run_saver.close()
         pygame.quit()
@@ -0,0 +1,286 @@
+""" HashLife, for jumping a run far ahead in time """
+
+from config import *
+from rules import get_rule
+
+
+class Node:
+    """
+    A quadtree node. A node of level k is a square of 2^k x 2^k cells,
+    made of four level k-1 quadrants. Level 0 nodes are single cells.
+    Nodes are never changed once built, so equal squares share one Node.
+    """
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw, self.ne, self.sw, self.se = nw, ne, sw, se
+        self.level = level
+        self.population = population
+
+
+class HashLife:
+    """
+    A HashLife class. Holds a pattern on an unbounded board as a quadtree of
+    hash-consed nodes and advances it with memoized results, so a pattern
+    made of repeating parts can jump millions of generations ahead.
+
+    Unlike CellGrid there are no board edges, patterns are never cut off.
+
+    Important attributes:
+    --------------------
+
+    self.nodes:
+        The node table, (nw, ne, sw, se) -> Node. Every node is stored once
+        and looked up by its content.
+
+    self.results:
+        The result cache, (node, j) -> the center of node advanced 2^j generations.
+
+    self.max_nodes:
+        The cap on the size of the node table plus the result cache.
+        When reached, both are evicted and rebuilt from the live pattern.
+
+    self.root, self.origin:
+        The node holding the whole pattern and the (row, col) of its top left cell.
+
+
+    Important methods:
+    --------------------
+
+    jump(self, ...):
+        Advance the pattern by any number of generations.
+
+    get_cells(self):
+        Return the living cells coordinates.
+
+    """
+    def __init__(self, coordinate_arr=(), rule=RULE, max_nodes=HASHLIFE_MAX_NODES):
+        """ Initialize the HashLife object, rule is a rules.Rule or its B/S name """
+        self.rule = get_rule(rule)
+        self.max_nodes = max_nodes
+        self.nodes = {}
+        self.results = {}
+        self.evictions = 0
+        self.generation = 0
+        self.dead = Node(None, None, None, None, 0, 0)
+        self.alive = Node(None, None, None, None, 0, 1)
+        self.empty_nodes = [self.dead]
+        self.root = self.empty(3)
+        self.origin = (0, 0)
+        self.set_cells(coordinate_arr)
+
+    @classmethod
+    def from_run_arr(cls, run_arr, rule=RULE, max_nodes=HASHLIFE_MAX_NODES):
+        """ Build from a log_cool_runs.get_run_arr_by_name result, [cell_size, cell, ..., cell] """
+        return cls([cell for cell in run_arr if isinstance(cell, tuple)], rule, max_nodes)
+
+    # ---- node building ----
+
+    def join(self, nw, ne, sw, se):
+        """ Return the node made of the given quadrants, built only once """
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            if len(self.nodes) + len(self.results) >= self.max_nodes:
+                self.evict()
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    def empty(self, level):
+        """ Return the empty node of the given level """
+        while len(self.empty_nodes) <= level:
+            e = self.empty_nodes[-1]
+            self.empty_nodes.append(self.join(e, e, e, e))
+        return self.empty_nodes[level]
+
+    def centre(self, node):
+        """ The level k-1 node in the middle of a level k node """
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def expand(self):
+        """ Surround the root with empty cells, its level grows by one """
+        root = self.root
+        e = self.empty(root.level - 1)
+        self.root = self.join(self.join(e, e, e, root.nw), self.join(e, e, root.ne, e),
+                              self.join(e, root.sw, e, e), self.join(root.se, e, e, e))
+        half = 1 << (root.level - 1)
+        self.origin = (self.origin[0] - half, self.origin[1] - half)
+
+    def is_centred(self):
+        """ True if all living cells are in the middle half of the root """
+        root = self.root
+        return (root.nw.population == root.nw.se.population and
+                root.ne.population == root.ne.sw.population and
+                root.sw.population == root.sw.ne.population and
+                root.se.population == root.se.nw.population)
+
+    def shrink(self):
+        """ Drop empty borders around the pattern """
+        while self.root.level > 3 and self.is_centred():
+            quarter = 1 << (self.root.level - 2)
+            self.root = self.centre(self.root)
+            self.origin = (self.origin[0] + quarter, self.origin[1] + quarter)
+
+    # ---- cells import/export ----
+
+    def set_cells(self, coordinate_arr):
+        """ Replace the pattern with living cells in the given coordinates """
+        cells = list(set(coordinate_arr))
+        self.generation = 0
+        if not cells:
+            self.root = self.empty(3)
+            self.origin = (0, 0)
+            return
+        top = min(row for row, _ in cells)
+        left = min(col for _, col in cells)
+        span = max(max(row for row, _ in cells) - top, max(col for _, col in cells) - left) + 1
+        level = max(3, (span - 1).bit_length())
+        self.root = self.build(level, top, left, cells)
+        self.origin = (top, left)
+
+    def build(self, level, top, left, cells):
+        """ Build the node of the square at (top, left), cells are the living cells inside it """
+        if not cells:
+            return self.empty(level)
+        if level == 0:
+            return self.alive
+        half = 1 << (level - 1)
+        quadrants = [[], [], [], []]
+        for row, col in cells:
+            quadrants[(row >= top + half) * 2 + (col >= left + half)].append((row, col))
+        return self.join(self.build(level - 1, top, left, quadrants[0]),
+                         self.build(level - 1, top, left + half, quadrants[1]),
+                         self.build(level - 1, top + half, left, quadrants[2]),
+                         self.build(level - 1, top + half, left + half, quadrants[3]))
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        cells = []
+        stack = [(self.root, self.origin[0], self.origin[1])]
+        while stack:
+            node, top, left = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                cells.append((top, left))
+                continue
+            half = 1 << (node.level - 1)
+            stack.append((node.nw, top, left))
+            stack.append((node.ne, top, left + half))
+            stack.append((node.sw, top + half, left))
+            stack.append((node.se, top + half, left + half))
+        return cells
+
+    def population(self):
+        """ Number of living cells """
+        return self.root.population
+
+    # ---- stepping ----
+
+    def base_step(self, node):
+        """ Advance the 2x2 center of a 4x4 node by one generation, brute force """
+        bits = [[0] * 4 for _ in range(4)]
+        for q, quad in enumerate((node.nw, node.ne, node.sw, node.se)):
+            for i, cell in enumerate((quad.nw, quad.ne, quad.sw, quad.se)):
+                bits[(q // 2) * 2 + i // 2][(q % 2) * 2 + i % 2] = cell.population
+        table = self.rule.table_bytes
+        new_cells = []
+        for row in (1, 2):
+            for col in (1, 2):
+                adj_live_count = sum(bits[row + d_row][col + d_col]
+                                     for d_row in (-1, 0, 1) for d_col in (-1, 0, 1)) - bits[row][col]
+                alive = table[9 * bits[row][col] + adj_live_count]
+                new_cells.append(self.alive if alive else self.dead)
+        return self.join(*new_cells)
+
+    def successor(self, node, j):
+        """
+        Return the level k-1 center of a level k node, advanced 2^j generations.
+        j is at most k - 2.
+        """
+        if node.population == 0:
+            return node.nw
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self.base_step(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            # the 9 overlapping level k-1 sub squares
+            n00, n02, n20, n22 = nw, ne, sw, se
+            n01 = self.join(nw.ne, ne.nw, nw.se, ne.sw)
+            n10 = self.join(nw.sw, nw.se, sw.nw, sw.ne)
+            n11 = self.join(nw.se, ne.sw, sw.ne, se.nw)
+            n12 = self.join(ne.sw, ne.se, se.nw, se.ne)
+            n21 = self.join(sw.ne, se.nw, sw.se, se.sw)
+            subs = (n00, n01, n02, n10, n11, n12, n20, n21, n22)
+            if j == node.level - 2:
+                # full speed, each half of the way is a recursive step
+                t = [self.successor(sub, j - 1) for sub in subs]
+                j_inner = j - 1
+            else:
+                t = [self.centre(sub) for sub in subs]
+                j_inner = j
+            result = self.join(
+                self.successor(self.join(t[0], t[1], t[3], t[4]), j_inner),
+                self.successor(self.join(t[1], t[2], t[4], t[5]), j_inner),
+                self.successor(self.join(t[3], t[4], t[6], t[7]), j_inner),
+                self.successor(self.join(t[4], t[5], t[7], t[8]), j_inner))
+
+        self.results[key] = result
+        return result
+
+    def step_pow2(self, j):
+        """ Advance the pattern by 2^j generations """
+        while self.root.level < j + 2 or not self.is_centred():
+            self.expand()
+        # room for the pattern to grow by 2^j cells on each side
+        self.expand()
+        self.expand()
+        quarter = 1 << (self.root.level - 2)
+        self.root = self.successor(self.root, j)
+        self.origin = (self.origin[0] + quarter, self.origin[1] + quarter)
+        self.generation += 1 << j
+        self.shrink()
+        if len(self.nodes) + len(self.results) > self.max_nodes // 2:
+            self.collect()
+
+    def jump(self, n_generations):
+        """ Advance the pattern by n_generations, one power of two at a time """
+        j = 0
+        while n_generations:
+            if n_generations & 1:
+                self.step_pow2(j)
+            n_generations >>= 1
+            j += 1
+        return self
+
+    # ---- memory ----
+
+    def evict(self):
+        """
+        Drop the node table and the result cache.
+        Nodes still in use stay valid, they are just no longer shared.
+        """
+        self.evictions += 1
+        self.nodes = {}
+        self.results = {}
+
+    def collect(self):
+        """ Drop the result cache and keep only the nodes of the current pattern """
+        self.results = {}
+        self.nodes = {}
+        stack = [self.root] + self.empty_nodes[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in self.nodes:
+                self.nodes[key] = node
+                stack.extend(key)
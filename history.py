@@ -0,0 +1,243 @@
+""" Rewind history of a stepped board """
+
+import sys
+from collections import deque
+import numpy as np
+from config import HISTORY_KEYFRAME_INTERVAL, HISTORY_MAX_BYTES
+import engines
+
+_EMPTY = np.zeros((0, 2), dtype=np.int16)
+# what a generation costs besides its cells: its slot in the changes list, with the list's spare room
+_SLOT_BYTES = 10
+# and a segment: its list, the list of its changes and the array of its keyframe
+_SEGMENT_BYTES = sys.getsizeof([0, _EMPTY, []]) + sys.getsizeof([]) + sys.getsizeof(_EMPTY)
+
+
+def pack_cells(rows, cols):
+    """ The cells as an (n, 2) array of (row, col), in the smallest integer type that holds them """
+    if not len(rows):
+        return _EMPTY
+    cells = np.stack((rows, cols), axis=1)
+    low, high = cells.min(), cells.max()
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return cells.astype(dtype)
+    return cells.astype(np.int64)
+
+
+class History:
+    """
+    A History class. Records every generation of a board so it can be
+    rewound. A generation is stored as the cells that changed in it, the
+    cells that were born or died, and every keyframe_interval generations
+    the whole board is stored too. Any generation is rebuilt from the
+    keyframe before it and fewer than keyframe_interval changes.
+
+    The changed cells are the ones the engine reports for its step (see
+    step_changes in engines.py), so recording a generation costs time in
+    the number of changes and not in the board area.
+
+    Once the stored generations take more than max_bytes, the oldest keyframe
+    and the changes after it are evicted first.
+
+    Important attributes:
+    --------------------
+
+    self.segments:
+        A deque of [first generation, keyframe, changes] lists, oldest first.
+        The keyframe holds the living cells of the first generation, changes[i]
+        the cells that changed in generation first + i + 1. Both are (n, 2)
+        arrays of padded (row, col), see pack_cells.
+
+    self.previous:
+        The board of the last recorded (or sought) generation, kept up to date
+        with the changes and keyframed from: a padded uint8 array for a board
+        of fixed shape, a set of (row, col) for an unbounded board.
+
+    self.num_of_bytes:
+        The memory taken by the stored generations, their arrays and the
+        lists holding them.
+
+    """
+    def __init__(self, keyframe_interval=HISTORY_KEYFRAME_INTERVAL, max_bytes=HISTORY_MAX_BYTES):
+        """ Initialize the History object """
+        self.keyframe_interval = keyframe_interval
+        self.max_bytes = max_bytes
+        self.reset()
+
+    def reset(self, shape=None):
+        """
+        Forget every generation, for a new or edited board.
+        shape is the (num_of_rows + 2, num_of_cols + 2) of the padded board, None if it is unbounded.
+        """
+        self.shape = shape
+        self.segments = deque()
+        self.num_of_bytes = 0
+        self.previous = None
+
+    @property
+    def oldest(self):
+        """ The first generation that can be rebuilt, None if nothing was recorded """
+        return self.segments[0][0] if self.segments else None
+
+    @property
+    def newest(self):
+        """ The last generation recorded, None if nothing was recorded """
+        if not self.segments:
+            return None
+        first, _, changes = self.segments[-1]
+        return first + len(changes)
+
+    def __contains__(self, generation):
+        return bool(self.segments) and self.oldest <= generation <= self.newest
+
+    # ---- recording ----
+
+    def record(self, engine, generation, changes=None):
+        """
+        Record the board of the engine as the given generation, normally the one after the last recorded.
+        changes are the (born, died) cells of the step to it, without them the generation is keyframed.
+        Recorded generations from this one on are dropped first, the board took another way.
+        """
+        if self.segments and generation <= self.newest:
+            self.truncate(generation - 1)
+        if not self.segments or generation != self.newest + 1:
+            self.segments.clear()
+            self.num_of_bytes = 0
+            self.add_segment(generation, self.load_previous(engine))
+            return
+        first, keyframe, segment_changes = self.segments[-1]
+        if changes is None:
+            self.add_segment(generation, self.load_previous(engine))
+        else:
+            changed = self.apply(*changes)
+            if generation - first >= self.keyframe_interval:
+                # every living cell was in the last keyframe or changed since
+                self.add_segment(generation, self.living_cells([keyframe, changed] + segment_changes))
+            else:
+                segment_changes.append(changed)
+                self.num_of_bytes += self.entry_bytes(changed)
+        self.evict()
+
+    def load_previous(self, engine):
+        """ Take the board of the engine as self.previous, returns its living cells as an (n, 2) array """
+        cells = engine.get_cells()
+        if self.shape is None:
+            self.previous = set(cells)
+        else:
+            self.previous = np.zeros(self.shape, dtype=np.uint8)
+        cells = engines.cells_array(cells)
+        if not len(cells):
+            return _EMPTY
+        if self.shape is not None:
+            self.previous[cells[:, 0], cells[:, 1]] = 1
+        return pack_cells(cells[:, 0], cells[:, 1])
+
+    def apply(self, born, died):
+        """ Apply the born and died (row, col) cells to self.previous, returns them as one changes array """
+        born, died = engines.cells_array(born), engines.cells_array(died)
+        if not len(born) and not len(died):
+            return _EMPTY
+        if self.shape is None:
+            self.previous.update(map(tuple, born.tolist()))
+            self.previous.difference_update(map(tuple, died.tolist()))
+        else:
+            self.previous[born[:, 0], born[:, 1]] = 1
+            self.previous[died[:, 0], died[:, 1]] = 0
+        changed = np.concatenate((born, died))
+        return pack_cells(changed[:, 0], changed[:, 1])
+
+    def living_cells(self, candidates):
+        """
+        The living cells of self.previous as an (n, 2) array, looked up among
+        a list of (n, 2) arrays of candidate cells that holds every one of them.
+        """
+        if self.shape is None:
+            if not self.previous:
+                return _EMPTY
+            rows, cols = np.array(list(self.previous)).T
+            return pack_cells(rows, cols)
+        cells = np.concatenate(candidates)
+        width = self.shape[1]
+        flat = np.unique(cells[:, 0].astype(np.int64) * width + cells[:, 1])
+        flat = flat[self.previous.ravel()[flat] != 0]
+        rows, cols = np.divmod(flat, width)
+        return pack_cells(rows, cols)
+
+    def add_segment(self, generation, keyframe):
+        """ Start a segment at the given generation, keyframe is the (n, 2) array of its living cells """
+        self.segments.append([generation, keyframe, []])
+        self.num_of_bytes += _SEGMENT_BYTES + keyframe.nbytes
+
+    def truncate(self, generation):
+        """ Drop every generation after the given one """
+        while self.segments and self.segments[-1][0] > generation:
+            self.num_of_bytes -= self.segment_bytes(self.segments.pop())
+        if self.segments:
+            first, _, changes = self.segments[-1]
+            while first + len(changes) > generation:
+                self.num_of_bytes -= self.entry_bytes(changes.pop())
+
+    def evict(self):
+        """ Drop the oldest segments until the history fits in self.max_bytes, the newest one is always kept """
+        while self.num_of_bytes > self.max_bytes and len(self.segments) > 1:
+            self.num_of_bytes -= self.segment_bytes(self.segments.popleft())
+
+    @staticmethod
+    def entry_bytes(changed):
+        """ The memory a generation's changes take, the shared empty array only costs its slot """
+        if changed is _EMPTY:
+            return _SLOT_BYTES
+        return _SLOT_BYTES + sys.getsizeof(changed)
+
+    @classmethod
+    def segment_bytes(cls, segment):
+        return _SEGMENT_BYTES + segment[1].nbytes + sum(cls.entry_bytes(changed) for changed in segment[2])
+
+    # ---- rewinding ----
+
+    def rebuild(self, generation):
+        """
+        The board of a recorded generation, a padded uint8 array or a set of (row, col) like self.previous.
+        Rebuilt from the keyframe before it: a cell is alive if it is in the
+        keyframe or changed an odd number of times since, not both.
+        """
+        for first, keyframe, changes in reversed(self.segments):
+            if first <= generation:
+                break
+        else:
+            raise KeyError(generation)
+        if generation > first + len(changes):
+            raise KeyError(generation)
+        changes = changes[:generation - first]
+        if self.shape is None:
+            board = set(map(tuple, keyframe.tolist()))
+            for changed in changes:
+                board.symmetric_difference_update(map(tuple, changed.tolist()))
+            return board
+        board = np.zeros(self.shape, dtype=np.uint8)
+        board[keyframe[:, 0], keyframe[:, 1]] = 1
+        # a cell is listed at most once per generation, so a plain xor is safe
+        for changed in changes:
+            board[changed[:, 0], changed[:, 1]] ^= 1
+        return board
+
+    def cells_at(self, generation):
+        """ The living cells of a recorded generation, a list of (row, col) """
+        board = self.rebuild(generation)
+        if self.shape is None:
+            return list(board)
+        rows, cols = np.nonzero(board)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def seek(self, generation):
+        """
+        The living cells of a recorded generation, which becomes the one the next
+        record is diffed against. The generations after it are kept until the next record.
+        """
+        self.previous = self.rebuild(generation)
+        if self.shape is None:
+            return list(self.previous)
+        rows, cols = np.nonzero(self.previous)
+        return list(zip(rows.tolist(), cols.tolist()))
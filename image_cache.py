@@ -0,0 +1,55 @@
+""" Caching of loaded and scaled images """
+
+import pygame
+
+
+class ImageCache:
+    """
+    An Image Cache class. Every image file is loaded from disk once, and
+    every size it is drawn at is scaled once, so the game and its menus
+    share the same surfaces.
+
+    Important attributes:
+    --------------------
+
+    self.images:
+        Loaded and scaled surfaces, keyed by (path, size). size is None for
+        the image as it is in the file.
+
+    self.hits, self.misses:
+        Lookup counters, see stats().
+
+    """
+    def __init__(self):
+        """ Initialize the ImageCache object """
+        self.images = {}
+        self.hits, self.misses = 0, 0
+
+    def get(self, path, size=None):
+        """ Return the image in path, scaled to size (width, height) if given. Loaded and scaled only once """
+        key = (path, size)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+        if size is None:
+            image = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                # in the pixel format of the display, so it blits without a conversion every frame
+                image = image.convert_alpha()
+        else:
+            image = pygame.transform.scale(self.get(path), size)
+        self.images[key] = image
+        return image
+
+    def preload(self, images):
+        """ Load and scale (path, size) images ahead of their first use """
+        for path, size in images:
+            self.get(path, size)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'images': len(self.images)}
+
+    def clear(self):
+        self.images.clear()
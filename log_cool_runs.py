@@ -1,80 +1,521 @@
-import openpyxl
+import array
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from config import RUN_LIBRARY_BACKEND, RUN_LIBRARY_BATCH_SIZE, RUN_SAVE_RETRIES, RUN_SAVE_RETRY_DELAY, log
 
+XLSX_FILE = 'assets/cool_runs.xlsx'
+SQLITE_FILE = 'assets/cool_runs.db'
+RUN_LIBRARY_FILE = SQLITE_FILE if RUN_LIBRARY_BACKEND == 'sqlite' else XLSX_FILE
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
 
-def log_run(curr_run, name, cell_size):
+
+class RunLibrary:
+    """
+    A Run Library class. The runs of a run library file, loaded once into
+    an in-memory index. Lookups are answered from the index, the file is
+    read again only when its modification time changes.
+
+    Log format:
+        Each run is saved as a row in the file, such that:
+        new_row = [seed name, cell_size, first cell, ..., last cell, -1, rule]
+        rule is the B/S name of the run's rule, rows saved without one end at -1.
+        The first row is a header.
+
+    Important attributes:
+    --------------------
+
+    self.names:
+        The seed name of every sheet row, self.names[i] is row i + 1.
+
+    self.runs:
+        seed name -> (cell_size, [cell, ..., cell], rule), for the first row of every name.
+        rule is None for runs saved without one.
+
+    self.stamp:
+        The (modification time, size) of the file when it was last read or written.
+
+    self.lock:
+        Held while the file is read or written, runs are saved from a RunSaver thread.
+
+    """
+    def __init__(self, file=RUN_LIBRARY_FILE):
+        """ Initialize the RunLibrary object """
+        self.file = file
+        self.names = []
+        self.runs = {}
+        self.stamp = None
+        self.loads = 0
+        self.lock = threading.RLock()
+
+    def file_stamp(self):
+        stat = os.stat(self.file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """ Read the file again if it changed since it was last read """
+        with self.lock:
+            if self.file_stamp() != self.stamp:
+                self.load()
+
+    def load(self):
+        """ Read the whole file into the index """
+        # openpyxl takes a while to import, it is only imported once a run library file is read
+        import openpyxl
+        self.stamp = self.file_stamp()
+        wb = openpyxl.load_workbook(filename=self.file, read_only=True)
+        ws = wb['Sheet1']
+        names, runs = [], {}
+        for row_index, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            name = row[0] if row else None
+            names.append(name)
+            if row_index > 1 and name is not None and name not in runs:
+                runs[name] = self.parse_row(row)
+        wb.close()
+        self.names, self.runs = names, runs
+        self.loads += 1
+
+    @staticmethod
+    def parse_row(row):
+        """ A sheet row to (cell_size, [cell, ..., cell], rule) """
+        cells = []
+        rule = None
+        for index in range(2, len(row)):
+            element = row[index]
+            if element == -1 or element is None:
+                if element == -1 and index + 1 < len(row):
+                    rule = row[index + 1]
+                break
+            cells.append(tuple(map(int, element.split(','))))
+        return int(row[1]), cells, rule
+
+    def get_run_arr(self, name):
+        """ Return [cell_size, first cell, ..., last cell], or [-1] if there is no such name """
+        if not name:
+            return [-1]
+        self.refresh()
+        run = self.runs.get(name)
+        if run is None:
+            return [-1]
+        return [run[0]] + run[1]
+
+    def get_run(self, name):
+        """ Return (cell_size, [first cell, ..., last cell], rule), or None if there is no such name """
+        if not name:
+            return None
+        self.refresh()
+        run = self.runs.get(name)
+        if run is None:
+            return None
+        return run[0], list(run[1]), run[2]
+
+    def get_name(self, index):
+        """ Return the seed name in sheet row index, None past the last row """
+        self.refresh()
+        if 1 <= index <= len(self.names):
+            return self.names[index - 1]
+        return None
+
+    def name_exists(self, name):
+        self.refresh()
+        return name in self.runs
+
+    def log_run(self, curr_run, name, cell_size, rule=None):
+        """ Append a run to the file, the index is updated in place """
+        self.log_runs([(curr_run, name, cell_size, rule)])
+
+    def log_runs(self, runs):
+        """
+        Append (curr_run, name, cell_size, rule) runs to the file, saving it once. rule may be None.
+        An OSError (a PermissionError while the file is open elsewhere) is raised
+        if the file cannot be written, nothing is saved then.
+        """
+        with self.lock:
+            self.write_runs(runs)
+
+    def write_runs(self, runs):
+        import openpyxl
+        self.refresh()
+        # open the sheet
+        wb = openpyxl.load_workbook(filename=self.file)
+        ws = wb['Sheet1']
+        first_row = ws.max_row + 1
+
+        for row, (curr_run, name, cell_size, rule) in enumerate(runs, start=first_row):
+            ws.cell(row=row, column=1, value=name)
+            ws.cell(row=row, column=2, value=cell_size)
+            last_col = 2
+            for col, cell in enumerate(curr_run, start=3):
+                ws.cell(row=row, column=col, value="{},{}".format(cell[0], cell[1]))
+                last_col = col
+            ws.cell(row=row, column=last_col+1, value=-1)
+            if rule is not None:
+                ws.cell(row=row, column=last_col+2, value=rule)
+
+        wb.save(self.file)
+
+        self.names.extend([None] * (first_row - 1 - len(self.names)))
+        for curr_run, name, cell_size, rule in runs:
+            self.names.append(name)
+            if name not in self.runs:
+                self.runs[name] = (cell_size, [tuple(cell) for cell in curr_run], rule)
+        self.stamp = self.file_stamp()
+
+    def flush(self):
+        """ Every write is saved right away, nothing to flush """
+
+
+def pack_cells(cells):
+    """ [(row, col), ...] to a blob of little endian int64 pairs, cells can be far off the board """
+    flat = array.array('q', [value for cell in cells for value in cell])
+    if sys.byteorder == 'big':
+        flat.byteswap()
+    return flat.tobytes()
+
+
+def unpack_cells(blob):
+    """ A blob from pack_cells back to [(row, col), ...] """
+    flat = array.array('q')
+    flat.frombytes(blob)
+    if sys.byteorder == 'big':
+        flat.byteswap()
+    return list(zip(flat[::2], flat[1::2]))
+
+
+class SqliteRunLibrary:
+    """
+    A Sqlite Run Library class. The same interface as RunLibrary, the runs
+    are rows of an SQLite database, looked up through its indexes.
+
+    Database format:
+        runs(id, name, cell_size, created, num_of_cells, cells, rule)
+        cells is a blob of little endian int64 (row, col) pairs, see pack_cells.
+        rule is the B/S name of the run's rule, NULL for runs saved without one.
+        name, cell_size and created are indexed. Names are not unique, the
+        first run of a name (lowest id) is the one that is loaded, as in RunLibrary.
+
+    Important attributes:
+    --------------------
+
+    self.pending:
+        Runs logged but not written yet, (name, cell_size, created, num_of_cells, cells, rule) rows.
+        They are written in one transaction once self.batch_size are pending,
+        at the end of a batch() block, on flush() and at exit.
+
+    self.batch_size:
+        Number of pending runs that triggers a write, 1 writes every run right away.
+
+    """
+    def __init__(self, file=SQLITE_FILE, batch_size=RUN_LIBRARY_BATCH_SIZE, migrate_from=XLSX_FILE):
+        """ Initialize the SqliteRunLibrary object, migrating migrate_from into a new database """
+        self.file = file
+        self.batch_size = batch_size
+        self.pending = []
+        self.batch_depth = 0
+        self.lock = threading.RLock()
+        is_new = not os.path.exists(file)
+        self.connection = sqlite3.connect(file, check_same_thread=False)
+        self.create_tables()
+        if is_new and migrate_from is not None and os.path.exists(migrate_from):
+            self.migrate(migrate_from)
+        atexit.register(self.flush)
+
+    def create_tables(self):
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    cell_size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    num_of_cells INTEGER NOT NULL,
+                    cells BLOB NOT NULL,
+                    rule TEXT
+                );
+                CREATE INDEX IF NOT EXISTS runs_name ON runs (name);
+                CREATE INDEX IF NOT EXISTS runs_cell_size ON runs (cell_size);
+                CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+            """)
+
+    def migrate(self, xlsx_file):
+        """ One time import of every run of an xlsx run library, in sheet order """
+        import openpyxl
+        created = os.path.getmtime(xlsx_file)
+        wb = openpyxl.load_workbook(filename=xlsx_file, read_only=True)
+        rows = []
+        for row in wb['Sheet1'].iter_rows(min_row=2, values_only=True):
+            if not row or row[0] is None:
+                continue
+            cell_size, cells, rule = RunLibrary.parse_row(row)
+            rows.append((row[0], cell_size, created, len(cells), pack_cells(cells), rule))
+        wb.close()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO runs (name, cell_size, created, num_of_cells, cells, rule) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    # ---- writes ----
+
+    def log_run(self, curr_run, name, cell_size, rule=None):
+        """ Queue a run, it is written with the next batch """
+        with self.lock:
+            cells = [tuple(cell) for cell in curr_run]
+            self.pending.append((name, cell_size, time.time(), len(cells), pack_cells(cells), rule))
+            if self.batch_depth == 0 and len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def log_runs(self, runs):
+        """ Write (curr_run, name, cell_size, rule) runs in one transaction """
+        with self.batch():
+            for curr_run, name, cell_size, rule in runs:
+                self.log_run(curr_run, name, cell_size, rule)
+
+    @contextmanager
+    def batch(self):
+        """ Runs logged inside the block are written together when it ends """
+        with self.lock:
+            self.batch_depth += 1
+            try:
+                yield self
+            finally:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        """ Write every pending run in one transaction, nothing is written if it fails """
+        with self.lock:
+            if not self.pending:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO runs (name, cell_size, created, num_of_cells, cells, rule) VALUES (?, ?, ?, ?, ?, ?)",
+                    self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    # ---- lookups ----
+
+    def find_pending(self, name):
+        for row in self.pending:
+            if row[0] == name:
+                return row
+        return None
+
+    def get_run_arr(self, name):
+        """ Return [cell_size, first cell, ..., last cell], or [-1] if there is no such name """
+        if not name:
+            return [-1]
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT cell_size, cells FROM runs WHERE name = ? ORDER BY id LIMIT 1", (name,)).fetchone()
+            if row is None:
+                pending = self.find_pending(name)
+                if pending is None:
+                    return [-1]
+                row = pending[1], pending[4]
+        return [row[0]] + unpack_cells(row[1])
+
+    def get_run(self, name):
+        """ Return (cell_size, [first cell, ..., last cell], rule), or None if there is no such name """
+        if not name:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT cell_size, cells, rule FROM runs WHERE name = ? ORDER BY id LIMIT 1", (name,)).fetchone()
+            if row is None:
+                pending = self.find_pending(name)
+                if pending is None:
+                    return None
+                row = pending[1], pending[4], pending[5]
+        return row[0], unpack_cells(row[1]), row[2]
+
+    def get_name(self, index):
+        """ Return the seed name of run number index - 1 (index 2 is the first run, as in the sheet), None past the last """
+        if index < 2:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT name FROM runs ORDER BY id LIMIT 1 OFFSET ?", (index - 2,)).fetchone()
+            if row is not None:
+                return row[0]
+            index -= 2 + self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            if index < len(self.pending):
+                return self.pending[index][0]
+        return None
+
+    def name_exists(self, name):
+        with self.lock:
+            row = self.connection.execute("SELECT 1 FROM runs WHERE name = ? LIMIT 1", (name,)).fetchone()
+            return row is not None or self.find_pending(name) is not None
+
+    def find_runs(self, cell_size=None, created_after=None):
+        """ Names of the runs of a cell size and / or logged after a time.time(), oldest first """
+        self.flush()
+        query, params = "SELECT name FROM runs WHERE 1", []
+        if cell_size is not None:
+            query += " AND cell_size = ?"
+            params.append(cell_size)
+        if created_after is not None:
+            query += " AND created > ?"
+            params.append(created_after)
+        with self.lock:
+            return [row[0] for row in self.connection.execute(query + " ORDER BY created, id", params)]
+
+
+class RunSaver:
+    """
+    A Run Saver class. Saves runs to a run library on a background thread,
+    in the order they are given, so the game never waits on the file.
+
+    A save is checked against the names in the library when its turn
+    comes, and a write that fails (the file open in another program) is
+    tried again a few times before the save is given up. Any other error
+    fails that save only, it is reported and the thread goes on to the next.
+
+    Important attributes:
+    --------------------
+
+    self.jobs:
+        The queue of (curr_run, name, cell_size, rule) saves, None stops the thread.
+
+    self.notify:
+        Called with the result of every save, from the saving thread: a dict of the
+        run's 'name', its 'status' ('saved', 'exists' or 'failed'), the write 'attempts'
+        and the 'error' of the last failed attempt.
+
+    """
+    def __init__(self, notify=None, file=RUN_LIBRARY_FILE, retries=RUN_SAVE_RETRIES, retry_delay=RUN_SAVE_RETRY_DELAY):
+        """ Initialize the RunSaver object and start its thread """
+        self.notify = notify
+        self.file = file
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='run saver', daemon=True)
+        self.thread.start()
+        # the saves queued are written before the program exits
+        atexit.register(self.close)
+
+    def save(self, curr_run, name, cell_size, rule=None):
+        """ Queue a run to be saved, returns right away """
+        self.jobs.put(([tuple(cell) for cell in curr_run], name, cell_size, rule))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                result = self.write(*job)
+            except Exception as e:
+                # a library that cannot be read, a broken file: the save fails, not the saver
+                result = {'name': job[1], 'status': 'failed', 'attempts': 0, 'error': error_text(e)}
+            if self.notify is not None:
+                try:
+                    self.notify(result)
+                except Exception as e:
+                    # the saves after this one are still written
+                    log("run saver: could not report {}: {}".format(result, e))
+
+    def write(self, curr_run, name, cell_size, rule):
+        """ Save a run unless its name is taken, returns the result passed to self.notify """
+        library = get_library(self.file)
+        result = {'name': name, 'status': 'saved', 'attempts': 0, 'error': None}
+        try:
+            if library.name_exists(name):
+                result['status'] = 'exists'
+                return result
+        except (OSError, sqlite3.Error) as e:
+            result['status'], result['error'] = 'failed', error_text(e)
+            return result
+        for attempt in range(1, self.retries + 1):
+            result['attempts'] = attempt
+            try:
+                # an sqlite library keeps a run it could not write pending, only the write is tried again
+                if attempt == 1 or not library.name_exists(name):
+                    library.log_run(curr_run, name, cell_size, rule)
+                library.flush()
+                result['error'] = None
+                break
+            except (OSError, sqlite3.Error) as e:
+                result['error'] = error_text(e)
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay)
+            except Exception as e:
+                # not something trying again fixes, like a library file that is not a workbook
+                result['error'] = error_text(e)
+                break
+        if result['error'] is not None:
+            result['status'] = 'failed'
+        return result
+
+    def close(self):
+        """ Write the saves queued and stop the thread """
+        if self.thread.is_alive():
+            self.jobs.put(None)
+            self.thread.join()
+
+
+def error_text(e):
+    """ The message of an exception for a save result, its type name if it has none """
+    if isinstance(e, (OSError, sqlite3.Error)):
+        return str(e) or type(e).__name__
+    return "{}: {}".format(type(e).__name__, e) if str(e) else type(e).__name__
+
+
+_libraries = {}
+
+
+def get_library(file=RUN_LIBRARY_FILE):
+    """ The run library of the given file, one per file. SQLite for .db files, else xlsx """
+    library = _libraries.get(file)
+    if library is None:
+        if file.lower().endswith(SQLITE_EXTENSIONS):
+            library = SqliteRunLibrary(file)
+        else:
+            library = RunLibrary(file)
+        _libraries[file] = library
+    return library
+
+
+def log_run(curr_run, name, cell_size, rule=None, file=RUN_LIBRARY_FILE):
     """
-    Log a given run
+    Log a given run, rule is the B/S name of the rule it is played with
 
     Log format:
         Each run is saved as a row in assets/cool_runs.xlsx, such that:
-        new_row = [seed name, cell_size, first cell, ..., last cell, -1]
+        new_row = [seed name, cell_size, first cell, ..., last cell, -1, rule]
+        or as a row of assets/cool_runs.db with RUN_LIBRARY_BACKEND = 'sqlite'.
 
     """
-    file = 'assets/cool_runs.xlsx'
-    new_row = []
-    for cell in curr_run:
-        string = "{},{}".format(str(cell[0]), str(cell[1]))
-        new_row.append(string)
-
-    # open the sheet
-    wb = openpyxl.load_workbook(filename=file)
-    ws = wb['Sheet1']
-    row = ws.max_row + 1
-
-    ws.cell(row=row, column=1, value=name)
-    ws.cell(row=row, column=2, value=cell_size)
-    last_col = 0
-    for col, entry in enumerate(new_row, start=3):
-        ws.cell(row=row, column=col, value=entry)
-        last_col = col
-    ws.cell(row=row, column=last_col+1, value=-1)
-
-    try:
-        wb.save(file)
-    except PermissionError:
-        pass
-
-
-def get_run_arr_by_name(name):
-    if not name:
-        return [-1]
-    # open the sheet
-    file = 'assets/cool_runs.xlsx'
-    wb = openpyxl.load_workbook(filename=file)
-    ws = wb['Sheet1']
-
-    for row in ws.iter_rows(min_row=2):
-        if row[0].value == name:
-            run_arr_str = [row[i].value for i in range(len(row))]
-            run_arr_tup = [int(run_arr_str[1])]  # cell size first
-            for index, element in enumerate(run_arr_str):
-                if index > 1:
-                    if run_arr_str[index] == -1:
-                        break
-                    run_arr_tup.append(tuple(map(int, element.split(','))))
-            return run_arr_tup
-
-    return [-1]
-
-
-def get_name_by_index(index):
-    # open the sheet
-    file = 'assets/cool_runs.xlsx'
-    wb = openpyxl.load_workbook(filename=file)
-    ws = wb['Sheet1']
-
-    row = ws[index]
-    return row[0].value
-
-
-def check_name_exists(name):
-    # open the sheet
-    file = 'assets/cool_runs.xlsx'
-    wb = openpyxl.load_workbook(filename=file)
-    ws = wb['Sheet1']
-
-    for row in ws.iter_rows(min_row=2):
-        if row[0].value == name:
-            return True
-    return False
+    get_library(file).log_run(curr_run, name, cell_size, rule)
+
+
+def log_runs(runs, file=RUN_LIBRARY_FILE):
+    """ Log (curr_run, name, cell_size, rule) runs with a single write """
+    get_library(file).log_runs(runs)
+
+
+def get_run_arr_by_name(name, file=RUN_LIBRARY_FILE):
+    return get_library(file).get_run_arr(name)
+
+
+def get_run_by_name(name, file=RUN_LIBRARY_FILE):
+    """ (cell_size, [cell, ..., cell], rule) of the run, rule is None if it was saved without one. None if there is no such name """
+    return get_library(file).get_run(name)
+
+
+def get_name_by_index(index, file=RUN_LIBRARY_FILE):
+    return get_library(file).get_name(index)
+
 
+def check_name_exists(name, file=RUN_LIBRARY_FILE):
+    return get_library(file).name_exists(name)
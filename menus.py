@@ -1,6 +1,10 @@
+import os
 import pygame
 import config as conf
 import log_cool_runs as lcr
+import patterns
+import rules
+import startup
 
 
 class Menu:
@@ -43,8 +47,14 @@ class Menu:
 
     def blit_screen(self):
         """ Attache the menu on top of the game screen and reset inputs """
-        self.game.screen.blit(self.game.top_view, (0, 0))
-        pygame.display.update()
+        profiler = self.game.profiler
+        if self.game.top_view is not self.game.screen:
+            self.game.screen.blit(self.game.top_view, (0, 0))
+        self.game.draw_profile_hud()
+        with profiler.phase('display_update', type(self).__name__):
+            pygame.display.update()
+        profiler.frame(type(self).__name__)
+        startup.first_frame(conf.STARTUP_REPORT)
         self.game.reset_keys()
 
 
@@ -68,11 +78,9 @@ class MainMenu(Menu):
         self.run_cursor_offset = -130
         self.cursor_offset_x = self.run_cursor_offset
         self.state = "Run Random"
-        self.bacteria_size = 50
-        self.bacteria_image = pygame.image.load('assets/virus_red.png')
-        self.bacteria_image = pygame.transform.scale(self.bacteria_image, (self.bacteria_size, self.bacteria_size))
-        self.reverse_image = pygame.image.load('assets/reverse.png')
-        self.reverse_image = pygame.transform.scale(self.reverse_image, (self.bacteria_size, self.bacteria_size))
+        self.bacteria_size = conf.MENU_IMAGE_SIZE
+        self.bacteria_image = self.game.image_cache.get(conf.BACTERIA_IMAGE, (self.bacteria_size, self.bacteria_size))
+        self.reverse_image = self.game.image_cache.get(conf.REVERSE_IMAGE, (self.bacteria_size, self.bacteria_size))
         self.curr_image = self.bacteria_image
         self. bacteria_x, self.bacteria_y = round(self.mid_w * 1.8), 100
         self.run_random_x, self.run_random_y = self.mid_w - 150, self.mid_h + self.default_text_gap
@@ -93,6 +101,7 @@ class MainMenu(Menu):
             self.check_input()
             # display change
             self.update_bacteria_mode(mouse_pos)
+            self.curr_image = self.reverse_image if self.game.bacteria_mode else self.bacteria_image
             self.game.top_view.fill(self.background)
             self.game.top_view.blit(self.curr_image, (self.bacteria_x, self.bacteria_y))
             self.game.draw_text('The Game Of Life', + self.default_text_gap + 10,  self.mid_w, self.mid_h - 100)
@@ -170,16 +179,11 @@ class MainMenu(Menu):
             self.run_display = False
 
     def update_bacteria_mode(self, mouse_pos):
-        """ Go in and out of bacteria mode and display image accordingly """
+        """ Go in and out of bacteria mode, the image shown follows game.bacteria_mode """
         if mouse_pos is not None:
             if (self.bacteria_x <= mouse_pos[0] <= self.bacteria_x + self.bacteria_size) and \
                     (self.bacteria_y <= mouse_pos[1] <= self.bacteria_y + self.bacteria_size):
-                if self.game.bacteria_mode:
-                    self.game.bacteria_mode = False
-                    self.curr_image = self.bacteria_image
-                else:
-                    self.game.bacteria_mode = True
-                    self.curr_image = self.reverse_image
+                self.game.bacteria_mode = not self.game.bacteria_mode
 
 
 class LoadMenu(Menu):
@@ -230,17 +234,32 @@ class LoadMenu(Menu):
             self.game.curr_menu = self.game.main_menu
             return
 
-        run_arr = lcr.get_run_arr_by_name(name)
+        # a pattern file path instead of a run name
+        if patterns.is_pattern_file(name) and os.path.isfile(name):
+            pattern = self.game.cell_grid.load_pattern(name)
+            if pattern.rule:
+                # the rule the pattern was loaded with, see Simulation.load_pattern
+                self.game.set_rule(self.game.simulation.rule.name)
+            self.game.curr_run = self.game.cell_grid.get_live_cells()
+            self.run_display = False
+            self.game.curr_menu = self.game.main_menu
+            self.game.playing = True
+            self.game.loaded = True
+            return
+
+        run = lcr.get_run_by_name(name)
         # if name is empty or there is no match for name
-        if run_arr[0] == -1:
+        if run is None:
             self.no_such_name = True
             return
         else:
-            cell_size = run_arr.pop(0)
+            cell_size, run_arr, rule = run
             self.game.cell_grid.new_grid(cell_size)
+            if rule is not None:
+                self.game.set_rule(rule)
         # load coordinates
-        for tup in run_arr:
-            self.game.cell_grid.grid[tup[0]][tup[1]].live()
+        self.game.cell_grid.load_run(run_arr)
+        self.game.curr_run = run_arr
 
         # now play and setup for after the run
         self.run_display = False
@@ -258,7 +277,8 @@ class SetupMenu(Menu):
     -------------------------------
 
     self.state (override):
-        The states are entries in a 3x2 matrix, each can be active/inactive.
+        The states are entries in a 4x2 matrix, each can be active/inactive.
+        The last row has the rule only, in its first column.
 
     self.changing_settings:
         This is an intermediate state.
@@ -293,13 +313,23 @@ class SetupMenu(Menu):
         self.life_chance = self.game.life_chance_for_random_start
         self.cell_size_index = self.game.cell_size // 10 - 1
         self.speed_index = conf.SPEED_INDEX
+        self.rule_list = list(conf.RULES)
+        self.rule_index = 0
+        self.rule_text_color = game.text_color
         self.cell_size_text_color, self.speed_index_text_color, self.alive_color_index_text_color,\
             self.dead_color_index_text_color, self.area_edge_size_text_color, self.life_chance_text_color = \
             game.text_color, game.text_color, game.text_color, game.text_color, game.text_color, game.text_color
 
+    def sync_rule_index(self):
+        """ Point self.rule_index at the game's rule, a rule loaded with a run is added to the list """
+        if self.game.rule not in self.rule_list:
+            self.rule_list.append(self.game.rule)
+        self.rule_index = self.rule_list.index(self.game.rule)
+
     def display_menu(self):
         """ Display the menu on the game screen """
         self.run_display = True
+        self.sync_rule_index()
         while self.run_display:
             self.game.check_events()
             self.check_input_and_change_state()
@@ -318,6 +348,8 @@ class SetupMenu(Menu):
             self.game.draw_text("{}".format(self.area_edge_size ** 2), self.default_text_size, self.input_box_x + self.box_offset_x, self.input_box_y + self.box_offset_y)
             self.game.draw_text("{}".format(self.life_chance), self.default_text_size, self.input_box_x, self.input_box_y + self.box_offset_y * 2)
             self.game.draw_text("{}".format(self.cell_size_list[self.cell_size_index]), self.default_text_size, self.input_box_x + self.box_offset_x, self.input_box_y + self.box_offset_y * 2)
+            self.game.draw_text("Rule:", self.default_text_size, self.box_x, self.box_y + self.box_offset_y * 3, self.rule_text_color)
+            self.game.draw_text("{}".format(rules.get_rule(self.rule_list[self.rule_index]).label()), self.default_text_size, self.input_box_x, self.input_box_y + self.box_offset_y * 3)
             self.draw_cursor()
             self.blit_screen()
 
@@ -336,6 +368,8 @@ class SetupMenu(Menu):
         self.game.update_grid_color()
         self.game.start_area_edge = self.area_edge_size
         self.game.life_chance_for_random_start = self.life_chance
+        if self.rule_list[self.rule_index] != self.game.rule:
+            self.game.set_rule(self.rule_list[self.rule_index])
 
     def check_input_and_change_state(self):
         # self.changing_settings != [3, 3] therefor input changes settings.
@@ -399,6 +433,17 @@ class SetupMenu(Menu):
                 self.game.num_of_rows = self.game.screen_h // self.game.cell_size
                 self.area_edge_size = min(self.game.num_of_rows - 5, self.area_edge_size)
 
+        elif self.changing_settings == [0, 3]:
+            if self.game.ENTER_KEY:
+                self.changing_settings = [3, 3]
+                self.rule_text_color = self.game.text_color
+            elif self.game.UP_KEY:
+                self.rule_index += 1
+                self.rule_index %= len(self.rule_list)
+            elif self.game.DOWN_KEY:
+                self.rule_index -= 1
+                self.rule_index %= len(self.rule_list)
+
         # self.changing_settings == [3, 3] therefor input changes inactive states.
         else:
             got_input = False
@@ -435,10 +480,14 @@ class SetupMenu(Menu):
                     self.life_chance_text_color = self.game.selected_text_color
                 elif self.changing_settings == [1, 2]:
                     self.cell_size_text_color = self.game.selected_text_color
+                elif self.changing_settings == [0, 3]:
+                    self.rule_text_color = self.game.selected_text_color
 
             if got_input:
                 self.state[0] = self.state[0] % 2
-                self.state[1] = self.state[1] % 3
+                self.state[1] = self.state[1] % 4
+                if self.state[1] == 3:
+                    self.state[0] = 0
                 self.cursor_rect.midtop = (self.box_x + self.cursor_offset_x + self.box_offset_x * self.state[0],
                                            self.box_y + self.box_offset_y * self.state[1])
 
@@ -449,6 +498,8 @@ class InfoMenu(Menu):
     """
     def __init__(self, game):
         Menu.__init__(self, game)
+        with open('assets/info.txt', 'r') as info_file:
+            self.info_lines = [line[:-1] for line in info_file.readlines()]
 
     def display_menu(self):
         self.run_display = True
@@ -456,9 +507,8 @@ class InfoMenu(Menu):
             self.game.check_events()
             self.check_input()
             self.game.top_view.fill(self.background)
-            with open('assets/info.txt', 'r') as info_file:
-                for i, line in enumerate(info_file.readlines()):
-                    self.game.draw_text(line[:-1], self.default_text_size + 5, self.game.screen_w / 2, self.game.screen_h / 2 - 350 + 40*i)
+            for i, line in enumerate(self.info_lines):
+                self.game.draw_text(line, self.default_text_size + 5, self.game.screen_w / 2, self.game.screen_h / 2 - 350 + 40*i)
 
             self.blit_screen()
 
@@ -0,0 +1,268 @@
+""" Life pattern files: RLE (.rle) and plaintext (.cells) import and export
+
+Cells are (row, col) coordinates of the game board, like curr_run.
+The cell size is kept as metadata, as log_run does:
+    RLE:        #C cell_size 10     and the top left corner as  #C origin col row
+    plaintext:  !cell_size: 10      and the top left corner as  !origin: col row
+"""
+
+import re
+
+PATTERN_EXTENSIONS = ('.rle', '.cells')
+CHUNK_SIZE = 1 << 16
+RLE_LINE_LENGTH = 70
+
+_RLE_TOKEN = re.compile(r'(\d*)([^\d])')
+_RLE_HEADER = re.compile(r'x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def is_pattern_file(path):
+    return path is not None and path.lower().endswith(PATTERN_EXTENSIONS)
+
+
+class PatternFile:
+    """
+    A Pattern File class. Opens a .rle or .cells file and reads its header
+    right away, the cells are streamed from the file by cells().
+
+    Important attributes:
+    --------------------
+
+    self.name, self.cell_size, self.rule:
+        Metadata of the pattern, None if the file does not have it.
+
+    self.width, self.height:
+        The pattern bounding box, known up front for RLE only.
+
+    self.origin:
+        The (row, col) of the top left corner if the file was written by this game, else None.
+        The #R and #P offsets of other RLE files are relative to a center of their own, not the board.
+
+    """
+    def __init__(self, path):
+        """ Initialize the PatternFile object and read the header """
+        self.path = path
+        self.format = 'rle' if path.lower().endswith('.rle') else 'cells'
+        self.name, self.cell_size, self.rule = None, None, None
+        self.width, self.height = None, None
+        self.origin = None
+        self.file = open(path, 'r')
+        self.first_data = ''
+        if self.format == 'rle':
+            self.read_rle_header()
+        else:
+            self.read_plaintext_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    # ---- header ----
+
+    def read_comment(self, text):
+        """ Metadata from a comment line, both formats """
+        words = text.replace(':', ' ').split()
+        if len(words) >= 2 and words[0].lower() == 'cell_size':
+            self.cell_size = int(words[1])
+        elif len(words) >= 3 and words[0].lower() == 'origin':
+            self.origin = (int(words[2]), int(words[1]))
+        elif len(words) >= 2 and words[0].lower() == 'name':
+            self.name = text.split(':', 1)[-1].strip()
+
+    def read_rle_header(self):
+        for line in self.file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                tag, text = line[:2], line[2:].strip()
+                if tag == '#N':
+                    self.name = text
+                elif tag in ('#C', '#c'):
+                    self.read_comment(text)
+                continue
+            header = _RLE_HEADER.match(line)
+            if header:
+                self.width, self.height = int(header.group(1)), int(header.group(2))
+                self.rule = header.group(3)
+            else:
+                # no header line, this is already pattern data
+                self.first_data = line
+            return
+
+    def read_plaintext_header(self):
+        for line in self.file:
+            if line.startswith('!'):
+                self.read_comment(line[1:].strip())
+                continue
+            self.first_data = line
+            return
+
+    # ---- cells ----
+
+    def placement(self, num_of_rows=None, num_of_cols=None):
+        """
+        The (row, col) of the pattern's top left corner on a board:
+        the origin from the file, else centered when the size is known, else (1, 1).
+        """
+        if self.origin is not None:
+            return self.origin
+        if num_of_rows is not None and self.width is not None:
+            return max(1, (num_of_rows - self.height) // 2 + 1), max(1, (num_of_cols - self.width) // 2 + 1)
+        return 1, 1
+
+    def runs(self):
+        """ Stream the pattern as (row, first col, length) runs of living cells, relative to its corner """
+        if self.format == 'rle':
+            return self.rle_runs()
+        return self.plaintext_runs()
+
+    def cells(self, top=None, left=None):
+        """ Stream the (row, col) of every living cell, with its top left corner at (top, left) """
+        if top is None or left is None:
+            top, left = self.placement()
+        for row, col, length in self.runs():
+            row += top
+            col += left
+            for c in range(col, col + length):
+                yield row, c
+
+    def rle_runs(self):
+        row, col = 0, 0
+        pending = self.first_data
+        while True:
+            chunk = self.file.read(CHUNK_SIZE)
+            data = pending + _WHITESPACE.sub('', chunk)
+            if chunk:
+                # keep a count that may continue in the next chunk
+                end = len(data.rstrip('0123456789'))
+                data, pending = data[:end], data[end:]
+            for match in _RLE_TOKEN.finditer(data):
+                count = int(match.group(1)) if match.group(1) else 1
+                tag = match.group(2)
+                if tag == 'b' or tag == '.':
+                    col += count
+                elif tag == '$':
+                    row += count
+                    col = 0
+                elif tag == '!':
+                    return
+                else:
+                    yield row, col, count
+                    col += count
+            if not chunk:
+                return
+
+    def plaintext_runs(self):
+        lines = self.file
+        row = 0
+        if self.first_data:
+            lines = _chain_line(self.first_data, self.file)
+        for line in lines:
+            if line.startswith('!'):
+                continue
+            line = line.rstrip()
+            for match in re.finditer(r'[O*]+', line):
+                yield row, match.start(), match.end() - match.start()
+            row += 1
+
+
+def _chain_line(first_line, lines):
+    yield first_line
+    yield from lines
+
+
+def read_pattern(path):
+    """ Return (PatternFile, list of cells at the pattern's placement), for small patterns """
+    with PatternFile(path) as pattern:
+        return pattern, list(pattern.cells())
+
+
+# ---- export ----
+
+def write_pattern(path, cells, cell_size=None, name=None, rule=None):
+    """ Write cells (for example curr_run or a board's living cells) in the format of the path's extension """
+    if path.lower().endswith('.rle'):
+        write_rle(path, cells, cell_size, name, rule)
+    else:
+        write_plaintext(path, cells, cell_size, name)
+
+
+def _bounds(cells):
+    top = min(row for row, _ in cells)
+    left = min(col for _, col in cells)
+    bottom = max(row for row, _ in cells)
+    right = max(col for _, col in cells)
+    return top, left, bottom - top + 1, right - left + 1
+
+
+def write_rle(path, cells, cell_size=None, name=None, rule=None):
+    cells = sorted(set(cells))
+    top, left, height, width = _bounds(cells) if cells else (0, 0, 0, 0)
+    with open(path, 'w') as f:
+        if name:
+            f.write('#N {}\n'.format(name))
+        if cell_size:
+            f.write('#C cell_size {}\n'.format(cell_size))
+        f.write('#C origin {} {}\n'.format(left, top))
+        f.write('x = {}, y = {}, rule = {}\n'.format(width, height, rule or 'B3/S23'))
+
+        tokens = []
+        row, col = 0, 0  # position of the next cell to encode, relative to (top, left)
+        run_start, run_length = None, 0
+        for cell_row, cell_col in cells:
+            r, c = cell_row - top, cell_col - left
+            if run_length and r == row and c == run_start + run_length:
+                run_length += 1
+                continue
+            if run_length:
+                tokens.append(_rle_token(run_length, 'o'))
+                col = run_start + run_length
+            if r > row:
+                tokens.append(_rle_token(r - row, '$'))
+                row, col = r, 0
+            if c > col:
+                tokens.append(_rle_token(c - col, 'b'))
+            run_start, run_length = c, 1
+        if run_length:
+            tokens.append(_rle_token(run_length, 'o'))
+        tokens.append('!')
+
+        line = ''
+        for token in tokens:
+            if len(line) + len(token) > RLE_LINE_LENGTH:
+                f.write(line + '\n')
+                line = ''
+            line += token
+        f.write(line + '\n')
+
+
+def _rle_token(count, tag):
+    return '{}{}'.format(count if count > 1 else '', tag)
+
+
+def write_plaintext(path, cells, cell_size=None, name=None):
+    cells = sorted(set(cells))
+    top, left, height, width = _bounds(cells) if cells else (0, 0, 0, 0)
+    with open(path, 'w') as f:
+        if name:
+            f.write('!Name: {}\n'.format(name))
+        if cell_size:
+            f.write('!cell_size: {}\n'.format(cell_size))
+        f.write('!origin: {} {}\n'.format(left, top))
+        index = 0
+        for r in range(top, top + height):
+            line = []
+            col = left
+            while index < len(cells) and cells[index][0] == r:
+                c = cells[index][1]
+                line.append('.' * (c - col) + 'O')
+                col = c + 1
+                index += 1
+            f.write(''.join(line) + '\n')
@@ -0,0 +1,238 @@
+""" Per phase timing of the game and menu loops, and Chrome trace export
+
+A loop wraps each of its phases in profiler.phase(name, loop) and marks
+every frame it displays with profiler.frame(loop). While the profiler is
+disabled, phase() hands back one shared context that does nothing, so the
+instrumentation costs a method call per phase.
+
+The trace is written in the Chrome trace event format, a JSON file that
+chrome://tracing, https://ui.perfetto.dev or speedscope open.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+import numpy as np
+from config import PROFILE_WINDOW, PROFILE_TRACE_EVENTS, PROFILE_HUD_INTERVAL
+
+
+class _NullPhase:
+    """ The phase of a disabled profiler """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """ A timed phase of a loop, see Profiler.phase """
+    __slots__ = ('profiler', 'name', 'loop', 'start')
+
+    def __init__(self, profiler, name, loop):
+        self.profiler = profiler
+        self.name = name
+        self.loop = loop
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_phase(self.name, self.loop, self.start, time.perf_counter_ns() - self.start)
+        return False
+
+
+def process_memory():
+    """ The memory the process uses in bytes, its resident set, None where it cannot be read """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # the peak rather than the current size, in kilobytes on linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Profiler:
+    """
+    A Profiler class. Times the phases and frames of the game's loops while
+    it is enabled, for the profiling HUD, and keeps them as trace events
+    while it is tracing.
+
+    Important attributes:
+    --------------------
+
+    self.enabled, self.tracing:
+        Whether phases are timed, and whether they are kept for the trace too.
+        Tracing enables the profiler.
+
+    self.frame_times:
+        The seconds between the last PROFILE_WINDOW frames displayed, for percentiles.
+
+    self.phase_totals:
+        Nanoseconds spent per phase name since the last summary().
+
+    self.events:
+        Trace events, (phase type, name, loop, start ns, duration ns or counter value),
+        the oldest are dropped past PROFILE_TRACE_EVENTS.
+
+    """
+    def __init__(self, window=PROFILE_WINDOW, max_trace_events=PROFILE_TRACE_EVENTS):
+        """ Initialize the Profiler object, disabled """
+        self.enabled = False
+        self.tracing = False
+        self.origin = time.perf_counter_ns()
+        self.frame_times = deque(maxlen=window)
+        self.events = deque(maxlen=max_trace_events)
+        self.phase_totals = {}
+        self.last_frame = None
+        self.interval_start = None
+        self.interval_frames = 0
+        self.interval_generation = None
+
+    def enable(self, enabled=True):
+        """ Start or stop timing, the HUD's numbers start over """
+        self.enabled = enabled or self.tracing
+        self.frame_times.clear()
+        self.phase_totals = {}
+        self.last_frame = None
+        self.interval_start = time.perf_counter() if self.enabled else None
+        self.interval_frames = 0
+        self.interval_generation = None
+
+    def start_trace(self):
+        """ Keep the phases as trace events from now on """
+        self.events.clear()
+        self.tracing = True
+        if not self.enabled:
+            self.enable()
+
+    def stop_trace(self, path, keep_enabled=False):
+        """ Write the trace events to path, returns the number of events written """
+        self.tracing = False
+        num_of_events = self.write_trace(path)
+        self.events.clear()
+        if not keep_enabled:
+            self.enable(False)
+        return num_of_events
+
+    # ---- timing ----
+
+    def phase(self, name, loop):
+        """ A context timing a phase of a loop, does nothing while the profiler is disabled """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name, loop)
+
+    def add_phase(self, name, loop, start, duration):
+        self.phase_totals[name] = self.phase_totals.get(name, 0) + duration
+        if self.tracing:
+            self.events.append(('X', name, loop, start, duration))
+
+    def frame(self, loop):
+        """ Mark a frame of a loop as displayed """
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.last_frame is not None:
+            self.frame_times.append((now - self.last_frame) / 1e9)
+            if self.tracing:
+                # the frame spans its phases in the trace viewer
+                self.events.append(('X', 'frame', loop, self.last_frame, now - self.last_frame))
+        self.last_frame = now
+        self.interval_frames += 1
+
+    def counter(self, name, value):
+        """ A value over time in the trace, like the number of living cells """
+        if self.tracing:
+            self.events.append(('C', name, None, time.perf_counter_ns(), value))
+
+    # ---- reporting ----
+
+    def summary_due(self):
+        return self.enabled and (self.interval_start is None or
+                                 time.perf_counter() - self.interval_start >= PROFILE_HUD_INTERVAL)
+
+    def summary(self, generation=None):
+        """
+        The numbers since the last summary: frames and generations per second,
+        milliseconds per frame of every phase and of the 'other' time between them,
+        the memory of the process and the percentiles of the frame time
+        over the last frames. The phase totals start over.
+        """
+        now = time.perf_counter()
+        seconds = now - self.interval_start if self.interval_start is not None else 0.0
+        frames = self.interval_frames
+        summary = {
+            'seconds': seconds,
+            'frames_per_second': frames / seconds if seconds else 0.0,
+            'generations_per_second': None,
+            'phases': {name: total / 1e6 / max(frames, 1) for name, total in self.phase_totals.items()},
+            'frame_ms': None,
+            'memory': process_memory(),
+        }
+        if frames:
+            # the time of a frame no phase covers, like drawing the menus
+            summary['phases']['other'] = max(0.0, seconds * 1000 / frames - sum(summary['phases'].values()))
+        if generation is not None and self.interval_generation is not None and seconds:
+            summary['generations_per_second'] = (generation - self.interval_generation) / seconds
+        if self.frame_times:
+            p50, p95, p99 = np.percentile(self.frame_times, (50, 95, 99)) * 1000
+            summary['frame_ms'] = {'p50': p50, 'p95': p95, 'p99': p99, 'max': max(self.frame_times) * 1000}
+        self.phase_totals = {}
+        self.interval_start = now
+        self.interval_frames = 0
+        self.interval_generation = generation
+        return summary
+
+    def trace_events(self):
+        """ The trace events in the Chrome trace event format, times in microseconds since the profiler was made """
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 1, 'args': {'name': 'The Game Of Life'}},
+                  {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': 1, 'args': {'name': 'main loop'}}]
+        for kind, name, loop, start, value in self.events:
+            event = {'name': name, 'ph': kind, 'ts': (start - self.origin) / 1000, 'pid': pid, 'tid': 1}
+            if kind == 'X':
+                event['cat'] = loop
+                event['dur'] = value / 1000
+            else:
+                event['args'] = {name: value}
+            events.append(event)
+        return events
+
+    def write_trace(self, path):
+        """ Write the trace to a JSON file, returns the number of events written """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        events = self.trace_events()
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
@@ -0,0 +1,351 @@
+""" Recording a run to an animated GIF or a PNG frame sequence
+
+Frames are captured from the board, not from the screen: one pixel per
+cell, scaled up by a whole factor. They are packed to bits and sent
+through a bounded queue to a writer process that encodes them as they
+arrive, so a recording never holds the whole run in memory and encoding
+never runs on the game loop.
+"""
+
+import multiprocessing
+import os
+import queue
+import struct
+import time
+import zlib
+import numpy as np
+from config import RECORD_SCALE, RECORD_QUEUE_SIZE
+
+
+def capture_window(engine, top, left, num_of_rows, num_of_cols):
+    """ The cells of a window of the board as a num_of_rows x num_of_cols uint8 array, top and left are padded coordinates """
+    if hasattr(engine, 'get_cells_in'):
+        # an unbounded board, only the chunks under the window are looked at
+        window = np.zeros((num_of_rows, num_of_cols), dtype=np.uint8)
+        cells = engine.get_cells_in(top, left, top + num_of_rows - 1, left + num_of_cols - 1)
+        if cells:
+            rows, cols = np.array(cells).T
+            window[rows - top, cols - left] = 1
+        return window
+    board = engine.get_array()
+    if (top, left) == (1, 1) and board.shape == (num_of_rows, num_of_cols):
+        return board
+    # the window can reach past the edges of the board, there are no cells there
+    window = np.zeros((num_of_rows, num_of_cols), dtype=np.uint8)
+    first_row, first_col = max(top, 1), max(left, 1)
+    last_row, last_col = min(top + num_of_rows, board.shape[0] + 1), min(left + num_of_cols, board.shape[1] + 1)
+    if first_row < last_row and first_col < last_col:
+        window[first_row - top:last_row - top, first_col - left:last_col - left] = \
+            board[first_row - 1:last_row - 1, first_col - 1:last_col - 1]
+    return window
+
+
+def scale_frame(frame, scale):
+    """ Every cell of the frame as a scale x scale square """
+    if scale == 1:
+        return frame
+    return frame.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+# ---- GIF ----
+
+def lzw_encode(pixels, min_code_size=2):
+    """ The GIF LZW code stream of a sequence of color indices, codes packed least significant bit first """
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    codes = {}
+    next_code = end_code + 1
+    code_size = min_code_size + 1
+    out = bytearray()
+    bits, num_of_bits = clear_code, code_size
+    pixels = iter(pixels)
+    prefix = next(pixels)
+    for pixel in pixels:
+        key = prefix << 8 | pixel
+        code = codes.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        bits |= prefix << num_of_bits
+        num_of_bits += code_size
+        if next_code < 4096:
+            codes[key] = next_code
+            next_code += 1
+            if next_code > 1 << code_size and code_size < 12:
+                code_size += 1
+        else:
+            # the table is full, start over
+            bits |= clear_code << num_of_bits
+            num_of_bits += code_size
+            codes.clear()
+            next_code, code_size = end_code + 1, min_code_size + 1
+        while num_of_bits >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            num_of_bits -= 8
+        prefix = pixel
+    bits |= prefix << num_of_bits
+    num_of_bits += code_size
+    # the decoder adds an entry for the last code too, unless it is the first since a clear
+    if next_code > end_code + 1 and next_code == 1 << code_size and code_size < 12:
+        code_size += 1
+    bits |= end_code << num_of_bits
+    num_of_bits += code_size
+    while num_of_bits > 0:
+        out.append(bits & 0xFF)
+        bits >>= 8
+        num_of_bits -= 8
+    return bytes(out)
+
+
+def sub_blocks(data):
+    """ Data split into GIF sub-blocks of up to 255 bytes, ended by an empty one """
+    blocks = bytearray()
+    for i in range(0, len(data), 255):
+        chunk = data[i:i + 255]
+        blocks.append(len(chunk))
+        blocks += chunk
+    blocks.append(0)
+    return bytes(blocks)
+
+
+class GifWriter:
+    """
+    A Gif Writer class. Writes frames to an endlessly looping animated GIF
+    with a 2 color palette, as they come.
+
+    Only the box of the cells that changed since the previous frame is
+    encoded, drawn over the previous frame. A frame that changes nothing
+    makes the previous one last longer, so a still life ends as one frame.
+
+    Important attributes:
+    --------------------
+
+    self.previous:
+        The last frame given, unscaled, the next one is compared to it.
+
+    self.pending:
+        (left, top, pixels, generation) of the changed box of the last frame,
+        written once the time it is shown for is known.
+
+    """
+    def __init__(self, path, palette, frame_time, scale=RECORD_SCALE):
+        """ Initialize the GifWriter object, palette is the (dead, alive) cell colors, frame_time the seconds of a generation """
+        self.file = open(path, 'wb')
+        self.palette = palette
+        self.frame_time = frame_time
+        self.scale = scale
+        self.previous = None
+        self.pending = None
+        self.generation = None
+        self.num_of_frames = 0
+
+    def write_header(self, num_of_rows, num_of_cols):
+        height, width = num_of_rows * self.scale, num_of_cols * self.scale
+        # a 2 entry global color table, 8 bits per primary color
+        self.file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF0, 0, 0))
+        self.file.write(bytes(self.palette[0]) + bytes(self.palette[1]))
+        # loop forever
+        self.file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+    def write_frame(self, frame, generation):
+        """ Add the frame of a generation, later than the one before """
+        if self.previous is None:
+            self.write_header(*frame.shape)
+            top, left, bottom, right = 0, 0, frame.shape[0] - 1, frame.shape[1] - 1
+        else:
+            rows, = np.nonzero((frame != self.previous).any(axis=1))
+            if not len(rows):
+                self.generation = generation
+                return
+            cols, = np.nonzero((frame[rows[0]:rows[-1] + 1] != self.previous[rows[0]:rows[-1] + 1]).any(axis=0))
+            top, left, bottom, right = rows[0], cols[0], rows[-1], cols[-1]
+            self.flush(generation)
+        self.previous = frame
+        self.generation = generation
+        self.pending = (left, top, frame[top:bottom + 1, left:right + 1], generation)
+
+    def flush(self, end_generation):
+        """ Write the pending frame, shown until end_generation """
+        left, top, pixels, generation = self.pending
+        # rounded on the whole recording so the delays do not drift, 2 cs is the shortest most viewers show
+        delay = max(2, round(end_generation * self.frame_time * 100) - round(generation * self.frame_time * 100))
+        pixels = scale_frame(pixels, self.scale)
+        height, width = pixels.shape
+        # graphic control extension: leave the frame in place, drawn over by the next one
+        self.file.write(struct.pack('<BBBBHBB', 0x21, 0xF9, 4, 0x04, min(delay, 0xFFFF), 0, 0))
+        self.file.write(struct.pack('<BHHHHB', 0x2C, left * self.scale, top * self.scale, width, height, 0))
+        self.file.write(b'\x02' + sub_blocks(lzw_encode(pixels.tobytes())))
+        self.num_of_frames += 1
+        self.pending = None
+
+    def close(self):
+        """ Write the last frame, shown for a generation, and end the file """
+        if self.pending is not None:
+            self.flush(self.generation + 1)
+        if self.previous is not None:
+            self.file.write(b'\x3B')
+        self.file.close()
+
+
+# ---- PNG ----
+
+def png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+class PngSequenceWriter:
+    """
+    A Png Sequence Writer class. Writes every frame to its own 1 bit
+    palette PNG in a directory, named by its generation.
+
+    Important attributes:
+    --------------------
+
+    self.directory:
+        Where the frames are written, generation_000042.png and on.
+
+    """
+    def __init__(self, directory, palette, scale=RECORD_SCALE):
+        """ Initialize the PngSequenceWriter object, palette is the (dead, alive) cell colors """
+        self.directory = directory
+        self.palette = palette
+        self.scale = scale
+        self.num_of_frames = 0
+
+    def write_frame(self, frame, generation):
+        pixels = scale_frame(frame, self.scale)
+        height, width = pixels.shape
+        # every row starts with filter type 0, then 8 pixels to a byte
+        raw = np.zeros((height, (width + 7) // 8 + 1), dtype=np.uint8)
+        raw[:, 1:] = np.packbits(pixels, axis=1)
+        data = (b'\x89PNG\r\n\x1a\n' +
+                png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 3, 0, 0, 0)) +
+                png_chunk(b'PLTE', bytes(self.palette[0]) + bytes(self.palette[1])) +
+                png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) +
+                png_chunk(b'IEND', b''))
+        with open(os.path.join(self.directory, 'generation_{:06d}.png'.format(generation)), 'wb') as f:
+            f.write(data)
+        self.num_of_frames += 1
+
+    def close(self):
+        pass
+
+
+def is_gif(path):
+    return path.lower().endswith('.gif')
+
+
+def writer_main(path, palette, frame_time, scale, frames, results):
+    """
+    The writer process. Takes (generation, shape, packed cells) frames from the
+    frames queue until None and encodes them, then sends a report to results.
+    """
+    report = {'written': 0, 'error': None}
+    try:
+        writer = GifWriter(path, palette, frame_time, scale) if is_gif(path) else PngSequenceWriter(path, palette, scale)
+        try:
+            while True:
+                item = frames.get()
+                if item is None:
+                    break
+                generation, shape, bits = item
+                frame = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=shape[0] * shape[1]).reshape(shape)
+                writer.write_frame(frame, generation)
+        finally:
+            writer.close()
+            report['written'] = writer.num_of_frames
+    except (OSError, ValueError) as e:
+        report['error'] = str(e)
+    report['bytes'] = os.path.getsize(path) if os.path.isfile(path) else None
+    results.send(report)
+
+
+class Recorder:
+    """
+    A Recorder class. Captures a window of the board and sends it to a
+    writer process, see writer_main. The file is an animated GIF if the
+    path ends in .gif, else a directory of PNG frames.
+
+    The queue to the writer is bounded. A blocking recorder waits for the
+    writer when it is full, every frame is kept. A non blocking one, for
+    the game, drops the frame instead so the game never waits on encoding;
+    the frames around it are shown longer.
+
+    Important attributes:
+    --------------------
+
+    self.window:
+        The (top, left, num_of_rows, num_of_cols) of the board recorded, padded coordinates.
+
+    self.generation:
+        The generation of the last frame sent, in the recording's own time: a
+        frame of an earlier generation (after a rewind) is taken as the next one.
+
+    self.capture_time:
+        Seconds spent capturing and queueing frames, the cost to the caller.
+
+    """
+    def __init__(self, path, window, palette, frame_time, scale=RECORD_SCALE, block=True, queue_size=RECORD_QUEUE_SIZE):
+        """
+        Initialize the Recorder object and start its writer.
+        palette is the (dead, alive) cell colors, frame_time the seconds a generation is shown for.
+        """
+        self.path = path
+        self.window = window
+        self.block = block
+        directory = os.path.dirname(path) if is_gif(path) else path
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        context = multiprocessing.get_context('spawn')
+        self.frames = context.Queue(maxsize=queue_size)
+        self.results, results = context.Pipe(duplex=False)
+        self.process = context.Process(target=writer_main, daemon=True,
+                                       args=(path, palette, frame_time, scale, self.frames, results))
+        self.process.start()
+        self.generation = None
+        self.num_of_frames = 0
+        self.dropped = 0
+        self.capture_time = 0.0
+
+    @classmethod
+    def for_simulation(cls, simulation, path, palette, frame_time, **kwargs):
+        """ A Recorder of the whole starting board of a simulation """
+        return cls(path, (1, 1, simulation.num_of_rows, simulation.num_of_cols), palette, frame_time, **kwargs)
+
+    def capture(self, engine, generation):
+        """ Send the window of the board as the frame of a generation, False if it was not sent """
+        start = time.perf_counter()
+        if self.generation is not None and generation <= self.generation:
+            generation = self.generation + 1
+        window = capture_window(engine, *self.window)
+        frame = (generation, window.shape, np.packbits(window).tobytes())
+        sent = self.put(frame)
+        if sent:
+            self.generation = generation
+            self.num_of_frames += 1
+        else:
+            self.dropped += 1
+        self.capture_time += time.perf_counter() - start
+        return sent
+
+    def put(self, item):
+        """ Queue an item for the writer, False if the queue is full and the recorder does not block, or the writer stopped """
+        while self.process.is_alive():
+            try:
+                self.frames.put(item, block=self.block, timeout=0.5)
+                return True
+            except queue.Full:
+                if not self.block:
+                    return False
+        return False
+
+    def close(self):
+        """ Wait for the writer to encode every frame sent, returns its report """
+        self.block = True
+        self.put(None)
+        report = self.results.recv() if self.results.poll(60) else {'written': 0, 'error': 'the writer stopped'}
+        self.process.join(timeout=5)
+        self.frames.close()
+        report.update(path=self.path, frames=self.num_of_frames, dropped=self.dropped, capture_seconds=self.capture_time)
+        return report
@@ -0,0 +1,90 @@
+""" Renderers that draw the whole board with a single blit """
+
+import numpy as np
+import pygame
+
+
+class FramebufferRenderer:
+    """
+    A Framebuffer Renderer class. The board is written straight into a
+    one byte per pixel palette surface, one pixel per cell. The surface is
+    scaled up by the cell size and shown with a single blit.
+
+    Important attributes:
+    --------------------
+
+    self.surface:
+        The num_of_cols x num_of_rows palette surface. Palette index 0 is the
+        dead cell color and 1 the alive cell color, so changing the colors
+        is a palette swap.
+
+    self.scaled:
+        The surface scaled up by the cell size, reused every frame.
+
+    self.prev_board:
+        The board shown by the last draw, to find the cells that flipped.
+
+    """
+    def __init__(self, num_of_rows, num_of_cols, cell_size, alive_color, dead_color):
+        """ Initialize the FramebufferRenderer object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.cell_size = cell_size
+        self.surface = pygame.Surface((num_of_cols, num_of_rows), depth=8)
+        self.scaled = pygame.Surface((num_of_cols * cell_size, num_of_rows * cell_size), depth=8)
+        self.prev_board = None
+        self.set_palette(alive_color, dead_color)
+
+    def fits(self, num_of_rows, num_of_cols, cell_size):
+        return (self.num_of_rows, self.num_of_cols, self.cell_size) == (num_of_rows, num_of_cols, cell_size)
+
+    def set_palette(self, alive_color, dead_color):
+        """ Change the cell colors, the next draw shows the whole board again """
+        for surface in (self.surface, self.scaled):
+            surface.set_palette_at(0, dead_color)
+            surface.set_palette_at(1, alive_color)
+        self.prev_board = None
+
+    def draw(self, board, target, region=None):
+        """
+        Show a num_of_rows x num_of_cols 0/1 board on target.
+        Returns the (row, col) grid coordinates of the cells that flipped
+        since the last draw, or None if the whole board is new.
+
+        With a region, the (top, left, bottom, right) box in grid coordinates
+        of every cell that may have flipped, only that box is drawn.
+        """
+        if region is not None and self.prev_board is not None:
+            return self.draw_region(board, target, region)
+        pygame.surfarray.blit_array(self.surface, board.T)
+        pygame.transform.scale(self.surface, self.scaled.get_size(), self.scaled)
+        target.blit(self.scaled, (0, 0))
+        if self.prev_board is None:
+            changed = None
+        else:
+            rows, cols = np.nonzero(board != self.prev_board)
+            changed = list(zip((rows + 1).tolist(), (cols + 1).tolist()))
+        self.prev_board = board.copy()
+        return changed
+
+    def draw_region(self, board, target, region):
+        """ draw() for the cells of region only, the rest of the board is as shown last time """
+        top, left = max(0, region[0] - 1), max(0, region[1] - 1)
+        bottom, right = min(self.num_of_rows, region[2]), min(self.num_of_cols, region[3])
+        if top >= bottom or left >= right:
+            return []
+        area = board[top:bottom, left:right]
+        rows, cols = np.nonzero(area != self.prev_board[top:bottom, left:right])
+        changed = list(zip((rows + top + 1).tolist(), (cols + left + 1).tolist()))
+        if not changed:
+            return changed
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        pixels[left:right, top:bottom] = area.T
+        del pixels
+        size = self.cell_size
+        cells = pygame.Rect(left, top, right - left, bottom - top)
+        scaled_area = pygame.Rect(left * size, top * size, cells.width * size, cells.height * size)
+        pygame.transform.scale(self.surface.subsurface(cells), scaled_area.size, self.scaled.subsurface(scaled_area))
+        target.blit(self.scaled, scaled_area.topleft, scaled_area)
+        self.prev_board[top:bottom, left:right] = area
+        return changed
@@ -0,0 +1,123 @@
+""" Life-like rules in B/S notation, compiled to lookup tables
+
+A rule lists the neighbour counts a dead cell is born with (B) and the
+neighbour counts a living cell survives with (S):
+    B3/S23      Conway's game of life
+    B3/S234     the game's bacteria mode, overpopulation limit of 4
+    B36/S23     HighLife
+S23/B3 and the older survival/birth form 23/3 are read too.
+"""
+
+import re
+import numpy as np
+
+# a few well known rules, by their B/S name
+RULE_NAMES = {
+    'B3/S23': 'Life',
+    'B3/S234': 'Bacteria',
+    'B36/S23': 'HighLife',
+    'B3678/S34678': 'Day & Night',
+    'B2/S': 'Seeds',
+    'B368/S245': 'Morley',
+    'B3/S12345': 'Maze',
+    'B1357/S1357': 'Replicator',
+}
+
+_BS = re.compile(r'^B([0-8]*)/?S([0-8]*)$')
+_SB = re.compile(r'^S([0-8]*)/?B([0-8]*)$')
+_SURVIVAL_BIRTH = re.compile(r'^([0-8]*)/([0-8]*)$')
+
+# compiled rules by the text they were given as
+_rules = {}
+
+
+class Rule:
+    """
+    A Rule class. A Life-like rule compiled once into a lookup table of the
+    next state of a cell, so the engines step with a table lookup and no
+    branches on the rule.
+
+    The next state of a cell only depends on its own state and on how many
+    of its 8 neighbours are alive, so the 512 neighbourhoods of a 3x3
+    square fold into 2 x 9 entries.
+
+    Important attributes:
+    --------------------
+
+    self.name:
+        The rule in B/S notation, counts in order: 'B3/S23'.
+
+    self.birth, self.survival:
+        The neighbour counts a dead cell comes to life with, and a living cell stays alive with.
+
+    self.table:
+        18 uint8 entries, self.table[9 * alive + neighbour count] is the next state of a cell.
+        self.table_bytes is the same table as bytes, for pure python indexing.
+
+    self.count_terms:
+        (count, next state of a dead cell, next state of a living cell) for every
+        neighbour count with a living next state, for engines that add up bit planes.
+
+    """
+    def __init__(self, birth, survival):
+        """ Initialize the Rule object and compile its table """
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+        if 0 in self.birth:
+            raise ValueError("B0 rules are not supported, every empty cell would be born")
+        self.name = 'B{}/S{}'.format(''.join(map(str, sorted(self.birth))), ''.join(map(str, sorted(self.survival))))
+        self.table = np.zeros(18, dtype=np.uint8)
+        for count in range(9):
+            self.table[count] = count in self.birth
+            self.table[9 + count] = count in self.survival
+        self.table_bytes = self.table.tobytes()
+        self.count_terms = [(count, bool(self.table[count]), bool(self.table[9 + count]))
+                            for count in range(9) if self.table[count] or self.table[9 + count]]
+
+    def __repr__(self):
+        return 'Rule({!r})'.format(self.name)
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    @classmethod
+    def parse(cls, text):
+        """ A Rule from its B/S, S/B or survival/birth notation, ValueError if it is not one """
+        compact = text.replace(' ', '').upper()
+        match = _BS.match(compact)
+        if match:
+            birth, survival = match.groups()
+        else:
+            match = _SB.match(compact) or _SURVIVAL_BIRTH.match(compact)
+            if not match:
+                raise ValueError("not a Life-like rule: {!r}".format(text))
+            survival, birth = match.groups()
+        return cls(map(int, birth), map(int, survival))
+
+    def label(self):
+        """ The rule's name, with its common name if it has one """
+        common_name = RULE_NAMES.get(self.name)
+        return '{} {}'.format(common_name, self.name) if common_name else self.name
+
+    def apply(self, alive, adj_live_count):
+        """ The next state of uint8 arrays of cells and their neighbour counts, a single table lookup """
+        index = alive * np.uint8(9)
+        index += adj_live_count
+        # take is much faster than fancy indexing for a small table
+        return self.table.take(index)
+
+
+def get_rule(rule):
+    """ The compiled Rule of a Rule or of its text, compiled once per text """
+    if isinstance(rule, Rule):
+        return rule
+    compiled = _rules.get(rule)
+    if compiled is None:
+        compiled = _rules[rule] = Rule.parse(rule)
+    return compiled
+
+
+LIFE = get_rule('B3/S23')
@@ -0,0 +1,115 @@
+""" Run the game of life without a display
+
+Examples:
+    python run_headless.py --seed cute --generations 1000 --engine numpy
+    python run_headless.py --generations 500 --bacteria
+    python run_headless.py --generations 500 --rule B36/S23
+    python run_headless.py --pattern gun.rle --generations 300 --export gun_300.rle
+    python run_headless.py --generations 100000 --on-cycle stop
+    python run_headless.py --seed cute --generations 500 --record cute.gif
+    python run_headless.py --generations 2000 --record frames --record-every 10
+    python run_headless.py --engine tiled --cell-size 1 --no-auto-sparse --on-cycle off --generations 100
+"""
+
+import argparse
+import os
+import random
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+from config import *
+import engines
+from recorder import Recorder
+from simulation import Simulation
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game of life without a display.")
+    parser.add_argument('--seed', help="name of a run in the run library, a random middle start if not given")
+    parser.add_argument('--pattern', help="a .rle or .cells pattern file to run instead of a seed")
+    parser.add_argument('--export', help="write the final board to this .rle or .cells file")
+    parser.add_argument('--record', help="record the run to this .gif, or to a directory of PNG frames")
+    parser.add_argument('--record-every', type=int, default=1, help="generations between recorded frames")
+    parser.add_argument('--record-scale', type=int, default=RECORD_SCALE, help="pixels per cell edge of a recording")
+    parser.add_argument('--generations', type=int, default=1000, help="number of generations to run")
+    parser.add_argument('--engine', choices=engines.ENGINE_NAMES, default='numpy', help="stepping engine")
+    parser.add_argument('--rule', help="Life-like rule in B/S notation, for example B36/S23. "
+                                       "Default: the seed's or pattern's rule, else " + RULE)
+    parser.add_argument('--bacteria', action='store_true', help="bacteria mode, the rule " + BACTERIA_RULE)
+    parser.add_argument('--no-auto-sparse', action='store_true', help="never switch to the sparse engine")
+    parser.add_argument('--cell-size', type=int, default=CELL_EDGE_SIZE, help="board size as in the game, for random starts")
+    parser.add_argument('--area-edge', type=int, default=START_AREA_EDGE, help="random start square edge")
+    parser.add_argument('--chance', type=float, default=CHANCE, help="random start spawn chance")
+    parser.add_argument('--random-seed', type=int, help="seed of the random number generator")
+    parser.add_argument('--on-cycle', choices=['replay', 'stop', 'report', 'off'], default=CYCLE_ACTION or 'off',
+                        help="when the board repeats: replay the cached cycle, stop the run, report only, or do not look")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rule = BACTERIA_RULE if args.bacteria else args.rule
+    try:
+        simulation = Simulation.for_cell_size(args.cell_size, engine_name=args.engine, rule=rule or RULE,
+                                              auto_sparse=not args.no_auto_sparse,
+                                              cycle_action=None if args.on_cycle == 'off' else args.on_cycle)
+    except ValueError as e:
+        print(e)
+        return 2
+    if args.pattern is not None:
+        simulation.load_pattern(args.pattern)
+    elif args.seed is not None:
+        if simulation.load_seed(args.seed) is None:
+            print("No run named '{}' in the run library".format(args.seed))
+            return 1
+    else:
+        random.seed(args.random_seed)
+        simulation.random_middle_start(args.area_edge, args.chance)
+    if rule is not None:
+        # the rule given overrides the one saved with the seed or pattern
+        simulation.set_rule(rule)
+
+    start_population = simulation.population()
+    recorder = None
+    if args.record:
+        try:
+            # a frame is shown for ROUND_TIME whatever the generations between frames
+            recorder = Recorder.for_simulation(simulation, args.record, (DARKER_PURPLE, YELLOW),
+                                               ROUND_TIME / args.record_every, scale=args.record_scale)
+        except OSError as e:
+            print(e)
+            return 1
+    report = simulation.run(args.generations, recorder, args.record_every)
+    print("engine:          {} (ended on {})".format(report['engine'], simulation.current_engine_name))
+    print("rule:            {}".format(report['rule']))
+    print("board:           {} x {}".format(simulation.num_of_rows, simulation.num_of_cols))
+    print("population:      {} -> {}".format(start_population, report['population']))
+    print("generations:     {}".format(report['generations']))
+    if report['active_region'] is not None:
+        top, left, bottom, right = report['active_region']
+        print("active region:   rows {} - {}, cols {} - {}".format(top, bottom, left, right))
+    print("seconds:         {:.3f}".format(report['seconds']))
+    print("generations/sec: {:.1f}".format(report['generations_per_second']))
+    cycle = report['cycle']
+    if cycle is not None:
+        print("cycle:           period {} from generation {}{}".format(
+            cycle['period'], cycle['start'], ", run stopped" if simulation.ended else ""))
+    if hasattr(simulation.engine, 'timing'):
+        timing = simulation.engine.timing()
+        print("worker timing:   load imbalance {:.2f} (slowest / mean)".format(timing['imbalance']))
+        for worker in timing['workers']:
+            print("    rows {:>6} - {:<6} step {:8.3f} s  wait {:8.3f} s".format(
+                worker['rows'][0], worker['rows'][1], worker['step'], worker['wait']))
+    if recorder is not None:
+        recording = recorder.close()
+        if recording['error'] is not None:
+            print("recording failed: {}".format(recording['error']))
+        else:
+            print("recording:       {} frames to {}, {} written, capture {:.3f} s".format(
+                recording['frames'], recording['path'], recording['written'], recording['capture_seconds']))
+    if args.export:
+        simulation.save_pattern(args.export, SCREEN_W // simulation.num_of_cols, args.seed)
+        print("board written to {}".format(args.export))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+""" Frame scheduling for the game loop """
+
+import time
+from config import *
+
+
+class FrameScheduler:
+    """
+    A Frame Scheduler class. Keeps the simulation at one generation per
+    round_time and the display at no more than one frame per frame_time.
+
+    When generations are faster than frames, several generations run per
+    displayed frame. When a frame takes longer than round_time, the late
+    generations run before the next frame and the missed frames are skipped.
+    Between generations the loop sleeps at most frame_time at a time, so
+    input keeps being checked at the frame rate even at slow speeds.
+
+    Important attributes:
+    --------------------
+
+    self.next_generation_time, self.next_frame_time:
+        time.perf_counter() times when the next generation / frame is due.
+
+    self.max_generations_per_frame:
+        When more generations than this are late, the extra ones are dropped
+        (counted in self.dropped_generations) instead of freezing the display.
+
+    self.generations, self.frames:
+        Number of generations run and frames displayed since start().
+
+    """
+    def __init__(self, round_time, frame_time=FRAME_TIME, max_generations_per_frame=MAX_GENERATIONS_PER_FRAME):
+        """ Initialize the FrameScheduler object """
+        self.round_time = round_time
+        self.frame_time = frame_time
+        self.max_generations_per_frame = max_generations_per_frame
+        self.next_generation_time = 0
+        self.next_frame_time = 0
+        self.pending_frame = False
+        self.generations, self.frames, self.dropped_generations = 0, 0, 0
+        self.start()
+
+    def start(self):
+        """ (Re)start the clock, the first generation is due right away """
+        now = time.perf_counter()
+        self.next_generation_time = now
+        self.next_frame_time = now
+
+    def due_generations(self):
+        """ Return the number of generations to run now """
+        now = time.perf_counter()
+        if now < self.next_generation_time:
+            return 0
+        due = int((now - self.next_generation_time) / self.round_time) + 1
+        if due > self.max_generations_per_frame:
+            self.dropped_generations += due - self.max_generations_per_frame
+            due = self.max_generations_per_frame
+            self.next_generation_time = now + self.round_time
+        else:
+            self.next_generation_time += due * self.round_time
+        self.generations += due
+        self.pending_frame = True
+        return due
+
+    def frame_due(self):
+        """ True if the board changed since the last frame and a frame may be displayed """
+        return self.pending_frame and time.perf_counter() >= self.next_frame_time
+
+    def request_frame(self):
+        """ Display a frame once one may be, even if no generation ran, for something drawn over the board """
+        self.pending_frame = True
+
+    def frame_drawn(self):
+        self.pending_frame = False
+        self.frames += 1
+        self.next_frame_time = time.perf_counter() + self.frame_time
+
+    def wait(self):
+        """ Sleep until the next generation or frame is due, but no longer than frame_time """
+        wake_time = self.next_generation_time
+        if self.pending_frame:
+            wake_time = min(wake_time, self.next_frame_time)
+        timeout = min(wake_time - time.perf_counter(), self.frame_time)
+        if timeout > 0:
+            time.sleep(timeout)
@@ -2,7 +2,14 @@ import sys
 from cx_Freeze import setup, Executable
 
 # Dependencies are automatically detected, but it might need fine tuning.
-build_exe_options = {"packages": ["os"]}
+# openpyxl is imported lazily but still found. pygame imports pkg_resources only for a
+# fallback it does not need, leaving it (and setuptools) out saves a good part of its import.
+# Run the build with --startup-report to see where the startup time goes.
+build_exe_options = {
+    "packages": ["os"],
+    "excludes": ["tkinter", "pkg_resources", "setuptools"],
+    "include_files": [("assets", "assets")],
+}
 
 # GUI applications require a different base on Windows (the default is for a
 # console application).
@@ -10,8 +17,10 @@ base = None
 if sys.platform == "win32":
     base = "Win32GUI"
 
+# one executable, built once
 target = Executable(
     script="The Game Of Life.py",
+    base=base,
     icon="assets/virus_red.ico"
     )
 
@@ -20,4 +29,4 @@ setup(  name = "The Game Of Life",
         version = "0.1",
         description = "Conway's Game Of Life",
         options = {"build_exe": build_exe_options},
-        executables = [Executable("The Game Of Life.py", base=base), target])
+        executables = [target])
@@ -0,0 +1,399 @@
+""" Headless simulation of the game of life, no display needed """
+
+import random
+import time
+from config import *
+from cycles import CycleDetector
+from history import History
+import engines
+import log_cool_runs as lcr
+import patterns
+import rules
+
+
+class Simulation:
+    """
+    A Simulation class. Owns a board and the engine that steps it, with no
+    display. The interactive game draws the board of its simulation
+    (see CellGrid), run_headless.py runs one from the command line.
+
+    Important attributes:
+    --------------------
+
+    self.engine:
+        The engine holding the board, built by self.make_engine.
+
+    self.engine_name:
+        The selected engine, 'classic' or a name from engines.ENGINES.
+
+    self.current_engine_name:
+        The engine actually in use. With self.auto_sparse on, this is
+        'sparse' while the board density is below SPARSE_DENSITY.
+        An unbounded engine (engines.UNBOUNDED_ENGINES) is never switched,
+        and its cells are never clipped to the board.
+
+    self.rule:
+        The rules.Rule the board is stepped with, set_rule changes it.
+
+    self.generation, self.step_time:
+        Number of generations stepped since the board was loaded, and the
+        seconds spent stepping them.
+
+    self.cycles:
+        The CycleDetector hashing every generation of the current board.
+
+    self.cycle_action:
+        What to do once a state repeats: 'replay' the cached cycle instead of
+        stepping, 'stop' stepping, 'report' it and keep stepping, or None to
+        not look for cycles at all.
+
+    self.ended:
+        Set when the run was stopped on a cycle, step() does nothing then.
+
+    self.history:
+        The History of every generation stepped since the board was loaded or
+        edited, for seek(). None unless keep_history was given.
+
+    self.changes:
+        The (born, died) cells of every generation stepped since the last
+        take_changes(), so a drawer redraws only what changed. None until
+        take_changes() is called, and once the board is changed other than by stepping.
+
+
+    Important methods:
+    --------------------
+
+    load_seed(self, ...):
+        Load a run from the run library by name.
+
+    load_pattern(self, ...), save_pattern(self, ...):
+        Import / export the board as an RLE or plaintext pattern file.
+
+    step(self, ...):
+        Advance the board by a number of generations.
+
+    cycle_info(self):
+        The cycle the board settled into, if any.
+
+    seek(self, ...):
+        Go back (or forward) to a generation, through the history.
+
+    run(self, ...):
+        Step and report population and timing.
+
+    """
+    def __init__(self, num_of_rows, num_of_cols, engine_name=ENGINE, rule=RULE,
+                 auto_sparse=AUTO_SPARSE, make_engine=engines.make_engine, cycle_action=CYCLE_ACTION,
+                 keep_history=False):
+        """ Initialize the Simulation object """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.engine_name = engine_name
+        self.current_engine_name = engine_name
+        self.rule = rules.get_rule(rule)
+        self.auto_sparse = auto_sparse
+        self.make_engine = make_engine
+        self.cycle_action = cycle_action
+        self.cycles = CycleDetector()
+        self.cycles_rule = self.rule
+        self.ended = False
+        self.history = History() if keep_history else None
+        self.changes = None
+        self.engine = None
+        self.generation = 0
+        self.step_time = 0.0
+        self.build_board()
+
+    @classmethod
+    def for_cell_size(cls, cell_size, **kwargs):
+        """ A simulation with the board the game shows for the given cell size """
+        return cls(SCREEN_H // cell_size, SCREEN_W // cell_size, **kwargs)
+
+    def build_board(self, engine_name=None):
+        """ Build an empty board for the current size, with the selected engine by default """
+        if engine_name is None:
+            engine_name = self.engine_name
+        if hasattr(self.engine, 'close'):
+            # stop the workers of a tiled engine
+            self.engine.close()
+        self.current_engine_name = engine_name
+        self.engine = self.make_engine(engine_name, self.num_of_rows, self.num_of_cols)
+        self.generation = 0
+        self.step_time = 0.0
+        self.changes = None
+        self.reset_cycles()
+        self.reset_history()
+
+    def resize(self, num_of_rows, num_of_cols):
+        """ Build a new empty board of the given size, the board is only cleared if the size and engine are unchanged """
+        if (num_of_rows, num_of_cols) == (self.num_of_rows, self.num_of_cols) and \
+                self.current_engine_name == self.engine_name:
+            self.clear()
+            return
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        self.build_board()
+
+    def switch_engine(self, engine_name):
+        """ Move the living cells to a board of another engine """
+        live_cells = self.engine.get_cells()
+        generation, step_time = self.generation, self.step_time
+        cycles, ended, history = self.cycles, self.ended, self.history
+        # the board goes on, its history is kept as it is, build_board would reset it
+        self.history = None
+        self.build_board(engine_name)
+        self.engine.set_cells(live_cells)
+        self.generation, self.step_time = generation, step_time
+        self.cycles, self.ended, self.history = cycles, ended, history
+
+    def reset_cycles(self):
+        """ Forget the states seen so far, the board was changed by hand """
+        self.cycles = CycleDetector()
+        self.cycles_rule = self.rule
+        self.ended = False
+
+    def reset_history(self):
+        """ Forget the recorded generations, the board was changed by hand """
+        if self.history is not None:
+            self.history.reset(None if self.is_unbounded() else (self.num_of_rows + 2, self.num_of_cols + 2))
+
+    def set_rule(self, rule):
+        """ Step with another rule from now on, a rules.Rule or its B/S name. ValueError if it is not a rule """
+        self.rule = rules.get_rule(rule)
+
+    def is_unbounded(self):
+        return self.engine_name in engines.UNBOUNDED_ENGINES
+
+    def check_density(self):
+        """
+        Switch to the sparse engine when the board is nearly empty,
+        and back to the selected engine once it fills up again.
+        """
+        density = self.engine.population() / (self.num_of_rows * self.num_of_cols)
+        if self.current_engine_name != 'sparse' and density < SPARSE_DENSITY:
+            self.switch_engine('sparse')
+        elif self.current_engine_name == 'sparse' and density > 2 * SPARSE_DENSITY:
+            self.switch_engine(self.engine_name)
+
+    # ---- board access ----
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.engine.clear()
+        self.generation = 0
+        self.step_time = 0.0
+        self.changes = None
+        self.reset_cycles()
+        self.reset_history()
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        self.engine.set_cells(coordinate_arr)
+        self.changes = None
+        self.reset_cycles()
+        self.reset_history()
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        return self.engine.get_cells()
+
+    def population(self):
+        """ Number of living cells """
+        return self.engine.population()
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, inclusive, None if there are none """
+        return self.engine.active_region()
+
+    def load_run(self, coordinate_arr):
+        """
+        Load the start cells of a run, straight into the sparse engine if they are few.
+        Cells outside the board interior are dropped, unless the engine is unbounded.
+        """
+        if self.is_unbounded():
+            self.build_board()
+            self.set_cells(coordinate_arr)
+            return
+        num_of_rows, num_of_cols = self.num_of_rows, self.num_of_cols
+        coordinate_arr = [(row, col) for row, col in coordinate_arr
+                          if 1 <= row <= num_of_rows and 1 <= col <= num_of_cols]
+        if self.auto_sparse and len(coordinate_arr) < SPARSE_DENSITY * self.num_of_rows * self.num_of_cols:
+            self.build_board('sparse')
+        else:
+            self.build_board()
+        self.set_cells(coordinate_arr)
+
+    def load_seed(self, name):
+        """
+        Load a run from the run library by name, on a board sized for its cell size,
+        with the rule it was saved with if it has one.
+        Returns the run's start cells, or None if there is no such name.
+        """
+        run = lcr.get_run_by_name(name)
+        if run is None:
+            return None
+        cell_size, run_arr, rule = run
+        if rule is not None:
+            self.set_rule(rule)
+        self.num_of_rows, self.num_of_cols = SCREEN_H // cell_size, SCREEN_W // cell_size
+        self.load_run(run_arr)
+        return run_arr
+
+    def load_pattern(self, path, fit_cell_size=True):
+        """
+        Load a .rle or .cells pattern file, streamed straight into a new board.
+        With fit_cell_size, the board is resized for the pattern's cell size if it has one.
+        The pattern's rule is used if it has one this simulation can step.
+        Cells outside the board interior are dropped, unless the engine is unbounded.
+        Returns the PatternFile with the metadata.
+        """
+        with patterns.PatternFile(path) as pattern:
+            if pattern.rule:
+                try:
+                    self.set_rule(pattern.rule)
+                except ValueError:
+                    pass
+            if fit_cell_size and pattern.cell_size:
+                self.num_of_rows, self.num_of_cols = SCREEN_H // pattern.cell_size, SCREEN_W // pattern.cell_size
+            self.build_board()
+            top, left = pattern.placement(self.num_of_rows, self.num_of_cols)
+            num_of_rows, num_of_cols = self.num_of_rows, self.num_of_cols
+            if self.is_unbounded():
+                self.set_cells(pattern.cells(top, left))
+            else:
+                self.set_cells((row, col) for row, col in pattern.cells(top, left)
+                               if 1 <= row <= num_of_rows and 1 <= col <= num_of_cols)
+        return pattern
+
+    def save_pattern(self, path, cell_size=None, name=None):
+        """ Write the living cells as a .rle or .cells pattern file """
+        patterns.write_pattern(path, self.get_cells(), cell_size, name, self.rule.name)
+
+    def random_middle_start(self, start_area_edge=START_AREA_EDGE, life_chance=CHANCE, rng=random):
+        """ Choose cells randomly inside a square in the middle of the board.
+            Resurrect them.
+            rng is the random number generator, a random.Random(seed) gives a reproducible start.
+        """
+        start_area_left = (self.num_of_cols // 2) - (start_area_edge // 2)
+        start_area_top = (self.num_of_rows // 2) - (start_area_edge // 2)
+        curr_run = []
+        right_bound = start_area_left + start_area_edge
+        down_bound = start_area_top + start_area_edge
+        for col in range(start_area_left, right_bound):
+            for row in range(start_area_top, down_bound):
+                if rng.random() < life_chance:
+                    curr_run.append((row, col))
+        self.set_cells(curr_run)
+        return curr_run
+
+    # ---- stepping ----
+
+    def step(self, n_generations=1):
+        """
+        Advance the board by n_generations, fewer if the run ends on a cycle.
+        Once the board is in a cached cycle, with cycle_action 'replay',
+        a generation only applies the cells that change.
+        """
+        start = time.perf_counter()
+        if self.cycles_rule != self.rule:
+            # the rules changed, earlier states say nothing about the next ones
+            self.reset_cycles()
+        cycles = self.cycles
+        # an unbounded board has no fixed array to hash, and no density
+        look_for_cycles = self.cycle_action is not None and not self.is_unbounded()
+        check_density = self.auto_sparse and self.engine_name != 'sparse' and not self.is_unbounded()
+        if look_for_cycles and cycles.hash is None:
+            # hash the start state too
+            cycles.start(self.engine.get_cells(), (self.num_of_rows, self.num_of_cols), self.generation)
+        history = self.history
+        if history is not None and self.generation not in history:
+            history.record(self.engine, self.generation)
+        for _ in range(n_generations):
+            if self.ended:
+                break
+            # the cells born and died in this generation, the cycles and history follow the board with them
+            if cycles.replay and self.cycle_action == 'replay':
+                born, died = changes = cycles.replay_changes(self.generation + 1)
+                self.engine.kill_cells(died)
+                self.engine.set_cells(born)
+            else:
+                if check_density:
+                    self.check_density()
+                self.engine.step(self.rule)
+                track_changes = look_for_cycles or history is not None or self.changes is not None
+                changes = self.engine.step_changes() if track_changes else None
+                if look_for_cycles and cycles.period is None:
+                    if cycles.update(*changes, self.generation + 1) and self.cycle_action == 'stop':
+                        self.ended = True
+            self.generation += 1
+            if history is not None:
+                history.record(self.engine, self.generation, changes)
+            if self.changes is not None:
+                self.changes.append(changes)
+        self.step_time += time.perf_counter() - start
+
+    def take_changes(self, keep_tracking=True):
+        """
+        The (born, died) cells of every generation stepped since the last call, oldest
+        first. None on the first call and when the board was changed other than by
+        stepping since. The changes are kept from then on, unless not keep_tracking.
+        """
+        changes = self.changes
+        self.changes = [] if keep_tracking else None
+        return changes
+
+    def cycle_info(self):
+        """
+        The cycle the board settled into, a dict of its 'start' generation, 'period',
+        the generation it was 'detected_at' and whether it is 'cached' for replay.
+        None if no state repeated yet.
+        """
+        return self.cycles.info()
+
+    def seek(self, generation):
+        """
+        Set the board to the given generation: back through the history, or forward
+        by stepping past its newest generation. Without a history it only steps forward.
+        Stops at the oldest generation still in the history. Returns the generation reached.
+        """
+        history = self.history
+        if history is not None and history.segments:
+            generation = max(generation, history.oldest)
+            target = min(generation, history.newest)
+            if target != self.generation:
+                cells = history.seek(target)
+                self.engine.clear()
+                self.engine.set_cells(cells)
+                self.generation = target
+                self.changes = None
+                # the cycle seen so far may be ahead of the board now
+                self.reset_cycles()
+        if generation > self.generation:
+            self.step(generation - self.generation)
+        return self.generation
+
+    def run(self, n_generations, recorder=None, record_every=1):
+        """
+        Step n_generations and return a report of population and timing.
+        With a recorder.Recorder, the board is captured at the start and every record_every generations.
+        """
+        start_generation, start_time = self.generation, self.step_time
+        if recorder is None:
+            self.step(n_generations)
+        else:
+            recorder.capture(self.engine, self.generation)
+            end_generation = self.generation + n_generations
+            while self.generation < end_generation and not self.ended:
+                self.step(min(record_every, end_generation - self.generation))
+                recorder.capture(self.engine, self.generation)
+        seconds = self.step_time - start_time
+        return {
+            'engine': self.engine_name,
+            'rule': self.rule.name,
+            'generations': self.generation - start_generation,
+            'population': self.population(),
+            'seconds': seconds,
+            'generations_per_second': (self.generation - start_generation) / seconds if seconds else float('inf'),
+            'cycle': self.cycle_info(),
+            'active_region': self.active_region(),
+        }
@@ -0,0 +1,48 @@
+""" Startup timing of the game, from the main script to the first frame
+
+The main script imports this module first, its import is the start of
+the clock. The steps of the startup are marked as they end, and the
+report is printed once the first frame is on screen when STARTUP_REPORT
+is set in config.py or the game is started with --startup-report.
+Time spent before the main script runs, starting the interpreter, is
+not counted.
+"""
+
+import sys
+import time
+
+_start = time.perf_counter()
+_marks = []
+_first_frame_shown = False
+
+
+def mark(step):
+    """ Mark the end of a startup step """
+    _marks.append((step, time.perf_counter()))
+
+
+def timings():
+    """ Milliseconds of every step marked, in order, and the 'total' since the start """
+    steps, previous = {}, _start
+    for step, at in _marks:
+        steps[step] = (at - previous) * 1000
+        previous = at
+    steps['total'] = (previous - _start) * 1000
+    return steps
+
+
+def report():
+    """ The timings as lines of text """
+    return ["{:<14} {:8.1f} ms".format(step, ms) for step, ms in timings().items()]
+
+
+def first_frame(print_report=False):
+    """ Mark the first frame displayed, once, and print the report if asked to """
+    global _first_frame_shown
+    if _first_frame_shown:
+        return
+    _first_frame_shown = True
+    mark('first frame')
+    if print_report or '--startup-report' in sys.argv:
+        print("startup:")
+        print('\n'.join(report()))
@@ -0,0 +1,30 @@
+""" Tests of the headless simulation, run with python -m unittest """
+
+import unittest
+from simulation import Simulation
+
+BLINKER = [(15, 14), (15, 15), (15, 16)]
+
+
+class RewindAcrossEngineSwitchTest(unittest.TestCase):
+    """ The rewind history outlives the switch to the sparse engine on a board that thins out """
+
+    def test_rewind_across_auto_switch(self):
+        simulation = Simulation(30, 30, engine_name='numpy', auto_sparse=True, keep_history=True)
+        # lone cells die in the first generation, only the blinker is left
+        lone_cells = [(row, col) for row in range(2, 11, 4) for col in range(2, 29, 3)]
+        start = sorted(lone_cells + BLINKER)
+        simulation.set_cells(start)
+        self.assertGreater(len(start), 0.02 * 30 * 30)
+        simulation.step(10)
+        self.assertEqual(simulation.current_engine_name, 'sparse')
+        self.assertEqual(simulation.history.oldest, 0)
+
+        self.assertEqual(simulation.seek(0), 0)
+        self.assertEqual(sorted(simulation.get_cells()), start)
+        simulation.seek(2)
+        self.assertEqual(sorted(simulation.get_cells()), BLINKER)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+""" Caching of loaded fonts and rendered text """
+
+from collections import OrderedDict
+import pygame
+from config import *
+
+
+class TextCache:
+    """
+    A Text Cache class. Keeps loaded fonts and rendered text surfaces,
+    so drawing the same menu text again does not touch the disk.
+
+    Important attributes:
+    --------------------
+
+    self.fonts:
+        Loaded pygame fonts, keyed by (face, size).
+
+    self.texts:
+        Rendered text surfaces, keyed by (text, face, size, color),
+        least recently used first.
+
+    self.*_hits, self.*_misses:
+        Lookup counters of the two caches, see stats().
+
+    """
+    def __init__(self, max_fonts=FONT_CACHE_SIZE, max_texts=TEXT_CACHE_SIZE):
+        """ Initialize the TextCache object """
+        self.max_fonts = max_fonts
+        self.max_texts = max_texts
+        self.fonts = OrderedDict()
+        self.texts = OrderedDict()
+        self.font_hits, self.font_misses = 0, 0
+        self.text_hits, self.text_misses = 0, 0
+
+    def get_font(self, face, size):
+        """ Return the font of the given face and size, loaded from disk only once """
+        key = (face, size)
+        font = self.fonts.get(key)
+        if font is not None:
+            self.font_hits += 1
+            self.fonts.move_to_end(key)
+            return font
+        self.font_misses += 1
+        font = pygame.font.Font(face, size)
+        self.fonts[key] = font
+        if len(self.fonts) > self.max_fonts:
+            self.fonts.popitem(last=False)
+        return font
+
+    def render(self, text, face, size, color):
+        """ Return a surface of the rendered text, rendered only once while it is in the cache """
+        key = (text, face, size, tuple(color))
+        text_surface = self.texts.get(key)
+        if text_surface is not None:
+            self.text_hits += 1
+            self.texts.move_to_end(key)
+            return text_surface
+        self.text_misses += 1
+        text_surface = self.get_font(face, size).render(text, True, color)
+        self.texts[key] = text_surface
+        if len(self.texts) > self.max_texts:
+            self.texts.popitem(last=False)
+        return text_surface
+
+    def stats(self):
+        return {'font_hits': self.font_hits, 'font_misses': self.font_misses,
+                'text_hits': self.text_hits, 'text_misses': self.text_misses,
+                'fonts': len(self.fonts), 'texts': len(self.texts)}
+
+    def clear(self):
+        self.fonts.clear()
+        self.texts.clear()
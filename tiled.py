@@ -0,0 +1,214 @@
+""" Multi-process tiled stepping engine for huge boards """
+
+import multiprocessing
+import time
+import weakref
+from multiprocessing import shared_memory
+import numpy as np
+from config import TILED_WORKERS
+import engines
+import rules
+
+
+def step_tile(current, following, first_row, last_row, rule):
+    """
+    Step the board rows first_row to last_row (padded coordinates) from current into following.
+    Rows first_row - 1 and last_row + 1 are the halo: the border rows of the
+    neighbouring tiles, or the padding ring at the board edges.
+    Same rules as NumpyEngine.step, rule is a rules.Rule.
+    """
+    b = current[first_row - 1:last_row + 2]
+    adj_live_count = (b[:-2, :-2] + b[:-2, 1:-1] + b[:-2, 2:] +
+                      b[1:-1, :-2] + b[1:-1, 2:] +
+                      b[2:, :-2] + b[2:, 1:-1] + b[2:, 2:])
+    following[first_row:last_row + 1, 1:-1] = rule.apply(b[1:-1, 1:-1], adj_live_count)
+    # the padding is never stepped, it keeps its value in both buffers
+    following[first_row:last_row + 1, 0] = current[first_row:last_row + 1, 0]
+    following[first_row:last_row + 1, -1] = current[first_row:last_row + 1, -1]
+
+
+def worker_main(shm_name, shape, first_row, last_row, connection):
+    """
+    A tile worker. Waits for ('step', current buffer, rule name) and answers
+    with the seconds it spent stepping, ('close',) ends it.
+    The rule is compiled once in the worker, see rules.get_rule.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffers = np.ndarray((2,) + shape, dtype=np.uint8, buffer=shm.buf)
+    num_of_rows = shape[0] - 2
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] != 'step':
+                break
+            _, current_index, rule_name = message
+            start = time.perf_counter()
+            current, following = buffers[current_index], buffers[1 - current_index]
+            step_tile(current, following, first_row, last_row, rules.get_rule(rule_name))
+            if first_row == 1:
+                following[0] = current[0]
+            if last_row == num_of_rows:
+                following[-1] = current[-1]
+            connection.send(time.perf_counter() - start)
+    finally:
+        del buffers
+        shm.close()
+
+
+def _shutdown(processes, connections, shm):
+    """ Stop the workers and free the shared memory, once """
+    for connection in connections:
+        try:
+            connection.send(('close',))
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+    try:
+        shm.close()
+    except BufferError:
+        # a view of the board is still in use, the memory is freed with it
+        pass
+    shm.unlink()
+
+
+class TiledEngine:
+    """
+    A Tiled Engine class. The board is split into tiles of whole rows, one
+    per worker process, and every generation the workers step their tiles
+    in parallel.
+
+    The board is double buffered in multiprocessing.shared_memory: the
+    workers read the current buffer and write the following one, then the
+    two are swapped. A worker reads one row past each side of its tile,
+    the halo, which holds the border row of the neighbouring tile or the
+    padding ring at the edges of the board, so no cells are copied between
+    workers.
+
+    Important attributes:
+    --------------------
+
+    self.buffers:
+        A 2 x (num_of_rows + 2) x (num_of_cols + 2) uint8 array in shared memory,
+        self.buffers[self.current_index] is the board, indexed like NumpyEngine.board.
+
+    self.tiles:
+        The (first row, last row) of every worker, padded coordinates.
+
+    self.worker_times:
+        Per worker, the seconds spent stepping its tile and waiting for the
+        slowest worker, summed over every generation. See timing().
+
+    """
+    def __init__(self, num_of_rows, num_of_cols, num_of_workers=TILED_WORKERS):
+        """ Initialize the TiledEngine object and start its workers """
+        self.num_of_rows = num_of_rows
+        self.num_of_cols = num_of_cols
+        shape = (num_of_rows + 2, num_of_cols + 2)
+        self.shm = shared_memory.SharedMemory(create=True, size=2 * shape[0] * shape[1])
+        self.buffers = np.ndarray((2,) + shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.buffers.fill(0)
+        self.current_index = 0
+
+        num_of_workers = max(1, min(num_of_workers or multiprocessing.cpu_count(), num_of_rows))
+        bounds = np.linspace(1, num_of_rows + 1, num_of_workers + 1).astype(int)
+        self.tiles = [(int(bounds[i]), int(bounds[i + 1]) - 1) for i in range(num_of_workers)]
+        self.worker_times = [{'step': 0.0, 'wait': 0.0} for _ in self.tiles]
+        self.generations = 0
+
+        context = multiprocessing.get_context('spawn')
+        self.connections, self.processes = [], []
+        for first_row, last_row in self.tiles:
+            parent_end, worker_end = context.Pipe()
+            process = context.Process(target=worker_main, daemon=True,
+                                      args=(self.shm.name, shape, first_row, last_row, worker_end))
+            process.start()
+            self.connections.append(parent_end)
+            self.processes.append(process)
+        self.finalizer = weakref.finalize(self, _shutdown, self.processes, self.connections, self.shm)
+
+    @property
+    def board(self):
+        return self.buffers[self.current_index]
+
+    def close(self):
+        """ Stop the workers and free the shared memory """
+        self.buffers = None
+        self.finalizer()
+
+    def clear(self):
+        """ Kill every cell on the board """
+        self.board.fill(0)
+
+    def set_cells(self, coordinate_arr):
+        """ Resurrect cells in given coordinates """
+        board = self.board
+        for coordinate in coordinate_arr:
+            board[coordinate[0], coordinate[1]] = 1
+
+    def kill_cells(self, coordinate_arr):
+        """ Kill cells in given coordinates """
+        board = self.board
+        for coordinate in coordinate_arr:
+            board[coordinate[0], coordinate[1]] = 0
+
+    def get_cells(self):
+        """ Return a list of the (row, col) coordinates of the living cells """
+        rows, cols = np.nonzero(self.board)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def is_alive(self, row, col):
+        return bool(self.board[row, col])
+
+    def population(self):
+        """ Number of living cells """
+        return int(np.count_nonzero(self.board))
+
+    def get_array(self):
+        """ Return the board interior as a num_of_rows x num_of_cols uint8 array """
+        return self.board[1:-1, 1:-1]
+
+    def active_region(self):
+        """ The (top, left, bottom, right) box of the living cells, None if there are none. Not tracked, a full scan """
+        return engines.array_bounds(self.board)
+
+    def step_changes(self):
+        """
+        The (born, died) cells of the last step, (n, 2) arrays of padded (row, col).
+        Not tracked, the two buffers are compared: a full scan, and only right
+        until the board is changed by hand.
+        """
+        if not self.generations:
+            return engines.NO_CHANGES
+        return engines.window_changes(self.buffers[1 - self.current_index], self.board)
+
+    def step(self, rule=rules.LIFE):
+        """
+        Apply the rule (a rules.Rule) to the board interior, every tile
+        in its own worker. Same rules as CellGrid.update_grid.
+        Only the rule's name is sent to the workers.
+        """
+        start = time.perf_counter()
+        for connection in self.connections:
+            connection.send(('step', self.current_index, rule.name))
+        step_times = [connection.recv() for connection in self.connections]
+        elapsed = time.perf_counter() - start
+        for times, step_time in zip(self.worker_times, step_times):
+            times['step'] += step_time
+            times['wait'] += max(0.0, elapsed - step_time)
+        self.current_index = 1 - self.current_index
+        self.generations += 1
+
+    def timing(self):
+        """ Per worker: its rows, seconds stepping and seconds idle, and the load imbalance """
+        workers = [{'rows': tile, 'step': times['step'], 'wait': times['wait']}
+                   for tile, times in zip(self.tiles, self.worker_times)]
+        step_times = [times['step'] for times in self.worker_times]
+        mean = sum(step_times) / len(step_times)
+        return {
+            'generations': self.generations,
+            'workers': workers,
+            'imbalance': max(step_times) / mean if mean else 1.0,
+        }